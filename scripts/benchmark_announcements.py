@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import random
+import re
+import secrets
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    client_from_args,
+    token_store_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    authenticate_async,
+    fetch_all_users,
+)
+from pwneu_client.histogram import Histogram, format_latency_summary
+from pwneu_client.signalr import RECEIVE_ANNOUNCEMENT, HubConnection
+
+# Sample command: python benchmark_announcements.py --connections 5000 --connect-rate 500 --announcements 5
+# Requires: pip install websockets
+#
+# Opens N authenticated AnnouncementHub connections, has the admin Announce a few numbered
+# messages and measures how long each one takes to reach every connection. It then closes and
+# reopens connections at --churn-rate while comparing announcements/count against the number of
+# connections the benchmark knows are open. The hub counts connections, not distinct users, so a
+# member connected twice is counted twice; the benchmark's expected count does the same.
+
+_ANNOUNCEMENT_PATTERN = re.compile(r"bench (\w+) #(\d+)")
+
+
+class FanoutBenchmark:
+    def __init__(self, client, args, admin_token, member_tokens):
+        self.client = client
+        self.args = args
+        self.admin_token = admin_token
+        self.member_tokens = member_tokens
+        self.loop = asyncio.get_running_loop()
+        self.run_id = secrets.token_hex(4)
+        self.rng = random.Random(args.seed)
+        self.semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+        self.connections = {}
+        self.readers = set()
+        self.next_key = 0
+        self.setup = Histogram()
+        self.setup_failures = 0
+        self.baseline = 0
+
+        self.sent_at = {}
+        self.expected = {}
+        self.deliveries = {}
+        self.announce_latency = Histogram()
+        self.count_errors = []
+
+    # Connections
+
+    async def connect(self):
+        key = self.next_key
+        self.next_key += 1
+        access_token = self.member_tokens[key % len(self.member_tokens)]
+
+        async with self.semaphore:
+            started_at = self.loop.time()
+            try:
+                connection = await HubConnection.open(self.client, access_token, negotiate=not self.args.skip_negotiation)
+            except Exception as e:
+                self.setup_failures += 1
+                if self.setup_failures <= 10:
+                    print(f"Failed to open hub connection {key}: {e}")
+                return
+            self.setup.record((self.loop.time() - started_at) * 1_000_000)
+
+        self.connections[key] = connection
+        reader = self.loop.create_task(self.read(key, connection))
+        self.readers.add(reader)
+        reader.add_done_callback(self.readers.discard)
+
+    async def read(self, key, connection):
+        try:
+            async for target, arguments in connection.invocations():
+                if target != RECEIVE_ANNOUNCEMENT or not arguments:
+                    continue
+                received_at = self.loop.time()
+                match = _ANNOUNCEMENT_PATTERN.search(str(arguments[0]))
+                if match and match.group(1) == self.run_id:
+                    sequence = int(match.group(2))
+                    self.deliveries[sequence].record((received_at - self.sent_at[sequence]) * 1_000_000)
+        except Exception as e:
+            print(f"Hub connection {key} failed: {e}")
+        finally:
+            self.connections.pop(key, None)
+
+    async def disconnect(self, key):
+        connection = self.connections.pop(key, None)
+        if connection:
+            await connection.close()
+
+    async def open_connections(self, count):
+        started_at = self.loop.time()
+        tasks = []
+        for i in range(count):
+            if self.args.connect_rate > 0:
+                delay = started_at + i / self.args.connect_rate - self.loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(self.loop.create_task(self.connect()))
+        await asyncio.gather(*tasks)
+
+        elapsed = self.loop.time() - started_at
+        print(f"Opened {len(self.connections)}/{count} hub connections in {elapsed:.1f}s "
+              f"({len(self.connections) / elapsed if elapsed > 0 else 0:.0f}/s), failures: {self.setup_failures}.")
+        print(format_latency_summary("setup", self.setup, elapsed))
+
+    # Online user count
+
+    async def server_count(self):
+        response = await self.client.count_online_users(self.admin_token)
+        if response.status_code != 200:
+            print(f"Failed to count online users. Status code: {response.status_code}, Response: {response.text}")
+            return None
+        return response.json()["connectedUsers"]
+
+    async def check_count(self, label):
+        count = await self.server_count()
+        if count is None:
+            return None
+        expected = self.baseline + len(self.connections)
+        print(f"{label}: server counts {count}, expected {expected} ({count - expected:+d}).")
+        return count - expected
+
+    async def wait_for_count(self, label):
+        # Disconnects are only counted once the server has processed the close, so the count is
+        # polled until it matches or --settle-timeout runs out.
+        started_at = self.loop.time()
+        while True:
+            count = await self.server_count()
+            expected = self.baseline + len(self.connections)
+            elapsed = self.loop.time() - started_at
+            if count == expected or elapsed >= self.args.settle_timeout:
+                state = "converged" if count == expected else "did not converge"
+                print(f"{label}: server counts {count}, expected {expected}, {state} after {elapsed:.1f}s.")
+                return count == expected
+            await asyncio.sleep(0.2)
+
+    # Announcements
+
+    async def announce(self, sequence):
+        self.deliveries[sequence] = Histogram()
+        self.expected[sequence] = len(self.connections)
+        self.sent_at[sequence] = self.loop.time()
+        response = await self.client.announce(self.admin_token, f"bench {self.run_id} #{sequence}")
+        self.announce_latency.record((self.loop.time() - self.sent_at[sequence]) * 1_000_000)
+        if response.status_code != 201:
+            print(f"Failed to announce #{sequence}. Status code: {response.status_code}, Response: {response.text}")
+
+    def delivered(self):
+        return all(self.deliveries[sequence].total >= self.expected[sequence] for sequence in self.deliveries)
+
+    async def run_announcements(self):
+        started_at = self.loop.time()
+        for sequence in range(self.args.announcements):
+            await self.announce(sequence)
+            if sequence + 1 < self.args.announcements:
+                await asyncio.sleep(self.args.announce_interval)
+
+        deadline = self.loop.time() + self.args.delivery_timeout
+        while not self.delivered() and self.loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = self.loop.time() - started_at
+
+        overall = Histogram()
+        for sequence, deliveries in self.deliveries.items():
+            overall.merge(deliveries)
+            print(f"Announcement #{sequence}: delivered {deliveries.total}/{self.expected[sequence]}, "
+                  f"p50={deliveries.percentile(50) / 1000:.1f}ms p99={deliveries.percentile(99) / 1000:.1f}ms "
+                  f"last={(deliveries.max or 0) / 1000:.1f}ms")
+        print(format_latency_summary("announce", self.announce_latency, elapsed))
+        print(format_latency_summary("delivery", overall, elapsed))
+
+    # Churn
+
+    async def churn(self):
+        if self.args.churn_duration <= 0 or self.args.churn_rate <= 0:
+            return
+
+        async def sample_counts():
+            while True:
+                await asyncio.sleep(self.args.count_interval)
+                error = await self.check_count("During churn")
+                if error is not None:
+                    self.count_errors.append(error)
+
+        sampler = self.loop.create_task(sample_counts())
+        started_at = self.loop.time()
+        cycles = 0
+        pending = set()
+        while self.loop.time() - started_at < self.args.churn_duration:
+            if self.connections:
+                key = self.rng.choice(list(self.connections))
+                task = self.loop.create_task(self.disconnect(key))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            task = self.loop.create_task(self.connect())
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            cycles += 1
+            await asyncio.sleep(1 / self.args.churn_rate)
+
+        sampler.cancel()
+        if pending:
+            await asyncio.gather(*pending)
+        off = [error for error in self.count_errors if error]
+        worst = max(self.count_errors, key=abs) if self.count_errors else 0
+        print(f"Churned {cycles} connections in {self.loop.time() - started_at:.1f}s. Count samples off: "
+              f"{len(off)}/{len(self.count_errors)}, worst {worst:+d}.")
+        await self.wait_for_count("After churn")
+
+    async def run(self):
+        self.baseline = await self.server_count() or 0
+        print(f"Online before the benchmark: {self.baseline}.")
+
+        await self.open_connections(self.args.connections)
+        await self.wait_for_count("After connecting")
+        await self.run_announcements()
+        await self.churn()
+
+        await asyncio.gather(*(self.disconnect(key) for key in list(self.connections)))
+        await self.wait_for_count("After disconnecting")
+        for reader in list(self.readers):
+            reader.cancel()
+
+
+async def login_members(client, users, password, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(user_name):
+        async with semaphore:
+            try:
+                entry, _ = await authenticate_async(client, user_name, password)
+            except Exception as e:
+                print(f"Failed to log in user '{user_name}'. Error: {e}")
+                return None
+        return entry["accessToken"] if entry else None
+
+    tokens = await asyncio.gather(*(login(user['userName']) for user in users))
+    return [token for token in tokens if token]
+
+
+async def run(args, token_store, recorder, metrics, admin_token, users):
+    async with AsyncPwneuClient(args.api_url, max_connections=args.connect_concurrency, http2=args.http2,
+                                token_store=token_store, recorder=recorder, metrics=metrics) as client:
+        member_tokens = await login_members(client, users, args.user_password, args.connect_concurrency)
+        if not member_tokens:
+            print("No member tokens available. Aborting.")
+            return
+        print(f"Logged in {len(member_tokens)} users for {args.connections} connections.")
+
+        benchmark = FanoutBenchmark(client, args, admin_token, member_tokens)
+        await benchmark.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AnnouncementHub fan-out and online-count benchmark.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the seeded members.")
+    parser.add_argument("--connections", type=int, default=1000, help="Hub connections to open; members are reused round-robin.")
+    parser.add_argument("--connect-rate", type=float, default=0, help="Connections opened per second (0 opens them as fast as --connect-concurrency allows).")
+    parser.add_argument("--connect-concurrency", type=int, default=100, help="Connection setups and logins in progress at once.")
+    parser.add_argument("--skip-negotiation", action="store_true", help="Connect the WebSocket directly instead of negotiating first.")
+    parser.add_argument("--announcements", type=int, default=5, help="Numbered announcements to send.")
+    parser.add_argument("--announce-interval", type=float, default=2, help="Seconds between announcements.")
+    parser.add_argument("--delivery-timeout", type=float, default=30, help="Seconds to wait for the last deliveries.")
+    parser.add_argument("--churn-duration", type=float, default=30, help="Seconds of connection churn (0 skips the churn phase).")
+    parser.add_argument("--churn-rate", type=float, default=50, help="Connections closed and reopened per second during churn.")
+    parser.add_argument("--count-interval", type=float, default=1, help="Seconds between announcements/count samples during churn.")
+    parser.add_argument("--settle-timeout", type=float, default=10, help="Seconds to wait for the online count to match after a phase.")
+    parser.add_argument("--users-limit", type=int, default=None, help="Maximum number of members to connect as.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for choosing which connections churn.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    token_store = token_store_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with client_from_args(args, token_store, recorder=recorder, metrics=metrics) as client:
+        admin_token = login_admin(client, args.admin_password)
+        if not admin_token:
+            return
+        users = [user for user in fetch_all_users(client, admin_token) if user['userName'] != "admin"]
+        users = users[:min(args.users_limit or args.connections, args.connections)]
+
+    if users:
+        asyncio.run(run(args, token_store, recorder, metrics, admin_token, users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import random
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    client_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    login_user_async,
+    fetch_all_users,
+    fetch_all_challenge_ids,
+)
+from pwneu_client.loadgen import LatencyRecorder
+from pwneu_client.server_metrics import DEFAULT_MEMORY_METRICS, ServerMetricsSampler, metrics_url_for
+from pwneu_client.uploads import format_size
+
+# Sample command: python benchmark_artifacts.py --concurrency 50 --duration 60
+#
+# Concurrent downloads of the artifacts attached to challenges (seed them with seed_artifacts.py)
+# through play/artifacts/{id}. Bodies are streamed and discarded, so the client measures the
+# server rather than its own memory. GetArtifact caches each file's bytes under artifact:{id}:data
+# for FusionCache's default duration (1 minute), so the first download of an artifact, and the
+# first one after --cache-ttl since then, is counted as a cache miss ("cold") and the rest as hits
+# ("warm"). That split is an estimate from this client's own downloads: the API doesn't say whether
+# a response came from its cache, and an artifact an earlier run or another client downloaded in
+# the last --cache-ttl seconds is still counted as cold. The API's /metrics endpoint is sampled throughout to show how server memory grows
+# while large files are cached and copied into responses.
+#
+# GetArtifact allows 3 downloads per 10 seconds per user in production; downloads are spread over
+# the seeded members' tokens, and 429s are reported separately.
+
+
+async def fetch_artifacts(client, access_token, challenge_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(challenge_id):
+        async with semaphore:
+            response = await client.get_challenge(access_token, challenge_id)
+        return response.json().get("artifacts", []) if response.status_code == 200 else []
+
+    details = await asyncio.gather(*(fetch(challenge_id) for challenge_id in challenge_ids))
+    return [artifact["id"] for artifacts in details for artifact in artifacts]
+
+
+async def login_users(client, users, password, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(user_name):
+        async with semaphore:
+            return await login_user_async(client, user_name, password)
+
+    tokens = await asyncio.gather(*(login(user['userName']) for user in users))
+    return [token for token in tokens if token]
+
+
+class CacheTracker:
+    # Expected cache state per artifact, decided when a download starts: "cold" if no download
+    # filled the cache in the last `ttl` seconds, "warm" otherwise. Downloads that start while the
+    # cold one is in flight count as warm; FusionCache makes them wait for it instead of reading
+    # the database again.
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.filled_at = {}
+
+    def classify(self, artifact_id, now):
+        filled_at = self.filled_at.get(artifact_id)
+        if filled_at is None or now - filled_at >= self.ttl:
+            self.filled_at[artifact_id] = now
+            return "cold"
+        return "warm"
+
+    def forget(self, artifact_id):
+        # A failed cold download (e.g. 429) never reached the handler, so the cache is still empty.
+        self.filled_at.pop(artifact_id, None)
+
+
+async def download(client, access_token, artifact_id, chunk_size):
+    # Returns (status, seconds until the response headers, seconds until the last byte, bytes), not
+    # counting time spent waiting for the client's rate limiter.
+    started_at = time.perf_counter()
+    async with client.stream("GET", f"play/artifacts/{artifact_id}", access_token) as response:
+        started_at += response.extensions["waited"]
+        headers_at = time.perf_counter()
+        size = 0
+        async for chunk in response.aiter_raw(chunk_size):
+            size += len(chunk)
+    return response.status_code, headers_at - started_at, time.perf_counter() - started_at, size
+
+
+def print_report(headers, downloads, sizes, sampler, cache_ttl):
+    duration = downloads.duration()
+    print(f"Cold and warm are estimated by this client (first download per {cache_ttl:g}s --cache-ttl is cold); "
+          "artifacts cached by an earlier run or another client still count as cold.")
+    print("Time to response headers:")
+    headers.print_report(["cold", "warm"])
+    print("Time to last byte:")
+    downloads.print_report(["cold", "warm"])
+    total = sum(sizes.values())
+    print(f"Downloaded {format_size(total)} in {duration:.1f}s ({total / 2 ** 20 / duration if duration > 0 else 0:.1f}MB/s).")
+    for status_class in ("cold", "warm"):
+        histogram = downloads.histograms.get(status_class)
+        if histogram and histogram.total:
+            # Mean bytes over mean seconds: what one download of the average artifact achieves.
+            per_download = sizes[status_class] / histogram.total / (histogram.mean() / 1_000_000)
+            print(f"  {status_class}: {format_size(sizes[status_class])} over {histogram.total} downloads, "
+                  f"{per_download / 2 ** 20:.1f}MB/s per download")
+    if sampler:
+        sampler.print_report()
+
+
+async def run(args, token_store, recorder, metrics, admin_token, users, challenge_ids):
+    async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2, token_store=token_store,
+                                rate_limiter=rate_limiter_from_args(args), recorder=recorder, metrics=metrics) as client:
+        artifact_ids = await fetch_artifacts(client, admin_token, challenge_ids, args.concurrency)
+        artifact_ids = artifact_ids[:args.artifacts_limit]
+        if not artifact_ids:
+            print("No artifacts found. Seed some with seed_artifacts.py.")
+            return
+        tokens = await login_users(client, users, args.user_password, args.concurrency) or [admin_token]
+        print(f"Downloading {len(artifact_ids)} artifacts as {len(tokens)} users with {args.concurrency} concurrent downloads.")
+
+        sampler = None
+        if not args.no_server_metrics:
+            sampler = ServerMetricsSampler(client.session, args.server_metrics_url or metrics_url_for(args.api_url),
+                                           args.memory_metrics, args.server_metrics_interval)
+            await sampler.sample()
+            sampling = asyncio.get_running_loop().create_task(sampler.run())
+
+        rng = random.Random(args.seed)
+        cache = CacheTracker(args.cache_ttl)
+        headers, downloads = LatencyRecorder(), LatencyRecorder()
+        sizes = {"cold": 0, "warm": 0}
+        sequence = 0
+        deadline = time.monotonic() + args.duration
+
+        async def downloader():
+            nonlocal sequence
+            while time.monotonic() < deadline and (args.downloads is None or sequence < args.downloads):
+                artifact_id = artifact_ids[sequence % len(artifact_ids)] if args.order == "sequential" else rng.choice(artifact_ids)
+                access_token = tokens[sequence % len(tokens)]
+                sequence += 1
+                status_class = cache.classify(artifact_id, time.monotonic())
+                try:
+                    status, to_headers, to_last_byte, size = await download(client, access_token, artifact_id, args.chunk_size)
+                except Exception:
+                    status, to_headers, to_last_byte = "error", 0, 0
+                if status != 200:
+                    if status_class == "cold":
+                        cache.forget(artifact_id)
+                    headers.record(str(status), to_headers)
+                    downloads.record(str(status), to_last_byte)
+                    continue
+                sizes[status_class] += size
+                headers.record(status_class, to_headers)
+                downloads.record(status_class, to_last_byte)
+
+        headers.started_at = downloads.started_at = time.perf_counter()
+        await asyncio.gather(*(downloader() for _ in range(args.concurrency)))
+        headers.finished_at = downloads.finished_at = time.perf_counter()
+
+        if sampler:
+            sampling.cancel()
+            # Once more after the load, to show whether the memory is given back.
+            await asyncio.sleep(args.server_metrics_interval)
+            await sampler.sample()
+        print_report(headers, downloads, sizes, sampler, args.cache_ttl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent artifact download benchmark.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the seeded members.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent downloads.")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to download for.")
+    parser.add_argument("--downloads", type=int, default=None, help="Stop after this many downloads.")
+    parser.add_argument("--order", choices=["random", "sequential"], default="random", help="How artifacts are picked for each download.")
+    parser.add_argument("--artifacts-limit", type=int, default=None, help="Maximum number of artifacts to download.")
+    parser.add_argument("--users-limit", type=int, default=100, help="Maximum number of members to download as (0 downloads as the admin).")
+    parser.add_argument("--cache-ttl", type=float, default=60, help="Seconds a downloaded artifact stays cached on the server (FusionCache's default duration).")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Bytes read from the response at a time.")
+    parser.add_argument("--server-metrics-url", type=str, default=None, help="The API's Prometheus endpoint (defaults to /metrics on the API host).")
+    parser.add_argument("--server-metrics-interval", type=float, default=1, help="Seconds between server metrics samples.")
+    parser.add_argument("--memory-metrics", type=str, default=DEFAULT_MEMORY_METRICS, help="Regular expression of the server metric names to report.")
+    parser.add_argument("--no-server-metrics", action="store_true", help="Don't sample the API's metrics.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for picking artifacts.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    token_store = token_store_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with client_from_args(args, token_store, recorder=recorder, metrics=metrics) as client:
+        admin_token = login_admin(client, args.admin_password)
+        if not admin_token:
+            return
+        challenge_ids = fetch_all_challenge_ids(client, admin_token)
+        users = fetch_all_users(client, admin_token)[:args.users_limit] if args.users_limit else []
+
+    if challenge_ids:
+        asyncio.run(run(args, token_store, recorder, metrics, admin_token, users, challenge_ids))
+
+
+if __name__ == "__main__":
+    main()
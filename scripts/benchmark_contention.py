@@ -0,0 +1,491 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import random
+import time
+from datetime import datetime
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    login_admin,
+    login_user,
+    fetch_all_members,
+    fetch_all_challenges,
+    paginate,
+)
+from pwneu_client.histogram import Histogram, format_latency_summary
+from pwneu_client.loadgen import LatencyRecorder
+from pwneu_client.paging import SOLVES_MAX_PAGE_SIZE, HINT_USAGES_MAX_PAGE_SIZE
+
+# Sample command: python benchmark_contention.py --users 20 --burst 8 --update-challenges 3 --duration 30 --rate-limits off
+#
+# Builds the races that production traffic only hits by accident, all at once and on purpose,
+# then checks the points they leave behind for double counting:
+#
+# 1. Hint bursts: every user sends --burst UseHint requests for the same hint at the same moment.
+#    UseHint holds a per-user lock (429 while busy) and sets UserHasUsedHint before buffering the
+#    usage, so each burst may deduct the hint once.
+# 2. Hint vs. solve: every user uses a hint and submits the correct flag of the same challenge at
+#    once, the two shifted by up to --race-jitter seconds. UseHint and SubmitFlag take separate
+#    locks, so they really overlap. A deduction dated after the solve got past UseHint's
+#    ChallengeAlreadySolved check.
+# 3. Point updates during flushes: while users solve --update-challenges challenges, the admin
+#    keeps switching their points between the original value and +--points-delta. UpdateChallenge
+#    and SaveBuffersService's flushes share IChallengePointsConcurrencyGuard, and UpdateChallenge
+#    answers 400 Error.AnotherProcessRunning while it is taken. Updates are retried every
+#    --guard-retry-interval; the time from the first attempt to the accepted one is the guard
+#    wait. A solve keeps the points its SolveBuffer captured, so every award must be one of the
+#    values the challenge had.
+#
+# The benchmark adds a hint worth --deduction points to each challenge it races on. UpdateChallenge
+# writes every field, so the updates send each challenge's own flags (from GetChallengeFlags), with
+# --flag added if it isn't one of them. It polls each user's play/me/solves, play/me/hintUsages and
+# play/me/rank until everything sent is visible or --settle-timeout passes, and checks that no
+# challenge or hint is counted twice and that the points equal the listed awards minus the listed
+# deductions. SaveBuffersService adds a PointsActivity and the points of every buffered row
+# without a conflict check, so a duplicated buffer row shows up here. Finally, even if the run
+# fails, it puts back the challenges' original points and flags and removes the hints it added.
+#
+# Use members that aren't playing and a test deployment with the API's rate limits relaxed: the
+# UseHint policy (4 requests per 10s per user) also answers 429 and would pass for lock contention.
+
+CORRECT_FLAG = "PWNEU{PWNEU}"
+GUARD_BUSY = "400 Error.AnotherProcessRunning"
+HINT_GUARD_BUSY = 429
+# Problems that can be visibility lag rather than a bug; the checks are repeated until they clear.
+SETTLING = {"points mismatch", "solve missing", "hint usage missing"}
+
+
+def outcome_of(response, status_body=False):
+    if response.status_code == 200:
+        return response.text.strip('"') if status_body else "200"
+    try:
+        code = response.json().get("code")
+    except ValueError:
+        code = None
+    return f"{response.status_code} {code}" if code else str(response.status_code)
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+async def timed(recorders, operation, send, start=None, delay=0.0, status_body=False):
+    # Waits for `start` (so a whole burst leaves together), then sends and records the latency.
+    if start is not None:
+        await start.wait()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    started_at = time.perf_counter()
+    try:
+        outcome = outcome_of(await send(), status_body)
+    except Exception:
+        outcome = "error"
+    recorders.setdefault(operation, LatencyRecorder()).record(outcome, time.perf_counter() - started_at)
+    return outcome
+
+
+async def run_phase(recorders, coroutines):
+    # Recorders are created as operations first finish, so the phase's times are set afterwards.
+    started_at = time.time()
+    await asyncio.gather(*coroutines)
+    for recorder in recorders.values():
+        recorder.started_at = started_at
+        recorder.finished_at = time.time()
+
+
+async def hint_bursts(client, events, args, users, recorders):
+    start = asyncio.Event()
+    accepted_per_burst = collections.Counter()
+
+    async def burst(user):
+        challenge_id, hint_id = user["burst"]
+        outcomes = await asyncio.gather(*(timed(recorders, "UseHint", lambda: client.use_hint(user["accessToken"], hint_id), start)
+                                          for _ in range(args.burst)))
+        accepted = outcomes.count("200")
+        accepted_per_burst[accepted] += 1
+        if accepted:
+            user["expectedHints"].add(hint_id)
+        events.record("hint bursts", accepted > 0, f"{accepted} accepted",
+                      f"Burst of {args.burst} for hint {hint_id} as {user['userName']}: {dict(collections.Counter(outcomes))}.",
+                      user=user["userName"], hint=hint_id)
+
+    bursting = [user for user in users if user["burst"]]
+    events.start_phase("hint bursts", len(bursting))
+    tasks = [asyncio.get_running_loop().create_task(burst(user)) for user in bursting]
+    await asyncio.sleep(0)
+    start.set()
+    await run_phase(recorders, tasks)
+    events.finish_phase("hint bursts")
+    return accepted_per_burst
+
+
+async def hint_races(client, events, args, users, rng, recorders):
+    start = asyncio.Event()
+    pairs = collections.Counter()
+
+    async def race(user, offset):
+        challenge_id, hint_id = user["race"]
+        hint, submit = await asyncio.gather(
+            timed(recorders, "UseHint", lambda: client.use_hint(user["accessToken"], hint_id), start, -offset),
+            timed(recorders, "SubmitFlag", lambda: client.submit_flag(user["accessToken"], challenge_id, args.flag), start, offset,
+                  status_body=True))
+        pairs[(hint, submit)] += 1
+        if hint == "200":
+            user["expectedHints"].add(hint_id)
+        if submit == "Correct":
+            user["expectedSolves"].add(challenge_id)
+        events.record("hint races", submit in ("Correct", "AlreadySolved"), f"{hint} / {submit}",
+                      f"Hint {hint_id} and a solve of {challenge_id} as {user['userName']} (submit {offset * 1000:+.0f}ms): {hint} / {submit}.",
+                      user=user["userName"], challenge=challenge_id, hint=hint_id)
+
+    racing = [user for user in users if user["race"]]
+    events.start_phase("hint races", len(racing))
+    tasks = [asyncio.get_running_loop().create_task(race(user, rng.uniform(-args.race_jitter, args.race_jitter))) for user in racing]
+    await asyncio.sleep(0)
+    start.set()
+    await run_phase(recorders, tasks)
+    events.finish_phase("hint races")
+    return pairs
+
+
+async def update_points(client, events, args, admin_token, target, points, recorders, guard):
+    # Retries through Error.AnotherProcessRunning and records how long the guard kept the update out.
+    target["values"].add(points)
+    payload = dict(target["update"], points=points)
+    first_attempt = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        sent_at = time.perf_counter()
+        outcome = await timed(recorders, "UpdateChallenge", lambda: client.update_challenge(admin_token, target["id"], payload))
+        if outcome != GUARD_BUSY or sent_at - first_attempt >= args.guard_timeout:
+            break
+        await asyncio.sleep(args.guard_retry_interval)
+
+    accepted = outcome == "204"
+    if accepted:
+        guard["waits"].record((sent_at - first_attempt) * 1_000_000)
+        guard["attempts"][attempts] += 1
+    elif outcome == GUARD_BUSY:
+        guard["timeouts"] += 1
+    events.record("point updates", accepted, outcome,
+                  f"Points of {target['id']} set to {points} after {attempts} attempts: {outcome}.", challenge=target["id"], points=points,
+                  attempts=attempts)
+    return accepted
+
+
+async def point_updates(client, events, args, admin_token, users, targets, rng, recorders, guard):
+    stop = asyncio.Event()
+
+    async def admin():
+        sequence = 0
+        while not stop.is_set():
+            target = targets[sequence % len(targets)]
+            raised = (sequence // len(targets)) % 2 == 0
+            await update_points(client, events, args, admin_token, target, target["original"] + (args.points_delta if raised else 0),
+                                recorders, guard)
+            sequence += 1
+            await asyncio.sleep(args.update_interval)
+
+    async def solve(user, target, delay):
+        outcome = await timed(recorders, "SubmitFlag", lambda: client.submit_flag(user["accessToken"], target["id"], args.flag), delay=delay,
+                              status_body=True)
+        if outcome == "Correct":
+            user["expectedSolves"].add(target["id"])
+        events.record("solves", outcome in ("Correct", "AlreadySolved"), outcome, f"Solve of {target['id']} as {user['userName']}: {outcome}.",
+                      user=user["userName"], challenge=target["id"])
+
+    solves = [(user, target) for user in users for target in targets if target["id"] not in user["solved"]]
+    events.start_phase("point updates")
+    events.start_phase("solves", len(solves))
+    updating = asyncio.get_running_loop().create_task(admin())
+    await run_phase(recorders, [solve(user, target, rng.uniform(0, args.duration)) for user, target in solves])
+    stop.set()
+    await updating
+    events.finish_phase("solves")
+    events.finish_phase("point updates")
+
+
+def read_ledger(client, user):
+    access_token = user["accessToken"]
+    solves = list(paginate(lambda page, page_size: client.get_my_solves(access_token, page=page, pageSize=page_size),
+                           "solves", SOLVES_MAX_PAGE_SIZE, window=1))
+    usages = list(paginate(lambda page, page_size: client.get_my_hint_usages(access_token, page=page, pageSize=page_size),
+                           "hint usages", HINT_USAGES_MAX_PAGE_SIZE, window=1))
+    response = client.get_my_rank(access_token)
+    points = response.json()["points"] if response.status_code == 200 else None
+    return solves, usages, points
+
+
+def check_user(client, user, targets):
+    # Returns [(kind, message), ...] for one user's solves, deductions and points.
+    solves, usages, points = read_ledger(client, user)
+    problems = []
+    solve_counts = collections.Counter(item["challengeId"] for item in solves)
+    for challenge_id, count in solve_counts.items():
+        if count > 1:
+            problems.append(("solve counted twice", f"{user['userName']} has challenge {challenge_id} listed {count} times."))
+    usage_counts = collections.Counter(item["hintId"] for item in usages)
+    for hint_id, count in usage_counts.items():
+        if count > 1:
+            problems.append(("deduction counted twice", f"{user['userName']} has hint {hint_id} deducted {count} times."))
+
+    for challenge_id in user["expectedSolves"] - set(solve_counts):
+        problems.append(("solve missing", f"{user['userName']} got Correct for {challenge_id}, but it isn't listed."))
+    for hint_id in user["expectedHints"] - set(usage_counts):
+        problems.append(("hint usage missing", f"{user['userName']} used hint {hint_id}, but no deduction is listed."))
+
+    solved_at = {item["challengeId"]: parse_time(item["solvedAt"]) for item in solves}
+    for item in usages:
+        if item["challengeId"] in solved_at and parse_time(item["usedAt"]) > solved_at[item["challengeId"]]:
+            problems.append(("deduction after solve", f"{user['userName']} lost points for hint {item['hintId']} after solving {item['challengeId']}."))
+
+    for item in solves:
+        target = targets.get(item["challengeId"])
+        if target and item["challengeId"] in user["expectedSolves"] and item["points"] not in target["values"]:
+            problems.append(("unexpected award", f"{user['userName']} got {item['points']} points for {item['challengeId']}, "
+                                                 f"which never had that value ({sorted(target['values'])})."))
+
+    # Deductions are listed as negative PointsChange values.
+    expected = sum(item["points"] for item in solves) - sum(abs(item["deduction"]) for item in usages)
+    if points is None:
+        problems.append(("points mismatch", f"Could not read the points of {user['userName']}."))
+    elif points != expected:
+        problems.append(("points mismatch", f"{user['userName']} has {points} points, the listed awards and deductions add up to {expected}."))
+    return problems, solves
+
+
+def check_all(client, events, args, users, targets):
+    events.start_phase("checks", len(users))
+    deadline = time.monotonic() + args.settle_timeout
+    rounds = 0
+    while True:
+        rounds += 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(users))) as executor:
+            checked = list(executor.map(lambda user: check_user(client, user, targets), users))
+        pending = any(kind in SETTLING for problems, _ in checked for kind, _ in problems)
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(args.settle_interval)
+
+    for user, (problems, _) in zip(users, checked):
+        events.record("checks", not problems, problems[0][0] if problems else "consistent",
+                      "; ".join(message for _, message in problems) or f"{user['userName']} is consistent.", user=user["userName"])
+    events.finish_phase("checks")
+    return checked, rounds
+
+
+def print_latencies(title, recorders):
+    print(f"{title}:")
+    for operation, recorder in recorders.items():
+        duration = recorder.duration()
+        for outcome in sorted(recorder.histograms):
+            print(format_latency_summary(f"  {operation} {outcome}", recorder.histograms[outcome], duration))
+
+
+def print_report(args, latencies, accepted_per_burst, pairs, guard, checked, rounds, users, targets):
+    if accepted_per_burst:
+        print_latencies("Hint bursts", latencies["bursts"])
+        print("  Accepted UseHint requests per burst: " + ", ".join(f"{accepted}: {count}" for accepted, count in sorted(accepted_per_burst.items())))
+    if pairs:
+        print_latencies("Hint vs. solve", latencies["races"])
+        for (hint, submit), count in pairs.most_common():
+            print(f"  UseHint {hint} / SubmitFlag {submit}: {count}")
+    if targets:
+        print_latencies("Point updates during flushes", latencies["updates"])
+        duration = latencies["updates"]["UpdateChallenge"].duration() if "UpdateChallenge" in latencies["updates"] else 0
+        if guard["waits"].total:
+            print(format_latency_summary("  guard wait", guard["waits"], duration))
+        print("  Attempts per accepted update: " + ", ".join(f"{attempts}: {count}" for attempts, count in sorted(guard["attempts"].items())))
+        if guard["timeouts"]:
+            print(f"  {guard['timeouts']} updates were still locked out after {args.guard_timeout}s.")
+        awards = collections.Counter()
+        for user, (_, solves) in zip(users, checked):
+            for item in solves:
+                target = targets.get(item["challengeId"])
+                if target and item["challengeId"] in user["expectedSolves"]:
+                    awards["original" if item["points"] == target["original"] else "changed"] += 1
+        print(f"  Solves awarded the original points: {awards['original']}, the changed points: {awards['changed']}")
+
+    problems = collections.Counter(kind for user_problems, _ in checked for kind, _ in user_problems)
+    print(f"Checked {len(users)} users ({rounds} rounds).")
+    if not problems:
+        print("No double counting found: every solve and deduction is listed once and the points add up.")
+        return
+    for kind, count in problems.most_common():
+        print(f"  {kind}: {count}")
+    for user_problems, _ in checked:
+        for kind, message in user_problems[:3]:
+            print(f"    {message}")
+
+
+async def run(args, events, token_store, rate_limiter, admin_token, users, targets, latencies, guard):
+    rng = random.Random(args.seed)
+    async with AsyncPwneuClient(args.api_url, max_connections=len(users) * max(args.burst, 2) + 4, http2=args.http2, token_store=token_store,
+                                rate_limiter=rate_limiter) as client:
+        client.credentials["admin"] = args.admin_password
+        for user in users:
+            client.credentials[user["userName"]] = args.user_password
+
+        accepted_per_burst = await hint_bursts(client, events, args, users, latencies["bursts"]) if args.burst else {}
+        pairs = await hint_races(client, events, args, users, rng, latencies["races"])
+        if targets:
+            await point_updates(client, events, args, admin_token, users, list(targets.values()), rng, latencies["updates"], guard)
+    return accepted_per_burst, pairs
+
+
+def add_hint(client, access_token, challenge_id, deduction):
+    response = client.add_hint(access_token, challenge_id, "Contention benchmark hint", deduction)
+    if response.status_code == 200:
+        return response.text.strip('"')
+    print(f"Failed to add a hint to challenge {challenge_id}. Status code: {response.status_code}, Response: {response.text}")
+    return None
+
+
+def update_payload(client, access_token, challenge_id, flag):
+    # Returns the UpdateChallenge body (with `flag` among the flags) and the challenge's own flags.
+    response = client.get_challenge(access_token, challenge_id)
+    flags_response = client.get_challenge_flags(access_token, challenge_id)
+    if response.status_code != 200 or flags_response.status_code != 200:
+        failed = response if response.status_code != 200 else flags_response
+        print(f"Failed to fetch challenge {challenge_id}. Status code: {failed.status_code}, Response: {failed.text}")
+        return None, None
+    challenge = response.json()
+    flags = flags_response.json()
+    return {
+        "name": challenge["name"],
+        "description": challenge["description"],
+        "points": challenge["points"],
+        "deadlineEnabled": challenge["deadlineEnabled"],
+        "deadline": challenge["deadline"],
+        "maxAttempts": challenge["maxAttempts"],
+        "tags": challenge["tags"],
+        "flags": flags if flag in flags else flags + [flag],
+    }, flags
+
+
+def retry_guarded(args, send, busy):
+    # Retries a call IChallengePointsConcurrencyGuard turns away until --guard-timeout.
+    deadline = time.monotonic() + args.guard_timeout
+    while True:
+        response = send()
+        if not busy(response) or time.monotonic() >= deadline:
+            return response
+        time.sleep(args.guard_retry_interval)
+
+
+def restore(client, args, admin_token, targets, hints):
+    # UpdateChallenge answers a busy guard with 400 AnotherProcessRunning, RemoveHint with a bare 429.
+    for target in targets.values():
+        payload = dict(target["update"], points=target["original"], flags=target["flags"])
+        response = retry_guarded(args, lambda: client.update_challenge(admin_token, target["id"], payload),
+                                 lambda response: response.status_code == 400 and "AnotherProcessRunning" in response.text)
+        if response.status_code != 204:
+            print(f"Could not restore the points and flags of challenge {target['id']}. Status code: {response.status_code}, "
+                  f"Response: {response.text}")
+    for challenge_id, hint_id in hints.items():
+        response = retry_guarded(args, lambda: client.remove_hint(admin_token, hint_id), lambda response: response.status_code == HINT_GUARD_BUSY)
+        if response.status_code != 204:
+            print(f"Could not remove the hint added to challenge {challenge_id}. Status code: {response.status_code}, Response: {response.text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race hint usages, solves and challenge point updates against each other and check the points.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the members.")
+    parser.add_argument("--user-names", type=str, default=None, help="Comma-separated members to race as (by default --users random members).")
+    parser.add_argument("--users", type=int, default=20, help="Random members to race as when --user-names isn't given.")
+    parser.add_argument("--flag", type=str, default=CORRECT_FLAG, help="The correct flag of the challenges raced on.")
+    parser.add_argument("--burst", type=int, default=8, help="Concurrent UseHint requests per user for the same hint (0 skips the bursts).")
+    parser.add_argument("--race-challenges", type=int, default=10, help="Challenges that get a hint to burst and race on.")
+    parser.add_argument("--race-jitter", type=float, default=0.02, help="Largest shift in seconds between a user's UseHint and SubmitFlag.")
+    parser.add_argument("--deduction", type=int, default=10, help="Deduction of the hints the benchmark adds.")
+    parser.add_argument("--update-challenges", type=int, default=3, help="Challenges whose points change while users solve them (0 skips them).")
+    parser.add_argument("--points-delta", type=int, default=50, help="Points added to a challenge by every other update.")
+    parser.add_argument("--update-interval", type=float, default=0.2, help="Seconds between point updates.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds over which users solve the updated challenges.")
+    parser.add_argument("--guard-retry-interval", type=float, default=0.05, help="Seconds between attempts of an update the guard turned away.")
+    parser.add_argument("--guard-timeout", type=float, default=30, help="Seconds after which an update the guard keeps turning away is given up.")
+    parser.add_argument("--settle-interval", type=float, default=1, help="Seconds between checks while solves and deductions aren't visible yet.")
+    parser.add_argument("--settle-timeout", type=float, default=30, help="Seconds to wait for every solve and deduction to become visible.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for picking users, challenges and race offsets.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    token_store = token_store_from_args(args)
+    rate_limiter = rate_limiter_from_args(args)
+
+    with client_from_args(args, token_store, rate_limiter) as client:
+        admin_token = login_admin(client, args.admin_password)
+        if not admin_token:
+            return
+        challenges = fetch_all_challenges(client, admin_token)
+        if args.user_names:
+            user_names = [name.strip() for name in args.user_names.split(",") if name.strip()]
+        else:
+            members = sorted(fetch_all_members(client, admin_token).values())
+            user_names = rng.sample(members, k=min(args.users, len(members)))
+
+        users = []
+        for user_name in user_names:
+            user_token = login_user(client, user_name, args.user_password)
+            if user_token:
+                solved = {item["challengeId"] for item in paginate(lambda page, page_size: client.get_my_solves(user_token, page=page, pageSize=page_size),
+                                                                   "solves", SOLVES_MAX_PAGE_SIZE, window=1)}
+                users.append({"userName": user_name, "accessToken": user_token, "solved": solved,
+                              "expectedSolves": set(), "expectedHints": set(), "burst": None, "race": None})
+        if not users or not challenges:
+            print("No users or challenges available. Aborting.")
+            return
+
+        picked = rng.sample(challenges, k=min(len(challenges), args.race_challenges + args.update_challenges))
+        targets = {}
+        for challenge in picked[args.race_challenges:]:
+            payload, flags = update_payload(client, admin_token, challenge["id"], args.flag)
+            if payload:
+                targets[challenge["id"]] = {"id": challenge["id"], "original": payload["points"],
+                                            "values": {payload["points"]}, "update": payload, "flags": flags}
+
+    hints = {}
+    try:
+        with client_from_args(args, token_store, rate_limiter) as client:
+            for challenge in picked[:args.race_challenges]:
+                hint_id = add_hint(client, admin_token, challenge["id"], args.deduction)
+                if hint_id:
+                    hints[challenge["id"]] = hint_id
+        for user in users:
+            # Each user bursts on one hinted challenge and races on another, both unsolved.
+            unsolved = [challenge_id for challenge_id in hints if challenge_id not in user["solved"]]
+            chosen = rng.sample(unsolved, k=min(2, len(unsolved)))
+            if args.burst and chosen:
+                challenge_id = chosen.pop()
+                user["burst"] = (challenge_id, hints[challenge_id])
+            if chosen:
+                challenge_id = chosen.pop()
+                user["race"] = (challenge_id, hints[challenge_id])
+
+        print(f"Racing as {len(users)} users on {len(hints)} hinted challenges and {len(targets)} challenges with changing points.")
+        latencies = {"bursts": {}, "races": {}, "updates": {}}
+        guard = {"waits": Histogram(), "attempts": collections.Counter(), "timeouts": 0}
+        with event_sink_from_args(args) as events:
+            accepted_per_burst, pairs = asyncio.run(run(args, events, token_store, rate_limiter, admin_token, users, targets, latencies, guard))
+            with client_from_args(args, token_store, rate_limiter) as client:
+                checked, rounds = check_all(client, events, args, users, targets)
+    finally:
+        with client_from_args(args, token_store, rate_limiter) as client:
+            restore(client, args, admin_token, targets, hints)
+    print_report(args, latencies, accepted_per_burst, pairs, guard, checked, rounds, users, targets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import random
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    client_from_args,
+    token_store_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    login_user_async,
+    fetch_all_users,
+)
+from pwneu_client.histogram import Histogram
+from pwneu_client.loadgen import TimelineRecorder, run_open_loop
+
+# Sample command: python benchmark_leaderboards.py --rate 300 --duration 120 --clear-every 30
+# With recalculations (the API refuses them while submissions are open):
+#   python benchmark_leaderboards.py --recalculate-every 60 --deny-submissions
+#
+# Players read play/leaderboards, play/me/rank and play/me/graph at a steady open-loop rate while
+# the admin clears the leaderboard cache and requests recalculations on a schedule. Latency is
+# kept per time window, so the report shows each event's spike, how many reads were slow right
+# after it (a cache stampede shows up here) and how long p99 took to return to the baseline
+# measured before the first event.
+
+READS = {
+    "leaderboards": lambda client, access_token: client.get_leaderboards(access_token),
+    "rank": lambda client, access_token: client.get_my_rank(access_token),
+    "graph": lambda client, access_token: client.get_my_graph(access_token),
+}
+
+ADMIN_EVENTS = {
+    "clear": lambda client, access_token: client.clear_leaderboards_cache(access_token),
+    "recalculate": lambda client, access_token: client.recalculate_leaderboards(access_token),
+}
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in READS:
+            raise argparse.ArgumentTypeError(f"Unknown read '{name}'. Choose from: {', '.join(READS)}.")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def event_schedule(args):
+    schedule = []
+    for kind, every in (("clear", args.clear_every), ("recalculate", args.recalculate_every)):
+        if every > 0:
+            offset = args.first_event_at if args.first_event_at is not None else every
+            while offset < args.duration:
+                schedule.append((offset, kind))
+                offset += every
+    return sorted(schedule)
+
+
+async def run_admin_events(client, access_token, schedule, events):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for offset, kind in schedule:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent_at = loop.time()
+        try:
+            response = await ADMIN_EVENTS[kind](client, access_token)
+            status = response.status_code
+        except Exception as e:
+            print(f"Admin event '{kind}' at {offset:.0f}s failed: {e}")
+            status = "error"
+        events.append((sent_at - start, kind, status, (loop.time() - sent_at) * 1000))
+
+
+def print_report(recorder, events, args):
+    ok_classes = set(READS)
+    last_window = max(recorder.windows, default=-1)
+    window = recorder.window_seconds
+    first_event_window = int(events[0][0] // window) if events else last_window + 1
+
+    baseline = Histogram()
+    for index in range(first_event_window):
+        baseline.merge(recorder.window_histogram(index, ok_classes))
+    baseline_p99 = baseline.percentile(99)
+    threshold = baseline_p99 * args.recovery_factor
+    print(f"Baseline before the first event: count={baseline.total} p50={baseline.percentile(50) / 1000:.1f}ms "
+          f"p99={baseline_p99 / 1000:.1f}ms (recovered means p99 <= {threshold / 1000:.1f}ms).")
+
+    events_by_window = {}
+    for event in events:
+        events_by_window.setdefault(int(event[0] // window), []).append(event)
+
+    print("Timeline:")
+    for index in range(last_window + 1):
+        histogram = recorder.window_histogram(index, ok_classes)
+        failed = recorder.window_histogram(index).total - histogram.total
+        markers = "  ".join(f"<- {kind} ({status}, {latency:.0f}ms)" for _, kind, status, latency in events_by_window.get(index, []))
+        print(f"  t={index * window:>6.1f}s n={histogram.total:<6} p50={histogram.percentile(50) / 1000:>8.1f}ms "
+              f"p99={histogram.percentile(99) / 1000:>8.1f}ms max={(histogram.max or 0) / 1000:>8.1f}ms "
+              f"failed={failed:<5} {markers}")
+
+    for position, (offset, kind, status, latency) in enumerate(events):
+        start_window = int(offset // window)
+        end_window = int(events[position + 1][0] // window) if position + 1 < len(events) else last_window + 1
+        spike = max((recorder.window_histogram(index, ok_classes).percentile(99) for index in range(start_window, end_window)), default=0)
+        # Reads in the event's window and the next one that were slower than the recovery bound.
+        slow = sum(recorder.window_histogram(index, ok_classes).count_above(threshold) for index in (start_window, start_window + 1))
+        recovered_at = next(
+            (index for index in range(start_window, end_window)
+             if recorder.window_histogram(index, ok_classes).total
+             and recorder.window_histogram(index, ok_classes).percentile(99) <= threshold),
+            None,
+        )
+        if recovered_at is None:
+            recovery = "did not recover"
+        elif recovered_at == start_window:
+            recovery = "p99 stayed within the bound"
+        else:
+            recovery = f"recovered in {recovered_at * window - offset:.1f}s"
+        print(f"{kind} at {offset:.1f}s (status {status}): peak p99 {spike / 1000:.1f}ms, "
+              f"{slow} slow reads right after, {recovery}.")
+
+
+async def login_users(client, users, password, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(user_name):
+        async with semaphore:
+            return await login_user_async(client, user_name, password)
+
+    tokens = await asyncio.gather(*(login(user['userName']) for user in users))
+    return [token for token in tokens if token]
+
+
+async def run(args, token_store, recorder, metrics, admin_token, users):
+    async with AsyncPwneuClient(args.api_url, max_connections=args.max_connections, http2=args.http2, token_store=token_store,
+                                recorder=recorder, metrics=metrics) as client:
+        tokens = await login_users(client, users, args.user_password, args.max_connections)
+        if not tokens:
+            print("No member tokens available. Aborting.")
+            return
+
+        schedule = event_schedule(args)
+        print(f"Logged in {len(tokens)} users. Starting the read storm with {len(schedule)} scheduled admin events.")
+        rng = random.Random(args.seed)
+        names = list(args.mix)
+        weights = [args.mix[name] for name in names]
+        timeline = TimelineRecorder(args.window)
+
+        async def send(sequence):
+            name = rng.choices(names, weights)[0]
+            try:
+                response = await READS[name](client, tokens[sequence % len(tokens)])
+            except Exception:
+                return f"{name} error"
+            return name if response.status_code == 200 else f"{name} {response.status_code}"
+
+        events = []
+        admin = asyncio.get_running_loop().create_task(run_admin_events(client, admin_token, schedule, events))
+        await run_open_loop(send, timeline, args.rate, args.duration, args.rate_end, args.max_in_flight, args.max_connections)
+        await admin
+
+        timeline.print_report(sorted(READS))
+        print_report(timeline, events, args)
+
+
+def submissions_allowed(client, admin_token):
+    # GetConfigurations lists JSON-serialized values; a missing SubmissionsAllowed row means false.
+    response = client.get_configurations(admin_token)
+    if response.status_code != 200:
+        print(f"Failed to read the configurations. Status code: {response.status_code}, Response: {response.text}")
+        return None
+    values = {configuration["key"]: configuration["value"] for configuration in response.json()}
+    return values.get("SubmissionsAllowed") == "true"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leaderboard read storm with scheduled cache clears and recalculations.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the seeded members.")
+    parser.add_argument("--rate", type=float, default=200, help="Reads per second (ramp start when --rate-end is set).")
+    parser.add_argument("--rate-end", type=float, default=None, help="Reads per second at the end of a linear ramp.")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to generate load for.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("leaderboards=6,rank=3,graph=1"),
+                        help="Relative weights of the reads: leaderboards, rank and graph.")
+    parser.add_argument("--clear-every", type=float, default=30, help="Seconds between play/leaderboards/clear calls (0 disables).")
+    parser.add_argument("--recalculate-every", type=float, default=0, help="Seconds between recalculation requests (0 disables).")
+    parser.add_argument("--first-event-at", type=float, default=None, help="Seconds before the first admin event (defaults to its interval).")
+    parser.add_argument("--deny-submissions", action="store_true", help="Close submissions for the run so recalculations are accepted.")
+    parser.add_argument("--window", type=float, default=1, help="Width of the report's time windows in seconds.")
+    parser.add_argument("--recovery-factor", type=float, default=1.5, help="p99 counts as recovered within this factor of the baseline p99.")
+    parser.add_argument("--users-limit", type=int, default=None, help="Maximum number of members to read as.")
+    parser.add_argument("--max-connections", type=int, default=100, help="Size of the async connection pool and number of concurrent readers.")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Arrivals beyond this many pending (sending or queued) reads are counted as dropped.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for choosing reads.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    token_store = token_store_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with client_from_args(args, token_store, recorder=recorder, metrics=metrics) as client:
+        admin_token = login_admin(client, args.admin_password)
+        if not admin_token:
+            return
+        users = fetch_all_users(client, admin_token)[:args.users_limit]
+        # Only reopen submissions if they were open before the run.
+        reopen = False
+        if args.deny_submissions:
+            reopen = submissions_allowed(client, admin_token)
+            if reopen is None:
+                return
+            if reopen:
+                client.deny_submissions(admin_token)
+
+        try:
+            if users:
+                asyncio.run(run(args, token_store, recorder, metrics, admin_token, users))
+        finally:
+            if reopen:
+                client.allow_submissions(admin_token)
+
+
+if __name__ == "__main__":
+    main()
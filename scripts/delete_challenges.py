@@ -1,27 +1,43 @@
-import requests  # type: ignore
-import json
 import argparse
-
-# Sample command: python delete_categories.py --admin-password "PwneuPwneu!1" --api-url "http://localhost:37100"
-
-def login_admin(api_url, admin_password):
-    login_payload = {"userName": "admin", "password": admin_password}
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-
-    if response.status_code == 200:
-        access_token = response.json().get('accessToken')
-        print("Admin logged in successfully. Access token retrieved.")
-        return access_token
-    else:
-        print(f"Failed to log in admin. Status code: {response.status_code}, Response: {response.text}")
-        return None
-
-
-def deny_submissions(api_url, access_token):
-    allow_payload = {"allowed": True}
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    response = requests.put(f"{api_url}/play/configurations/submissionsAllowed/deny", data=json.dumps(allow_payload), headers=headers)
+import concurrent.futures
+import csv
+import io
+import sys
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    login_admin,
+    fetch_all_categories,
+    fetch_all_challenge_ids,
+    fetch_all_members,
+    fetch_all_access_keys,
+)
+
+# Sample command: python delete_challenges.py --admin-password "PwneuPwneu!1" --api-url "http://localhost:37100"
+# Full reset between benchmark runs: python delete_challenges.py --reset --concurrency 64
+#
+# --reset tears down everything the seeders create, in dependency order: access keys (so nobody
+# registers meanwhile), categories, then members, and then checks that nothing is left. Challenges
+# go with their category, and hints, artifacts, solves, submissions and hint usages with their
+# challenge (cascading deletes), so they are not deleted one by one: DeleteCategory,
+# DeleteChallenge and RemoveHint share one API-wide guard (IChallengePointsConcurrencyGuard), so
+# per-challenge and per-hint deletes could only run one at a time. A call that finds the guard busy
+# is turned away: with 400 AnotherProcessRunning from DeleteCategory and DeleteChallenge (and
+# UpdateChallenge and AllowSubmissions), but with a bare 429 from RemoveHint.
+# Categories are deleted sequentially, retrying while another guarded operation runs; access keys
+# and members have no such guard and are deleted with --concurrency requests in flight.
+
+GUARD_RETRIES = 20
+GUARD_RETRY_DELAY = 0.5
+ALREADY_DELETED = {"DeleteAccessKey.NotFound", "DeleteCategory.NotFound", "DeleteUser.NotFound"}
+
+
+def deny_submissions(client, access_token):
+    response = client.deny_submissions(access_token)
 
     if response.status_code == 204:
         print("Submissions denied successfully.")
@@ -29,9 +45,8 @@ def deny_submissions(api_url, access_token):
         print(f"Failed to deny submissions. Status code: {response.status_code}, Response: {response.text}")
 
 
-def unlock_challenges(api_url, access_token):
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.put(f"{api_url}/play/configurations/challengesLocked/unlock", headers=headers)
+def unlock_challenges(client, access_token):
+    response = client.unlock_challenges(access_token)
 
     if response.status_code == 204:
         print(f"Challenges unlocked")
@@ -41,51 +56,125 @@ def unlock_challenges(api_url, access_token):
         return False
 
 
-def fetch_all_categories(api_url, access_token):
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.get(f"{api_url}/play/categories/all", headers=headers)
-
-    if response.status_code == 200:
-        categories = response.json()
-        print(f"Total categories retrieved: {len(categories)}")
-        return categories
-    else:
-        print(f"Failed to fetch categories. Status code: {response.status_code}, Response: {response.text}")
-        return []
-
+def error_code(response):
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("code") if isinstance(body, dict) else None
+
+
+def delete_item(events, phase, item_id, delete):
+    # Returns True once the item is gone. Items deleted by someone else (or an earlier, interrupted
+    # reset) count as deleted.
+    for attempt in range(GUARD_RETRIES + 1):
+        try:
+            response = delete(item_id)
+        except Exception as e:
+            events.record(phase, False, "error", f"Failed to delete {phase} item with ID {item_id}. Error: {e}", id=item_id)
+            return False
+
+        if response.status_code == 204:
+            events.record(phase, True, message=f"Deleted {phase} item with ID {item_id}.", id=item_id)
+            return True
+        code = error_code(response)
+        if code in ALREADY_DELETED:
+            events.record(phase, True, "already deleted", f"{phase} item with ID {item_id} was already deleted.", id=item_id)
+            return True
+        if code == "Error.AnotherProcessRunning" and attempt < GUARD_RETRIES:
+            time.sleep(GUARD_RETRY_DELAY)
+            continue
+        events.record(phase, False, response.status_code,
+                      f"Failed to delete {phase} item with ID {item_id}. Status code: {response.status_code}, Response: {response.text}",
+                      id=item_id)
+        return False
 
-def delete_category(api_url, access_token, category_id):
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.delete(f"{api_url}/play/categories/{category_id}", headers=headers)
 
-    if response.status_code == 204:
-        print(f"Category with ID {category_id} deleted successfully.")
+def delete_tier(events, phase, item_ids, delete, concurrency):
+    events.start_phase(phase, len(item_ids))
+    if concurrency <= 1:
+        deleted = sum(delete_item(events, phase, item_id, delete) for item_id in item_ids)
     else:
-        print(f"Failed to delete category with ID {category_id}. Status code: {response.status_code}, Response: {response.text}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            deleted = sum(executor.map(lambda item_id: delete_item(events, phase, item_id, delete), item_ids))
+    events.finish_phase(phase)
+    return deleted
+
+
+def count_remaining(client, access_token):
+    # Counts straight from the responses, so a failed listing shows up as unknown rather than empty.
+    listings = {
+        "access keys": (client.get_access_keys, lambda response: len(response.json())),
+        "categories": (client.get_all_categories, lambda response: len(response.json())),
+        "challenges": (client.get_all_challenge_ids, lambda response: len(response.json())),
+        "members": (client.export_members, lambda response: sum(1 for _ in csv.DictReader(io.StringIO(response.text)))),
+    }
+    remaining = {}
+    for name, (fetch, count) in listings.items():
+        response = fetch(access_token)
+        remaining[name] = count(response) if response.status_code == 200 else f"unknown (status {response.status_code})"
+    return remaining
+
+
+def reset(client, events, access_token, concurrency):
+    started_at = time.perf_counter()
+    access_keys = fetch_all_access_keys(client, access_token)
+    categories = fetch_all_categories(client, access_token)
+    challenge_ids = fetch_all_challenge_ids(client, access_token)
+    members = fetch_all_members(client, access_token)
+    print(f"Teardown plan: {len(access_keys)} access keys ({concurrency} at a time), {len(categories)} categories one at a time "
+          f"(taking {len(challenge_ids)} challenges with their hints and artifacts), {len(members)} members ({concurrency} at a time).")
+
+    def delete_member(user_id):
+        response = client.delete_user(access_token, user_id)
+        # Cached tokens of a deleted user would only be answered with 401 from now on.
+        if response.status_code == 204 and client.token_store:
+            client.token_store.remove(client.api_url, members[user_id])
+        return response
+
+    delete_tier(events, "access keys", [access_key["id"] for access_key in access_keys],
+                lambda key_id: client.delete_access_key(access_token, key_id), concurrency)
+    delete_tier(events, "categories", [category["id"] for category in categories],
+                lambda category_id: client.delete_category(access_token, category_id), 1)
+    delete_tier(events, "members", list(members), delete_member, concurrency)
+
+    remaining = count_remaining(client, access_token)
+    elapsed = time.perf_counter() - started_at
+    left = {name: count for name, count in remaining.items() if count != 0}
+    if left:
+        print(f"Reset incomplete after {elapsed:.1f}s. Remaining: " + ", ".join(f"{name}: {count}" for name, count in left.items()))
+        return False
+    print(f"Reset finished in {elapsed:.1f}s: no access keys, categories, challenges (so no hints) or members remain.")
+    return True
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Delete categories via API.")
-    parser.add_argument("--admin-password", type=str, default="PwneuPwneu!1", help="Password for the admin user.")
-    parser.add_argument("--api-url", type=str, default="http://localhost:37100/api/v1", help="Base URL for the API.")
+    parser = argparse.ArgumentParser(description="Delete categories via API, or reset every seeded entity with --reset.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--reset", action="store_true", help="Also delete access keys and members, then verify nothing is left.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Parallel DELETE requests for access keys and members.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
     args = parser.parse_args()
 
-    api_url = args.api_url
-
-    access_token = login_admin(api_url, args.admin_password)
+    with client_from_args(args) as client, event_sink_from_args(args) as events:
+        access_token = login_admin(client, args.admin_password)
 
-    if access_token:
-        submissions_denied = deny_submissions(args.api_url, access_token)
-        challenges_unlocked = unlock_challenges(api_url, access_token)
+        if access_token:
+            deny_submissions(client, access_token)
+            challenges_unlocked = unlock_challenges(client, access_token)
 
-        if not challenges_unlocked:
-            return
+            if not challenges_unlocked:
+                return
 
-        categories = fetch_all_categories(api_url, access_token)
+            if args.reset:
+                if not reset(client, events, access_token, args.concurrency):
+                    sys.exit(1)
+                return
 
-        for category in categories:
-            category_id = category['id']
-            delete_category(api_url, access_token, category_id)
+            categories = fetch_all_categories(client, access_token)
+            delete_tier(events, "categories", [category["id"] for category in categories],
+                        lambda category_id: client.delete_category(access_token, category_id), 1)
 
 
 if __name__ == "__main__":
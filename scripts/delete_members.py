@@ -1,86 +1,105 @@
-import requests  # type: ignore
-import json
 import argparse
+import concurrent.futures
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    login_admin,
+    fetch_all_users,
+    fetch_all_members,
+)
 
 # Sample command: python delete_members.py --admin-password "PwneuPwneu!1" --api-url "http://localhost:37100"
+# Legacy per-user role check: python delete_members.py --mode login
 
-def login_admin(api_url, admin_password):
-    login_payload = {"userName": "admin", "password": admin_password}
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
+def check_user_role(client, events, user):
+    user_name = user['userName']
+    response = client.login(user_name, DEFAULT_PASSWORD)
 
     if response.status_code == 200:
-        access_token = response.json().get('accessToken')
-        print("Admin logged in successfully. Access token retrieved.")
-        return access_token
+        user_info = response.json()
+        is_member = "Member" in user_info.get("roles", [])
+        events.record("logins", True, None if is_member else "not a member", user=user_name)
+        if is_member:
+            return user['id']
     else:
-        print(f"Failed to log in admin. Status code: {response.status_code}, Response: {response.text}")
-        return None
+        events.record("logins", False, response.status_code,
+                      f"Failed to log in user '{user_name}'. Status code: {response.status_code}, Response: {response.text}",
+                      user=user_name)
+    return None
 
 
-def fetch_all_users(api_url, access_token):
-    users = []
-    page = 1
-    has_next_page = True
+def delete_user(client, events, access_token, user_id, user_name):
+    response = client.delete_user(access_token, user_id)
 
-    while has_next_page:
-        response = requests.get(f"{api_url}/identity/users?page={page}", headers={'Authorization': f'Bearer {access_token}'})
-        if response.status_code == 200:
-            data = response.json()
-            users.extend(data['items'])
-            has_next_page = data['hasNextPage']
-            page += 1
-        else:
-            print(f"Failed to fetch users. Status code: {response.status_code}, Response: {response.text}")
-            break
+    if response.status_code == 204:
+        # Cached tokens of a deleted user would only be answered with 401 from now on.
+        if client.token_store:
+            client.token_store.remove(client.api_url, user_name)
+        events.record("deletions", True, message=f"User with ID {user_id} deleted successfully.", user_id=user_id)
+        return True
+    else:
+        events.record("deletions", False, response.status_code,
+                      f"Failed to delete user with ID {user_id}. Status code: {response.status_code}, Response: {response.text}",
+                      user_id=user_id)
+        return False
 
-    print(f"Total users retrieved: {len(users)}")
-    return users
 
+def delete_users_concurrently(client, events, access_token, members, concurrency):
+    total = len(members)
+    deleted = 0
+    failed = 0
 
-def check_user_role(api_url, user):
-    user_name = user['userName']
-    login_payload = {"userName": user_name, "password": "PwneuPwneu!1"}  
-    headers = {'Content-Type': 'application/json'}
+    events.start_phase("deletions", total)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(delete_user, client, events, access_token, user_id, user_name): user_id for user_id, user_name in members.items()}
 
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                succeeded = future.result()
+            except Exception as e:
+                events.record("deletions", False, "error", f"Failed to delete user with ID {futures[future]}. Error: {e}",
+                              user_id=futures[future])
+                succeeded = False
 
-    if response.status_code == 200:
-        user_info = response.json()
-        if "Member" in user_info.get("roles", []):
-            return user['id']  
-    else:
-        print(f"Failed to log in user '{user_name}'. Status code: {response.status_code}, Response: {response.text}")
-    return None
+            if succeeded:
+                deleted += 1
+            else:
+                failed += 1
+    events.finish_phase("deletions")
 
-
-def delete_user(api_url, access_token, user_id):
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.delete(f"{api_url}/identity/users/{user_id}", headers=headers)
-
-    if response.status_code == 204:
-        print(f"User with ID {user_id} deleted successfully.")
-    else:
-        print(f"Failed to delete user with ID {user_id}. Status code: {response.status_code}, Response: {response.text}")
+    print(f"Deleted {deleted} of {total} members. Failures: {failed}.")
+    return deleted, failed
 
 
 def main():
     parser = argparse.ArgumentParser(description="Delete members via API.")
-    parser.add_argument("--admin-password", type=str, default="PwneuPwneu!1", help="Password for the admin user.")
-    parser.add_argument("--api-url", type=str, default="http://localhost:37100/api/v1", help="Base URL for the API.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--mode", choices=["export", "login"], default="export", help="How members are found: the admin members export, or logging in as every user.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel DELETE requests in export mode.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
     args = parser.parse_args()
 
-    api_url = args.api_url
+    with client_from_args(args) as client, event_sink_from_args(args) as events:
+        access_token = login_admin(client, args.admin_password)
+
+        if not access_token:
+            return
 
-    access_token = login_admin(api_url, args.admin_password)
+        if args.mode == "export":
+            members = fetch_all_members(client, access_token)
+            delete_users_concurrently(client, events, access_token, members, args.concurrency)
+            return
 
-    if access_token:
-        users = fetch_all_users(api_url, access_token)
+        users = fetch_all_users(client, access_token)
 
         for user in users:
-            user_id = check_user_role(api_url, user)
+            user_id = check_user_role(client, events, user)
             if user_id:
-                delete_user(api_url, access_token, user_id)
+                delete_user(client, events, access_token, user_id, user['userName'])
 
 
 if __name__ == "__main__":
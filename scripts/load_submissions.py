@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import random
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    client_from_args,
+    token_store_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    login_user_async,
+    fetch_all_users,
+    fetch_all_challenge_ids,
+)
+from pwneu_client.loadgen import LatencyRecorder, run_open_loop
+from pwneu_client.workers import run_workers, shard, share, worker_args
+
+# Sample command: python load_submissions.py --rate 200 --duration 60
+# Ramp from 50 to 500 submissions per second: python load_submissions.py --rate 50 --rate-end 500 --duration 120
+# Past what one process can send: python load_submissions.py --workers 8 --rate 5000 --max-connections 800
+#
+# With --workers N the members are logged in here and dealt out to N processes (see
+# pwneu_client/workers.py), each running its own open loop at 1/N of --rate (and --rate-end) with
+# 1/N of --max-connections and --max-in-flight. They start together, and their latency histograms
+# are merged into one report.
+
+# One class per FlagStatus, so rejections (attempt limits, deadlines, the recent-incorrect
+# throttle, closed submissions) aren't mistaken for wrong flags.
+FLAG_STATUSES = ["Correct", "Incorrect", "AlreadySolved", "MaxAttemptReached", "DeadlineReached",
+                 "SubmittingTooOften", "SubmissionsNotAllowed"]
+STATUS_CLASSES = FLAG_STATUSES + ["unknown", "429", "error"]
+CORRECT_FLAG = "PWNEU{PWNEU}"
+INCORRECT_FLAG = "INCORRECT_FLAG"
+
+
+def classify_submission(status_code, response_text):
+    if status_code == 200:
+        flag_status = response_text.strip('"')
+        return flag_status if flag_status in FLAG_STATUSES else "unknown"
+    if status_code == 429:
+        return "429"
+    return "error"
+
+
+async def login_users(client, users, password, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(user_name):
+        async with semaphore:
+            return user_name, await login_user_async(client, user_name, password)
+
+    results = await asyncio.gather(*(login(user['userName']) for user in users))
+    return {user_name: token for user_name, token in results if token}
+
+
+async def generate_load(client, args, tokens, challenge_ids, seed, rate, rate_end, max_connections, max_in_flight):
+    rng = random.Random(seed)
+    recorder = LatencyRecorder()
+
+    async def send(sequence):
+        # Users rotate round-robin so one user rarely has two submissions in flight,
+        # which SubmitFlag would reject with 429 through its per-user lock. One sender per
+        # pooled connection keeps requests from queueing inside the HTTP client.
+        access_token = tokens[sequence % len(tokens)]
+        challenge_id = rng.choice(challenge_ids)
+        flag = CORRECT_FLAG if rng.random() < args.correct_ratio else INCORRECT_FLAG
+        try:
+            response = await client.submit_flag(access_token, challenge_id, flag)
+        except Exception:
+            return "error"
+        return classify_submission(response.status_code, response.text)
+
+    await run_open_loop(send, recorder, rate, args.duration, rate_end, max_in_flight, max_connections)
+    return recorder
+
+
+async def run(args, token_store, recorder, metrics, users, challenge_ids):
+    async with AsyncPwneuClient(args.api_url, max_connections=args.max_connections, http2=args.http2, token_store=token_store,
+                                recorder=recorder, metrics=metrics) as client:
+        user_tokens = await login_users(client, users, args.user_password, args.max_connections)
+        if not user_tokens:
+            print("No member tokens available. Aborting.")
+            return
+        if args.workers > 1:
+            return user_tokens
+
+        print(f"Logged in {len(user_tokens)} users. Starting open-loop load.")
+        recorder = await generate_load(client, args, list(user_tokens.values()), challenge_ids, args.seed, args.rate, args.rate_end,
+                                       args.max_connections, args.max_in_flight)
+        recorder.print_report(STATUS_CLASSES)
+
+
+async def load_in_worker(index, args, users, tokens, challenge_ids, ready):
+    max_connections = share(args.max_connections, args.workers)
+    async with AsyncPwneuClient(args.api_url, max_connections=max_connections, http2=args.http2,
+                                recorder=trace_recorder_from_args(args), metrics=metrics_from_args(args)) as client:
+        # Lets a worker log a user in again if the parent's token is rejected.
+        client.credentials.update(dict.fromkeys(users, args.user_password))
+        ready()
+        recorder = await generate_load(client, args, tokens, challenge_ids, None if args.seed is None else args.seed + index,
+                                       args.rate / args.workers, None if args.rate_end is None else args.rate_end / args.workers,
+                                       max_connections, share(args.max_in_flight, args.workers))
+    return recorder.to_dict()
+
+
+def load_worker(index, payload, ready):
+    args, users, tokens, challenge_ids = payload
+    return asyncio.run(load_in_worker(index, worker_args(args, index), users, tokens, challenge_ids, ready))
+
+
+def run_sharded(args, user_tokens, challenge_ids):
+    user_names, tokens = list(user_tokens), list(user_tokens.values())
+    payloads = [(args, shard(user_names, args.workers, index), shard(tokens, args.workers, index), challenge_ids)
+                for index in range(args.workers)]
+    print(f"Logged in {len(tokens)} users. Starting open-loop load in {args.workers} workers.")
+    results = run_workers(load_worker, payloads)
+    if not results:
+        return
+
+    recorder = LatencyRecorder()
+    for result in results:
+        recorder.merge(LatencyRecorder.from_dict(result))
+    print(f"Merged from {len(results)} workers:")
+    recorder.print_report(STATUS_CLASSES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop SubmitFlag load generator.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the seeded members.")
+    parser.add_argument("--rate", type=float, default=100, help="Submissions per second (ramp start when --rate-end is set).")
+    parser.add_argument("--rate-end", type=float, default=None, help="Submissions per second at the end of a linear ramp.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load for.")
+    parser.add_argument("--users-limit", type=int, default=None, help="Maximum number of members to submit as.")
+    parser.add_argument("--correct-ratio", type=float, default=0.1, help="Fraction of submissions that use the correct flag.")
+    parser.add_argument("--max-connections", type=int, default=100, help="Size of the async connection pool and number of concurrent senders.")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Arrivals beyond this many pending (sending or queued) requests are counted as dropped.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for challenge and flag selection.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes sharing the load, each pinned to a core.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    token_store = token_store_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with client_from_args(args, token_store, recorder=recorder, metrics=metrics) as client:
+        access_token = login_admin(client, args.admin_password)
+
+        if not access_token:
+            return
+
+        client.allow_submissions(access_token)
+        challenge_ids = fetch_all_challenge_ids(client, access_token)
+        users = fetch_all_users(client, access_token)[:args.users_limit]
+
+    if challenge_ids and users:
+        user_tokens = asyncio.run(run(args, token_store, recorder, metrics, users, challenge_ids))
+        if user_tokens:
+            run_sharded(args, user_tokens, challenge_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1040 @@
+import argparse
+import asyncio
+import base64
+import csv
+import hashlib
+import io
+import json
+import random
+import re
+import resource
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+from pwneu_client import DEFAULT_PASSWORD, encode_json
+from pwneu_client.ratelimit import PRODUCTION_POLICIES, policy_for
+
+# Sample command: python mock_api.py --latency 5 --latency-jitter 5 --throttle-rate 0.01
+# In-memory stand-in for the routes the scripts use, listening where the scripts expect the API
+# (http://localhost:37100/api/v1). Response shapes and the rules that matter to the scripts
+# (access keys, email verification, per-user submission locks, flag statuses, hint deductions,
+# leaderboard ordering) follow the real handlers; there is no Postgres, Redis or SMTP behind it.
+
+API_PREFIX = "/api/v1/"
+ACCESS_TOKEN_SECONDS = 15 * 60
+REFRESH_TOKEN_SECONDS = 7 * 24 * 60 * 60
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+HUB_PATH = "announcements"
+RECORD_SEPARATOR = "\x1e"
+MAX_RECENT_INCORRECT_SUBMISSIONS = 5
+RECENT_SUBMISSION_SECONDS = 30
+# Kestrel's default MaxRequestBodySize; AddArtifact's own 30 MiB check is never reached.
+MAX_REQUEST_BODY_SIZE = 30_000_000
+
+REASONS = {
+    200: "OK",
+    101: "Switching Protocols",
+    201: "Created",
+    204: "No Content",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, code=None, message=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _parse_iso(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def _base64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def make_token(user, seconds):
+    # Shaped like the API's JWTs (name, sub and role claims) so the client can read them, but
+    # signed with random bytes: only this server's token table can validate them.
+    now = int(time.time())
+    claims = {"name": user["userName"], "sub": user["id"], "role": user["roles"], "jti": secrets.token_hex(8), "exp": now + seconds}
+    header = _base64url(b'{"alg":"http://www.w3.org/2001/04/xmldsig-more#hmac-sha256","typ":"JWT"}')
+    return f"{header}.{_base64url(encode_json(claims))}.{_base64url(secrets.token_bytes(32))}"
+
+
+def _page(items, page, page_size, max_page_size):
+    page = max(1, int(page or 1))
+    page_size = min(int(page_size or 10), max_page_size)
+    start = (page - 1) * page_size
+    return {
+        "items": items[start:start + page_size],
+        "page": page,
+        "pageSize": page_size,
+        "totalCount": len(items),
+        "hasNextPage": page * page_size < len(items),
+        "hasPreviousPage": page > 1,
+    }
+
+
+def _flag(query, name):
+    return query.get(name, "").lower() == "true"
+
+
+class MockApi:
+    def __init__(self, admin_password=DEFAULT_PASSWORD, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, enforce_rate_limits=False, seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.enforce_rate_limits = enforce_rate_limits
+        self.rng = random.Random(seed)
+        self.windows = {}
+        self.busy_users = set()
+        self.guard_busy = False
+        self.served = 0
+        self.route_requests = {}
+
+        self.users = {}
+        self.user_ids_by_name = {}
+        self.user_ids_by_email = {}
+        self.access_tokens = {}
+        self.refresh_tokens = {}
+        self.access_keys = {}
+        self.categories = {}
+        self.challenges = {}
+        self.hints = {}
+        self.artifacts = {}
+        self.solves = {}
+        self.solve_points = {}
+        self.hint_usages = {}
+        self.attempts = {}
+        self.recent_incorrect = {}
+        self.submissions_allowed = True
+        self.hub_connections = {}
+        self.pending_hub_connections = set()
+        self.challenges_locked = False
+        self.ranked = None
+
+        admin = self._add_user("admin", "admin@localhost", admin_password, "Admin", ["Admin", "Manager"], visible=False)
+        admin["emailConfirmed"] = True
+
+        # Routes are bucketed by method and segment count, so a request only tries the two or
+        # three patterns that could match instead of scanning the whole table.
+        self.routes = {}
+        for method, pattern, handler, auth, exclusive in [
+                ("POST", "identity/login", self.login, None, False),
+                ("GET", "identity/refresh", self.refresh, None, False),
+                ("POST", "identity/register", self.register, None, False),
+                ("GET", "identity/users", self.get_users, "manager", False),
+                ("PUT", "identity/users/(?P<user_id>[^/]+)/verify", self.verify_user, "manager", False),
+                ("DELETE", "identity/users/(?P<user_id>[^/]+)", self.delete_user, "manager", False),
+                ("GET", "identity/members/export", self.export_members, "manager", False),
+                ("POST", "identity/keys", self.create_access_key, "manager", False),
+                ("GET", "identity/keys", self.get_access_keys, "manager", False),
+                ("DELETE", "identity/keys/(?P<key_id>[^/]+)", self.delete_access_key, "manager", False),
+                ("GET", "play/configurations", self.get_configurations, "manager", False),
+                ("PUT", "play/configurations/submissionsAllowed/(?P<action>allow|deny)", self.set_submissions_allowed, "manager", False),
+                ("PUT", "play/configurations/challengesLocked/(?P<action>lock|unlock)", self.set_challenges_locked, "manager", False),
+                ("GET", "play/categories/all", self.get_all_categories, "user", False),
+                ("POST", "play/categories", self.create_category, "manager", False),
+                ("DELETE", "play/categories/(?P<category_id>[^/]+)", self.delete_category, "manager", False),
+                ("POST", "play/categories/(?P<category_id>[^/]+)/challenges", self.create_challenge, "manager", False),
+                ("GET", "play/challenges", self.get_challenges, "user", False),
+                ("GET", "play/challenges/all", self.get_all_challenge_ids, "user", False),
+                ("GET", "play/challenges/(?P<challenge_id>[^/]+)", self.get_challenge, "user", False),
+                ("PUT", "play/challenges/(?P<challenge_id>[^/]+)", self.update_challenge, "manager", False),
+                ("DELETE", "play/challenges/(?P<challenge_id>[^/]+)", self.delete_challenge, "manager", False),
+                ("GET", "play/challenges/(?P<challenge_id>[^/]+)/flags", self.get_challenge_flags, "manager", False),
+                ("POST", "play/challenges/(?P<challenge_id>[^/]+)/hints", self.add_hint, "manager", False),
+                ("GET", "play/challenges/(?P<challenge_id>[^/]+)/hints", self.get_challenge_hints, "manager", False),
+                ("DELETE", "play/hints/(?P<hint_id>[^/]+)", self.remove_hint, "manager", False),
+                ("POST", "play/challenges/(?P<challenge_id>[^/]+)/artifacts", self.add_artifact, "manager", False),
+                ("GET", "play/artifacts/(?P<artifact_id>[^/]+)", self.get_artifact, "user", False),
+                ("DELETE", "play/artifacts/(?P<artifact_id>[^/]+)", self.delete_artifact, "manager", False),
+                ("POST", "play/hints/(?P<hint_id>[^/]+)", self.use_hint, "member", True),
+                ("POST", "play/challenges/(?P<challenge_id>[^/]+)/submit", self.submit_flag, "member", True),
+                ("GET", "play/users/(?P<user_id>[^/]+)/data", self.get_user_play_data, "manager", False),
+                ("GET", "play/leaderboards", self.get_leaderboards, "user", False),
+                ("GET", "play/me/rank", self.get_my_rank, "user", False),
+                ("GET", "play/me/graph", self.get_my_graph, "user", False),
+                ("GET", "play/me/solves", self.get_my_solves, "member", False),
+                ("GET", "play/me/hintUsages", self.get_my_hint_usages, "member", False),
+                ("DELETE", "play/leaderboards/recalculate", self.recalculate_leaderboards, "admin", False),
+                ("POST", "play/leaderboards/clear", self.clear_leaderboards_cache, "admin", False),
+                ("POST", "announcements/negotiate", self.negotiate_hub, "user", False),
+                ("POST", "announcements", self.announce, "admin", False),
+                ("GET", "announcements/count", self.count_online_users, "manager", False),
+        ]:
+            segments = re.sub(r"\(\?P<\w+>[^)]*\)", "{}", pattern).count("/")
+            self.routes.setdefault((method, segments), []).append((re.compile(f"^{pattern}$"), handler, auth, exclusive))
+        # Handlers behind IChallengePointsConcurrencyGuard: one at a time API-wide, and a request
+        # that finds another one running is answered with 400 AnotherProcessRunning (a bare 429 from
+        # RemoveHint) instead of waiting.
+        self.guarded = {self.update_challenge, self.delete_challenge, self.remove_hint, self.delete_category}
+
+    # State helpers
+
+    def _add_user(self, user_name, email, password, full_name, roles, visible=True):
+        user = {
+            "id": str(uuid.uuid4()),
+            "userName": user_name,
+            "fullName": full_name,
+            "email": email,
+            "password": password,
+            "roles": roles,
+            "createdAt": time.time(),
+            "emailConfirmed": False,
+            "isVisibleOnLeaderboards": visible,
+            "points": 0,
+            "latestSolve": 0.0,
+            "activities": [],
+            "solvedChallengeIds": set(),
+            "usedHintIds": set(),
+        }
+        self.users[user["id"]] = user
+        self.user_ids_by_name[user_name] = user["id"]
+        self.user_ids_by_email[email] = user["id"]
+        return user
+
+    def _add_points(self, user, delta, occurred_at, solved=False):
+        user["points"] += delta
+        self.ranked = None
+        user["activities"].append((occurred_at, user["points"]))
+        if solved:
+            user["latestSolve"] = occurred_at
+
+    def _token_response(self, user):
+        access_token = make_token(user, ACCESS_TOKEN_SECONDS)
+        self.access_tokens[access_token] = (user["id"], time.time() + ACCESS_TOKEN_SECONDS)
+        return {"id": user["id"], "userName": user["userName"], "roles": user["roles"], "accessToken": access_token}
+
+    def _challenge(self, challenge_id):
+        challenge = self.challenges.get(challenge_id)
+        if challenge is None:
+            raise ApiError(404, "Challenge.NotFound", "The challenge with the specified ID was not found")
+        return challenge
+
+    @staticmethod
+    def _json_body(request):
+        try:
+            return json.loads(request["body"] or b"null") or {}
+        except ValueError:
+            raise ApiError(400)
+
+    # Identity
+
+    def login(self, request):
+        body = self._json_body(request)
+        user = self.users.get(self.user_ids_by_name.get(body.get("userName")))
+        if user is None or user["password"] != body.get("password"):
+            raise ApiError(400, "Login.Invalid", "Incorrect username or password")
+        if not user["emailConfirmed"]:
+            raise ApiError(400, "Login.EmailNotConfirmed", "Email is not confirmed")
+
+        refresh_token = make_token(user, REFRESH_TOKEN_SECONDS)
+        self.refresh_tokens[refresh_token] = (user["id"], time.time() + REFRESH_TOKEN_SECONDS)
+        cookie = f"refreshToken={refresh_token}; expires={_iso(time.time() + REFRESH_TOKEN_SECONDS)}; path=/; secure; samesite=strict; httponly"
+        return 200, self._token_response(user), {"Set-Cookie": cookie}
+
+    def refresh(self, request):
+        match = re.search(r"refreshToken=([^;\s]+)", request["headers"].get("cookie", ""))
+        user_id, expires_at = self.refresh_tokens.get(match.group(1) if match else None, (None, 0))
+        if user_id not in self.users or expires_at < time.time():
+            raise ApiError(400, "Refresh.Invalid", "Invalid refresh token")
+        return 200, self._token_response(self.users[user_id])
+
+    def register(self, request):
+        body = self._json_body(request)
+        access_key = self.access_keys.get(body.get("accessKey"))
+        if access_key is None or access_key["expiration"] < time.time():
+            raise ApiError(400, "Register.InvalidAccessKey", "Invalid access key")
+        if not body.get("userName") or not body.get("email") or not body.get("password"):
+            raise ApiError(400, "Register.Validation", "Username, email and password are required.")
+        if body["userName"] in self.user_ids_by_name:
+            raise ApiError(400, "Register.UserNameInUse", "Username is already in use")
+        if body["email"] in self.user_ids_by_email:
+            raise ApiError(400, "Register.EmailInUse", "Email is already in use")
+
+        roles = ["Manager"] if access_key["forManager"] else ["Member"]
+        self._add_user(body["userName"], body["email"], body["password"], body.get("fullName", ""), roles,
+                       visible=not access_key["forManager"])
+        if not access_key["canBeReused"]:
+            del self.access_keys[access_key["id"]]
+        return 201, None
+
+    def get_users(self, request):
+        query = request["query"]
+        users = list(self.users.values())
+        if _flag(query, "excludeVerified"):
+            users = [user for user in users if not user["emailConfirmed"]]
+        if _flag(query, "excludeVisibleOnLeaderboards"):
+            users = [user for user in users if not user["isVisibleOnLeaderboards"]]
+        search_term = query.get("searchTerm", "").lower()
+        if search_term:
+            users = [user for user in users if any(search_term in user[field].lower() for field in ("userName", "email", "fullName", "id"))]
+
+        sort_field = {"username": "userName", "fullname": "fullName", "email": "email"}.get(query.get("sortBy", "").lower(), "createdAt")
+        users.sort(key=lambda user: user[sort_field], reverse=query.get("sortOrder", "").lower() == "desc")
+
+        page = _page(users, query.get("page"), query.get("pageSize"), 50)
+        page["items"] = [
+            {
+                "id": user["id"],
+                "userName": user["userName"],
+                "fullName": user["fullName"],
+                "createdAt": _iso(user["createdAt"]),
+                "email": user["email"],
+                "emailConfirmed": user["emailConfirmed"],
+                "isVisibleOnLeaderboards": user["isVisibleOnLeaderboards"],
+                "roles": [],
+            }
+            for user in page["items"]
+        ]
+        return 200, page
+
+    def verify_user(self, request, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            raise ApiError(400, "VerifyUser.NotFound", "The user with the specified ID was not found")
+        user["emailConfirmed"] = True
+        return 204, None
+
+    def delete_user(self, request, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            raise ApiError(400, "DeleteUser.NotFound", "The user with the specified ID was not found")
+        if "Admin" in user["roles"]:
+            raise ApiError(400, "DeleteUser.AdminDelete", "Admin cannot be deleted")
+        del self.users[user_id]
+        del self.user_ids_by_name[user["userName"]]
+        del self.user_ids_by_email[user["email"]]
+        for challenge_id in user["solvedChallengeIds"]:
+            self.solves.pop((user_id, challenge_id), None)
+            self.solve_points.pop((user_id, challenge_id), None)
+        for hint_id in user["usedHintIds"]:
+            self.hint_usages.pop((user_id, hint_id), None)
+        self.ranked = None
+        return 204, None
+
+    def export_members(self, request):
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["Id", "Fullname", "Username", "Email", "Points"])
+        for user in self.users.values():
+            if "Manager" not in user["roles"]:
+                writer.writerow([user["id"], user["fullName"], user["userName"], user["email"], user["points"]])
+        return 200, output.getvalue().encode(), {"Content-Type": "text/csv", "Content-Disposition": "attachment; filename=members.csv"}
+
+    def create_access_key(self, request):
+        body = self._json_body(request)
+        key_id = str(uuid.uuid4())
+        self.access_keys[key_id] = {
+            "id": key_id,
+            "forManager": bool(body.get("forManager")),
+            "canBeReused": bool(body.get("canBeReused")),
+            "expiration": _parse_iso(body.get("expiration")),
+        }
+        return 200, key_id
+
+    def get_access_keys(self, request):
+        return 200, [dict(access_key, expiration=_iso(access_key["expiration"])) for access_key in self.access_keys.values()]
+
+    def delete_access_key(self, request, key_id):
+        if self.access_keys.pop(key_id, None) is None:
+            raise ApiError(404, "DeleteAccessKey.NotFound", "The access key with the specified ID was not found")
+        return 204, None
+
+    # Play
+
+    def get_configurations(self, request):
+        # Values are JSON-serialized, as ConfigurationExtensions.SetConfigurationValueAsync stores them.
+        return 200, [{"key": "SubmissionsAllowed", "value": json.dumps(self.submissions_allowed)},
+                     {"key": "ChallengesLocked", "value": json.dumps(self.challenges_locked)}]
+
+    def set_submissions_allowed(self, request, action):
+        self.submissions_allowed = action == "allow"
+        return 204, None
+
+    def set_challenges_locked(self, request, action):
+        self.challenges_locked = action == "lock"
+        return 204, None
+
+    def get_all_categories(self, request):
+        counts = {}
+        for challenge in self.challenges.values():
+            counts[challenge["categoryId"]] = counts.get(challenge["categoryId"], 0) + 1
+        return 200, [{"id": category["id"], "name": category["name"], "challengesCount": counts.get(category["id"], 0)}
+                     for category in self.categories.values()]
+
+    def create_category(self, request):
+        body = self._json_body(request)
+        if not body.get("name"):
+            raise ApiError(400, "CreateCategory.Validation", "Name is required.")
+        category_id = str(uuid.uuid4())
+        self.categories[category_id] = {"id": category_id, "name": body["name"], "description": body.get("description", "")}
+        return 200, category_id
+
+    def delete_category(self, request, category_id):
+        if self.submissions_allowed:
+            raise ApiError(400, "DeleteCategory.NotAllowed", "Not allowed to delete categories when submissions are enabled")
+        if self.categories.pop(category_id, None) is None:
+            raise ApiError(404, "DeleteCategory.NotFound", "The category with the specified ID was not found")
+        for challenge_id in [challenge["id"] for challenge in self.challenges.values() if challenge["categoryId"] == category_id]:
+            self._remove_challenge(challenge_id)
+        return 204, None
+
+    def create_challenge(self, request, category_id):
+        if category_id not in self.categories:
+            raise ApiError(400, "CreateChallenge.CategoryNotFound", "The category with the specified ID was not found")
+        body = self._json_body(request)
+        if not body.get("name") or not body.get("flags"):
+            raise ApiError(400, "CreateChallenge.Validation", "Name and at least one flag are required.")
+        challenge_id = str(uuid.uuid4())
+        self.challenges[challenge_id] = {
+            "id": challenge_id,
+            "categoryId": category_id,
+            "name": body["name"],
+            "description": body.get("description", ""),
+            "points": int(body.get("points", 0)),
+            "deadlineEnabled": bool(body.get("deadlineEnabled")),
+            "deadline": _parse_iso(body.get("deadline")),
+            "maxAttempts": int(body.get("maxAttempts", 0)),
+            "tags": list(body.get("tags", [])),
+            "flags": list(body["flags"]),
+            "solveCount": 0,
+            "hintIds": [],
+            "artifactIds": [],
+        }
+        return 200, challenge_id
+
+    def _challenge_response(self, challenge):
+        return {
+            "id": challenge["id"],
+            "name": challenge["name"],
+            "description": challenge["description"],
+            "points": challenge["points"],
+            "deadlineEnabled": challenge["deadlineEnabled"],
+            "deadline": _iso(challenge["deadline"]),
+            "solveCount": challenge["solveCount"],
+        }
+
+    def get_challenges(self, request):
+        query = request["query"]
+        challenges = list(self.challenges.values())
+        if query.get("categoryId"):
+            challenges = [challenge for challenge in challenges if challenge["categoryId"] == query["categoryId"]]
+        if _flag(query, "excludeSolves"):
+            user_id = request["user"]["id"]
+            challenges = [challenge for challenge in challenges if (user_id, challenge["id"]) not in self.solves]
+        search_term = query.get("searchTerm", "").lower()
+        if search_term:
+            challenges = [challenge for challenge in challenges if any(search_term in challenge[field].lower() for field in ("name", "description", "id"))]
+
+        sort_field = {"points": "points", "deadline": "deadline", "solves": "solveCount", "solvecount": "solveCount", "name": "name"}.get(
+            query.get("sortBy", "").lower(), "id")
+        challenges.sort(key=lambda challenge: challenge[sort_field], reverse=query.get("sortOrder", "").lower() == "desc")
+
+        page = _page(challenges, query.get("page"), query.get("pageSize"), 20)
+        page["items"] = [self._challenge_response(challenge) for challenge in page["items"]]
+        return 200, page
+
+    def get_all_challenge_ids(self, request):
+        return 200, list(self.challenges)
+
+    def get_challenge(self, request, challenge_id):
+        challenge = self._challenge(challenge_id)
+        response = self._challenge_response(challenge)
+        response.update({
+            "categoryId": challenge["categoryId"],
+            "categoryName": self.categories[challenge["categoryId"]]["name"],
+            "maxAttempts": challenge["maxAttempts"],
+            "tags": challenge["tags"],
+            "artifacts": [{"id": artifact_id, "fileName": self.artifacts[artifact_id]["fileName"]} for artifact_id in challenge["artifactIds"]],
+            "hints": [{"id": hint_id, "deduction": self.hints[hint_id]["deduction"]} for hint_id in challenge["hintIds"]],
+        })
+        return 200, response
+
+    def get_challenge_flags(self, request, challenge_id):
+        return 200, list(self._challenge(challenge_id)["flags"])
+
+    def update_challenge(self, request, challenge_id):
+        challenge = self._challenge(challenge_id)
+        body = self._json_body(request)
+        for field in ("name", "description", "points", "deadlineEnabled", "maxAttempts", "tags", "flags"):
+            if field in body:
+                challenge[field] = body[field]
+        if "deadline" in body:
+            challenge["deadline"] = _parse_iso(body["deadline"])
+        return 204, None
+
+    def _remove_challenge(self, challenge_id):
+        challenge = self.challenges.pop(challenge_id)
+        for hint_id in challenge["hintIds"]:
+            del self.hints[hint_id]
+        for artifact_id in challenge["artifactIds"]:
+            del self.artifacts[artifact_id]
+
+    def delete_challenge(self, request, challenge_id):
+        if self.submissions_allowed:
+            raise ApiError(400, "DeleteChallenge.NotAllowed", "Not allowed to delete challenges when submissions are enabled")
+        self._challenge(challenge_id)
+        self._remove_challenge(challenge_id)
+        return 204, None
+
+    def add_hint(self, request, challenge_id):
+        if challenge_id not in self.challenges:
+            raise ApiError(400, "AddHint.ChallengeNotFound", "The challenge with the specified ID was not found")
+        body = self._json_body(request)
+        hint_id = str(uuid.uuid4())
+        self.hints[hint_id] = {"id": hint_id, "challengeId": challenge_id, "content": body.get("content", ""), "deduction": int(body.get("deduction", 0))}
+        self.challenges[challenge_id]["hintIds"].append(hint_id)
+        return 200, hint_id
+
+    def get_challenge_hints(self, request, challenge_id):
+        return 200, [{"id": hint_id, "content": self.hints[hint_id]["content"], "deduction": self.hints[hint_id]["deduction"]}
+                     for hint_id in self._challenge(challenge_id)["hintIds"]]
+
+    def remove_hint(self, request, hint_id):
+        hint = self.hints.pop(hint_id, None)
+        if hint is None:
+            raise ApiError(404, "RemoveHint.NotFound", "The hint with the specified ID was not found")
+        self.challenges[hint["challengeId"]]["hintIds"].remove(hint_id)
+        return 204, None
+
+    def add_artifact(self, request, challenge_id):
+        # Only the single `file` part the endpoint binds is read.
+        boundary = request["headers"].get("content-type", "").partition("boundary=")[2].strip('"')
+        body = request["body"]
+        head_end = body.find(b"\r\n\r\n")
+        end = body.rfind(f"\r\n--{boundary}--".encode())
+        file_name = re.search(r'filename="([^"]*)"', body[:max(head_end, 0)].decode("latin-1"))
+        if not boundary or head_end < 0 or end < head_end or file_name is None:
+            raise ApiError(400)
+        if not file_name.group(1) or len(file_name.group(1)) > 100:
+            raise ApiError(400, "AddArtifact.Validation", "Filename must not exceed 100 characters.")
+        if challenge_id not in self.challenges:
+            raise ApiError(400, "AddArtifact.NoChallenge", "No challenge found")
+        content_type = re.search(r"content-type:\s*(\S+)", body[:head_end].decode("latin-1"), re.IGNORECASE)
+        artifact_id = str(uuid.uuid4())
+        self.artifacts[artifact_id] = {
+            "challengeId": challenge_id,
+            "fileName": file_name.group(1),
+            "contentType": content_type.group(1) if content_type else "application/octet-stream",
+            "data": body[head_end + 4:end],
+        }
+        self.challenges[challenge_id]["artifactIds"].append(artifact_id)
+        return 200, artifact_id
+
+    def get_artifact(self, request, artifact_id):
+        artifact = self.artifacts.get(artifact_id)
+        if artifact is None:
+            raise ApiError(404, "GetArtifact.NotFound", "The artifact with the specified ID was not found")
+        return 200, artifact["data"], {"Content-Type": artifact["contentType"],
+                                       "Content-Disposition": f'attachment; filename="{artifact["fileName"]}"'}
+
+    def delete_artifact(self, request, artifact_id):
+        artifact = self.artifacts.pop(artifact_id, None)
+        if artifact is None:
+            raise ApiError(400, "DeleteArtifact.NotFound", "The artifact with the specified ID was not found")
+        self.challenges[artifact["challengeId"]]["artifactIds"].remove(artifact_id)
+        return 204, None
+
+    def server_metrics(self):
+        # The process gauge the API's ProcessInstrumentation exports, for benchmarks that sample it.
+        try:
+            with open("/proc/self/statm") as file:
+                rss = int(file.read().split()[1]) * resource.getpagesize()
+        except OSError:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        text = ("# TYPE process_memory_usage_bytes gauge\n"
+                f"process_memory_usage_bytes {rss}\n")
+        # Request counts per route, like the ASP.NET Core instrumentation's duration histogram.
+        text += "# TYPE http_server_request_duration_seconds histogram\n"
+        for (method, route), count in sorted(self.route_requests.items()):
+            text += f'http_server_request_duration_seconds_count{{http_request_method="{method}",http_route="{route}"}} {count}\n'
+        return 200, text.encode(), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    def use_hint(self, request, hint_id):
+        user = request["user"]
+        if not self.submissions_allowed:
+            raise ApiError(400, "UseHint.NotAllowed", "Using hints is not allowed")
+        hint = self.hints.get(hint_id)
+        if hint is None:
+            raise ApiError(400, "UseHint.NotFound", "The hint with the specified ID was not found")
+        if (user["id"], hint["challengeId"]) in self.solves:
+            raise ApiError(400, "UseHint.ChallengeAlreadySolved", "The challenge has already been solved")
+        if (user["id"], hint_id) not in self.hint_usages:
+            now = time.time()
+            self.hint_usages[(user["id"], hint_id)] = now
+            user["usedHintIds"].add(hint_id)
+            self._add_points(user, -hint["deduction"], now)
+        return 200, hint["content"]
+
+    def submit_flag(self, request, challenge_id):
+        user = request["user"]
+        flag = request["query"].get("flag")
+        if not flag:
+            raise ApiError(400)
+        challenge = self.challenges.get(challenge_id)
+        if challenge is None:
+            raise ApiError(404, "SubmitFlag.ChallengeNotFound", "The challenge with the specified ID was not found")
+
+        key = (user["id"], challenge_id)
+        now = time.time()
+        if key in self.solves:
+            return 200, "AlreadySolved"
+        if not self.submissions_allowed:
+            return 200, "SubmissionsNotAllowed"
+        if challenge["deadlineEnabled"] and challenge["deadline"] < now:
+            return 200, "DeadlineReached"
+        if challenge["maxAttempts"] > 0 and self.attempts.get(key, 0) >= challenge["maxAttempts"]:
+            return 200, "MaxAttemptReached"
+        recent = [at for at in self.recent_incorrect.get(user["id"], []) if at > now - RECENT_SUBMISSION_SECONDS]
+        if len(recent) > MAX_RECENT_INCORRECT_SUBMISSIONS:
+            return 200, "SubmittingTooOften"
+
+        if flag in challenge["flags"]:
+            self.solves[key] = now
+            # Like SolveBuffer.Points, the award is fixed at solve time; a later UpdateChallenge
+            # doesn't change it.
+            self.solve_points[key] = challenge["points"]
+            user["solvedChallengeIds"].add(challenge_id)
+            challenge["solveCount"] += 1
+            self.recent_incorrect.pop(user["id"], None)
+            self._add_points(user, challenge["points"], now, solved=True)
+            return 200, "Correct"
+
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        self.recent_incorrect[user["id"]] = recent + [now]
+        return 200, "Incorrect"
+
+    def _rank_users(self):
+        ranked = sorted(
+            (user for user in self.users.values() if user["isVisibleOnLeaderboards"] and user["points"] > 0),
+            key=lambda user: (-user["points"], user["latestSolve"]),
+        )
+        user_ranks = [
+            {"id": user["id"], "userName": user["userName"], "position": position,
+             "points": user["points"], "latestSolve": _iso(user["latestSolve"])}
+            for position, user in enumerate(ranked, start=1)
+        ]
+        top_users_graph = [
+            {"userId": user["id"], "userName": user["userName"],
+             "activities": [{"score": score, "occurredAt": _iso(occurred_at)} for occurred_at, score in user["activities"]]}
+            for user in ranked[:10]
+        ]
+        return user_ranks, {rank["id"]: rank for rank in user_ranks}, top_users_graph
+
+    def get_user_play_data(self, request, user_id):
+        user = self.users.get(user_id)
+        if user is None:
+            raise ApiError(404, "GetUserPlayData.NotFound", "The user with the specified ID was not found")
+        return 200, {"id": user_id, "totalSolves": len(user["solvedChallengeIds"]), "totalHintUsages": len(user["usedHintIds"])}
+
+    def get_leaderboards(self, request):
+        # The ranking is only rebuilt after points change, like the API's cached leaderboard.
+        if self.ranked is None:
+            self.ranked = self._rank_users()
+        user_ranks, ranks_by_id, top_users_graph = self.ranked
+        if not user_ranks:
+            return 200, {"requesterRank": None, "userRanks": [], "topUsersGraph": None, "requesterIsMember": False,
+                         "publicLeaderboardCount": 0, "totalLeaderboardCount": 0}
+
+        user = request["user"]
+        is_member = "Member" in user["roles"]
+        count = request["query"].get("count")
+        return 200, {
+            "requesterRank": ranks_by_id.get(user["id"]) if is_member else None,
+            "userRanks": user_ranks[:max(int(count), 10)] if count and not is_member else user_ranks,
+            "topUsersGraph": top_users_graph,
+            "requesterIsMember": is_member,
+            "publicLeaderboardCount": 0,
+            "totalLeaderboardCount": len(user_ranks),
+        }
+
+    def get_my_rank(self, request):
+        if self.ranked is None:
+            self.ranked = self._rank_users()
+        user = request["user"]
+        rank = self.ranked[1].get(user["id"])
+        return 200, rank or {"id": user["id"], "userName": user["userName"], "position": 0,
+                             "points": user["points"], "latestSolve": _iso(user["latestSolve"])}
+
+    def get_my_graph(self, request):
+        user = request["user"]
+        return 200, {"userId": user["id"], "userName": user["userName"],
+                     "activities": [{"score": score, "occurredAt": _iso(occurred_at)} for occurred_at, score in user["activities"]]}
+
+    def get_my_solves(self, request):
+        # Served by GetUserGainedPoints: the member's solve activities, oldest first unless sortOrder=desc.
+        user = request["user"]
+        query = request["query"]
+        solves = sorted(((self.solves[(user["id"], challenge_id)], challenge_id) for challenge_id in user["solvedChallengeIds"]),
+                        reverse=query.get("sortOrder", "").lower() == "desc")
+        page = _page(solves, query.get("page"), query.get("pageSize"), 30)
+        page["items"] = [{"challengeId": challenge_id, "challengeName": self.challenges[challenge_id]["name"] if challenge_id in self.challenges else "",
+                          "points": self.solve_points[(user["id"], challenge_id)], "solvedAt": _iso(solved_at)}
+                         for solved_at, challenge_id in page["items"]]
+        return 200, page
+
+    def get_my_hint_usages(self, request):
+        # Served by GetUserLostPoints: the member's deduction activities, with negative deductions.
+        user = request["user"]
+        query = request["query"]
+        usages = sorted(((self.hint_usages[(user["id"], hint_id)], hint_id) for hint_id in user["usedHintIds"]),
+                        reverse=query.get("sortOrder", "").lower() == "desc")
+        page = _page(usages, query.get("page"), query.get("pageSize"), 20)
+        items = []
+        for used_at, hint_id in page["items"]:
+            hint = self.hints.get(hint_id, {"challengeId": None, "deduction": 0})
+            challenge = self.challenges.get(hint["challengeId"], {"name": ""})
+            items.append({"hintId": hint_id, "challengeId": hint["challengeId"], "challengeName": challenge["name"],
+                          "usedAt": _iso(used_at), "deduction": -hint["deduction"]})
+        page["items"] = items
+        return 200, page
+
+    def recalculate_leaderboards(self, request):
+        # The API queues the recalculation for RecalculateLeaderboardsService and refuses it
+        # while submissions are open. Points here are always exact, so only the cache is dropped.
+        if self.submissions_allowed:
+            raise ApiError(400, "RecalculateLeaderboards.NotAllowed", "Not allowed to recalculte leaderboards when submissions are allowed")
+        self.ranked = None
+        return 204, None
+
+    def clear_leaderboards_cache(self, request):
+        self.ranked = None
+        return 204, None
+
+    # Announcements (AnnouncementHub, SignalR JSON protocol over WebSockets only)
+
+    def negotiate_hub(self, request):
+        connection_token = secrets.token_urlsafe(16)
+        self.pending_hub_connections.add(connection_token)
+        return 200, {
+            "negotiateVersion": 1,
+            "connectionId": secrets.token_urlsafe(16),
+            "connectionToken": connection_token,
+            "availableTransports": [{"transport": "WebSockets", "transferFormats": ["Text", "Binary"]}],
+        }
+
+    def announce(self, request):
+        message = self._json_body(request).get("message") or ""
+        if not message.strip() or len(message) > 200:
+            raise ApiError(400, "Announce.Validation", "Message is required and must be 200 characters or less.")
+        invocation = {"type": 1, "target": "ReceiveAnnouncement",
+                      "arguments": [f"Announcement:\n\n{message}\n\n- {request['user']['userName']}"]}
+        frame = _websocket_frame(0x1, encode_json(invocation) + RECORD_SEPARATOR.encode())
+        for writer in list(self.hub_connections.values()):
+            if not writer.is_closing():
+                writer.write(frame)
+        return 201, None
+
+    def count_online_users(self, request):
+        return 200, {"connectedUsers": len(self.hub_connections)}
+
+    async def serve_hub(self, target, headers, reader, writer):
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        if url.path[len(API_PREFIX):].rstrip("/") != HUB_PATH or "sec-websocket-key" not in headers:
+            writer.write(_response(404, None, None, False))
+            return
+        try:
+            user = self._authenticate({"authorization": f"Bearer {query.get('access_token', '')}"}, "user")
+        except ApiError as e:
+            writer.write(_response(e.status, None, None, False))
+            return
+        connection_token = query.get("id")
+        if connection_token is not None:
+            if connection_token not in self.pending_hub_connections:
+                writer.write(_response(404, None, None, False))
+                return
+            self.pending_hub_connections.discard(connection_token)
+
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(f"HTTP/1.1 101 {REASONS[101]}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1"))
+
+        connection_id = secrets.token_urlsafe(16)
+        handshaken = False
+        try:
+            while True:
+                opcode, data = await _read_websocket_frame(reader)
+                if opcode == 0x8:
+                    writer.write(_websocket_frame(0x8, data[:2]))
+                    break
+                if opcode == 0x9:
+                    writer.write(_websocket_frame(0xA, data))
+                    continue
+                for message in data.decode().split(RECORD_SEPARATOR):
+                    if not message:
+                        continue
+                    if not handshaken:
+                        handshaken = True
+                        self.hub_connections[connection_id] = writer
+                        writer.write(_websocket_frame(0x1, b"{}" + RECORD_SEPARATOR.encode()))
+                    elif json.loads(message).get("type") == 7:
+                        return
+                await writer.drain()
+        finally:
+            self.hub_connections.pop(connection_id, None)
+
+    # Dispatch
+
+    def _authenticate(self, headers, auth):
+        authorization = headers.get("authorization", "")
+        token = authorization[7:] if authorization.startswith("Bearer ") else None
+        user_id, expires_at = self.access_tokens.get(token, (None, 0))
+        user = self.users.get(user_id)
+        if user is None or expires_at < time.time():
+            raise ApiError(401)
+        roles = user["roles"]
+        if auth == "manager" and "Admin" not in roles and "Manager" not in roles:
+            raise ApiError(403)
+        if auth == "admin" and "Admin" not in roles:
+            raise ApiError(403)
+        if auth == "member" and "Member" not in roles:
+            raise ApiError(403)
+        return user
+
+    def _rate_limited(self, method, path, user, client_ip):
+        policy = policy_for(method, path)
+        if policy is None:
+            return False
+        limit, window, partition = PRODUCTION_POLICIES[policy]
+        key = (policy, user["id"] if partition == "user" and user else client_ip)
+        window_index = int(time.time() // window)
+        current_index, count = self.windows.get(key, (window_index, 0))
+        count = count + 1 if current_index == window_index else 1
+        self.windows[key] = (window_index, count)
+        return count > limit
+
+    async def handle(self, method, target, headers, body, client_ip):
+        self.served += 1
+        url = urlsplit(target)
+        if url.path == "/metrics" and method == "GET":
+            return self.server_metrics()
+        if not url.path.startswith(API_PREFIX):
+            return 404, None, None
+        path = url.path[len(API_PREFIX):].rstrip("/")
+
+        for pattern, handler, auth, exclusive in self.routes.get((method, path.count("/")), ()):
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return 404, None, None
+        route = (method, re.sub(r"\(\?P<\w+>[^)]*\)", "{id}", pattern.pattern.strip("^$")))
+        self.route_requests[route] = self.route_requests.get(route, 0) + 1
+
+        # Like the API's JwtBearerEvents, hub paths also accept the token as ?access_token=.
+        if path.startswith(HUB_PATH) and "authorization" not in headers and "access_token=" in url.query:
+            headers = dict(headers, authorization=f"Bearer {dict(parse_qsl(url.query))['access_token']}")
+
+        try:
+            user = self._authenticate(headers, auth) if auth else None
+            client_ip = headers.get("cf-connecting-ip", client_ip)
+            if self.enforce_rate_limits and self._rate_limited(method, path, user, client_ip):
+                return 429, None, None
+            if self.throttle_rate and self.rng.random() < self.throttle_rate:
+                return 429, None, None
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return 500, None, None
+
+            # SubmitFlag and UseHint each hold a per-user lock for the whole request and answer 429
+            # instead of waiting for it. The locks are separate, so a user's hint usage and flag
+            # submission can still overlap.
+            lock_key = (handler.__name__, user["id"]) if exclusive else None
+            if exclusive:
+                if lock_key in self.busy_users:
+                    return 429, None, None
+                self.busy_users.add(lock_key)
+            guarded = handler in self.guarded
+            if guarded:
+                if self.guard_busy:
+                    if handler == self.remove_hint:
+                        return 429, None, None
+                    raise ApiError(400, "Error.AnotherProcessRunning", "Another system process is running. Please try again later.")
+                self.guard_busy = True
+            try:
+                if self.latency or self.latency_jitter:
+                    await asyncio.sleep(self.latency + self.rng.random() * self.latency_jitter)
+                request = {"query": dict(parse_qsl(url.query)), "headers": headers, "body": body, "user": user}
+                result = handler(request, **match.groupdict())
+            finally:
+                if exclusive:
+                    self.busy_users.discard(lock_key)
+                if guarded:
+                    self.guard_busy = False
+        except ApiError as e:
+            error = {"code": e.code, "message": e.message} if e.code else None
+            return e.status, error, None
+
+        status, payload, *extra_headers = result
+        return status, payload, extra_headers[0] if extra_headers else None
+
+
+def _websocket_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x80 | opcode, length])
+    elif length < 1 << 16:
+        header = bytes([0x80 | opcode, 126]) + length.to_bytes(2, "big")
+    else:
+        header = bytes([0x80 | opcode, 127]) + length.to_bytes(8, "big")
+    return header + payload
+
+
+async def _read_websocket_frame(reader):
+    # Client frames are always masked; continuation frames aren't used by SignalR's text messages.
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    data = await reader.readexactly(length)
+    if mask and length:
+        repeated = (mask * (length // 4 + 1))[:length]
+        data = (int.from_bytes(data, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+    return first & 0x0F, data
+
+
+def _response(status, payload, extra_headers, keep_alive):
+    content_type = "application/json; charset=utf-8"
+    if extra_headers and "Content-Type" in extra_headers:
+        content_type = extra_headers.pop("Content-Type")
+    if payload is None:
+        body = b""
+    elif isinstance(payload, bytes):
+        body = payload
+    else:
+        body = encode_json(payload)
+
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if body:
+        lines.append(f"Content-Type: {content_type}")
+    lines.append(f"Content-Length: {len(body)}")
+    for name, value in (extra_headers or {}).items():
+        lines.append(f"{name}: {value}")
+    if not keep_alive:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _serve_connection(api, reader, writer):
+    peer = writer.get_extra_info("peername")
+    client_ip = peer[0] if peer else ""
+    try:
+        while True:
+            # One read for the request line and headers; readline() per header line costs more
+            # than the handlers themselves.
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError as e:
+                if e.partial.strip():
+                    raise
+                break
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                if name:
+                    headers[name.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length") or 0)
+            if content_length > MAX_REQUEST_BODY_SIZE:
+                writer.write(_response(413, None, None, False))
+                await writer.drain()
+                break
+            body = await reader.readexactly(content_length) if content_length else b""
+            method, target, version = request_line.split()
+            if headers.get("upgrade", "").lower() == "websocket":
+                await api.serve_hub(target, headers, reader, writer)
+                break
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+            status, payload, extra_headers = await api.handle(method, target, headers, body, client_ip)
+            writer.write(_response(status, payload, extra_headers, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(api, host="127.0.0.1", port=37100):
+    return await asyncio.start_server(lambda reader, writer: _serve_connection(api, reader, writer), host, port,
+                                      backlog=4096, reuse_address=True)
+
+
+async def report_throughput(api, interval):
+    last_served, last_at = 0, time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        print(f"Served {api.served} requests ({(api.served - last_served) / (now - last_at):.0f}/s).")
+        last_served, last_at = api.served, now
+
+
+async def run(args):
+    api = MockApi(args.admin_password, args.latency / 1000, args.latency_jitter / 1000, args.error_rate,
+                  args.throttle_rate, args.rate_limits, args.seed)
+    server = await start_server(api, args.host, args.port)
+    print(f"Mock Pwneu API listening on http://{args.host}:{args.port}{API_PREFIX.rstrip('/')}")
+    if args.report_interval > 0:
+        asyncio.get_running_loop().create_task(report_throughput(api, args.report_interval))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory mock of the Pwneu API for benchmarking the scripts offline.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=37100, help="Port to listen on.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--latency", type=float, default=0, help="Milliseconds added to every response.")
+    parser.add_argument("--latency-jitter", type=float, default=0, help="Up to this many extra milliseconds, uniformly random.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--rate-limits", action="store_true", help="Enforce the production rate-limit policies.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for injected latency and faults.")
+    parser.add_argument("--report-interval", type=float, default=10, help="Seconds between throughput lines (0 disables).")
+    args = parser.parse_args()
+
+    try:
+        import uvloop  # type: ignore
+        uvloop.install()
+    except ImportError:
+        pass
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
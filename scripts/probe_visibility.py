@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import random
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    login_admin,
+    login_user,
+    fetch_all_users,
+    fetch_all_challenges,
+)
+from pwneu_client.histogram import Histogram, format_latency_summary
+from pwneu_client.paging import SOLVES_MAX_PAGE_SIZE, paginate
+from pwneu_client.server_metrics import ServerMetricsSampler, metrics_url_for
+
+# Sample command: python probe_visibility.py --probe-user-names probe1,probe2,probe3 --interval 2 --duration 300
+#
+# Measures how long a solve takes to become visible to players. SubmitFlag answers "Correct" as
+# soon as it has written a SolveBuffer row. SaveBuffersService moves the buffers into Solves and
+# PointsActivities when it next polls: it sleeps 1s when the buffers are empty and 2s when
+# IChallengePointsConcurrencyGuard is busy. Only then do play/me/solves (the member's solve
+# activities) and the requester's points in play/leaderboards change.
+#
+# Run it next to any load (seed_leaderboards.py, load_submissions.py, ...). Every --interval
+# seconds an idle probe user submits the correct flag of a challenge it hasn't solved, then
+# polls both endpoints every --poll-interval seconds until the solve shows up or
+# --visibility-timeout passes. Lag is measured from the "Correct" response. The report groups
+# probes into --window second windows and shows the API's SubmitFlag rate in each (from the
+# ASP.NET Core request counter on /metrics), so you can see the rate at which the lag grows.
+#
+# Probe with members the load doesn't drive. The leaderboard check waits for the probe user's
+# points to grow by the challenge's points, and solves sent by the load would satisfy it early.
+# In production the Fixed policy allows each user 10 requests per 10s on these endpoints; with
+# --rate-limits production the polls are paced to it, which coarsens the measurement.
+
+CORRECT_FLAG = "PWNEU{PWNEU}"
+REQUEST_COUNT_METRIC = "http_server_request_duration_seconds_count"
+SUBMIT_ROUTE_LABELS = r'http_route="[^"]*challenges/\{id[^}]*\}/submit"'
+
+
+def unsolved_challenges(client, access_token, challenges, rng):
+    solved = {item["challengeId"] for item in paginate(lambda page, page_size: client.get_my_solves(access_token, page=page, pageSize=page_size),
+                                                       "solves", SOLVES_MAX_PAGE_SIZE, window=1)}
+    unsolved = [challenge for challenge in challenges if challenge["id"] not in solved]
+    rng.shuffle(unsolved)
+    return unsolved
+
+
+async def current_points(client, access_token):
+    response = await client.get_leaderboards(access_token)
+    if response.status_code != 200:
+        return None
+    rank = response.json().get("requesterRank")
+    return rank["points"] if rank else 0
+
+
+async def solve_listed(client, access_token, challenge_id):
+    # Newest first, so the probe's solve is on the first page.
+    response = await client.get_my_solves(access_token, sortOrder="desc", pageSize=SOLVES_MAX_PAGE_SIZE)
+    return response.status_code == 200 and any(item["challengeId"] == challenge_id for item in response.json()["items"])
+
+
+async def probe(client, events, args, user, challenge):
+    # Returns (time of the "Correct" response, {"solves": lag or None, "leaderboards": lag or None}),
+    # or None if no solve was made.
+    access_token = user["accessToken"]
+    fields = {"user": user["userName"], "challenge": challenge["id"]}
+    baseline = await current_points(client, access_token)
+    if baseline is None:
+        events.record("probes", False, "leaderboards failed", f"Could not read the points of {user['userName']} before probing.", **fields)
+        return None
+
+    response = await client.submit_flag(access_token, challenge["id"], CORRECT_FLAG)
+    status = response.text.strip('"') if response.status_code == 200 else str(response.status_code)
+    if status != "Correct":
+        events.record("probes", False, status, f"Probe submission for challenge {challenge['id']} as {user['userName']} was answered {status}.",
+                      **fields)
+        return None
+
+    acked_at = time.monotonic()
+    lags = {"solves": None, "leaderboards": None}
+    while True:
+        if lags["solves"] is None and await solve_listed(client, access_token, challenge["id"]):
+            lags["solves"] = time.monotonic() - acked_at
+        if lags["leaderboards"] is None:
+            points = await current_points(client, access_token)
+            if points is not None and points >= baseline + challenge["points"]:
+                lags["leaderboards"] = time.monotonic() - acked_at
+        if None not in lags.values() or time.monotonic() - acked_at >= args.visibility_timeout:
+            break
+        await asyncio.sleep(args.poll_interval)
+
+    visible = None not in lags.values()
+    shown = ", ".join(f"{name} {'after %.2fs' % lag if lag is not None else 'not yet'}" for name, lag in lags.items())
+    events.record("probes", visible, "visible" if visible else "timeout",
+                  f"Solve of {challenge['id']} by {user['userName']}: {shown}.",
+                  solvesLag=lags["solves"], leaderboardsLag=lags["leaderboards"], **fields)
+    return acked_at, lags
+
+
+def counter_rate(samples, start, end):
+    # Per-second increase of the counter between the first and last samples inside [start, end].
+    inside = [(at, sum(values.values())) for at, values in samples if start <= at <= end]
+    if len(inside) < 2 or inside[-1][0] <= inside[0][0]:
+        return None
+    (first_at, first), (last_at, last) = inside[0], inside[-1]
+    return (last - first) / (last_at - first_at)
+
+
+def print_report(results, started_at, finished_at, window, sampler, skipped):
+    histograms = {"solves": Histogram(), "leaderboards": Histogram()}
+    timeouts = {"solves": 0, "leaderboards": 0}
+    windows = {}
+    for acked_at, lags in results:
+        bucket = windows.setdefault(int((acked_at - started_at) // window), {"solves": Histogram(), "leaderboards": Histogram(), "timeouts": 0})
+        for name, lag in lags.items():
+            if lag is None:
+                timeouts[name] += 1
+                bucket["timeouts"] += 1
+            else:
+                histograms[name].record(lag * 1_000_000)
+                bucket[name].record(lag * 1_000_000)
+
+    print(f"{len(results)} probe solves, {skipped} skipped while every probe user was still waiting for its last one.")
+    if not results:
+        return
+    print(f"{'window':>9} {'SubmitFlag/s':>12} {'probes':>6}  {'solves p50/max':>16}  {'leaderboards p50/max':>20}  timeouts")
+    for index in sorted(windows):
+        bucket = windows[index]
+        start = started_at + index * window
+        rate = counter_rate(sampler.samples, start, start + window) if sampler else None
+
+        def p50_max(histogram):
+            if not histogram.total:
+                return "-"
+            return f"{histogram.percentile(50) / 1000:.0f}/{histogram.max / 1000:.0f}ms"
+
+        probes = max(bucket["solves"].total, bucket["leaderboards"].total) + bucket["timeouts"]
+        print(f"{index * window:>8.0f}s {'-' if rate is None else f'{rate:.0f}':>12} {probes:>6}  {p50_max(bucket['solves']):>16}  "
+              f"{p50_max(bucket['leaderboards']):>20}  {bucket['timeouts']}")
+
+    duration = finished_at - started_at
+    for name, histogram in histograms.items():
+        if histogram.total:
+            print(format_latency_summary(f"{name} lag", histogram, duration))
+        if timeouts[name]:
+            print(f"{name}: {timeouts[name]} solves were not visible within the timeout.")
+
+
+async def run(args, token_store, rate_limiter, probe_users):
+    async with AsyncPwneuClient(args.api_url, max_connections=len(probe_users) * 2 + 2, http2=args.http2, token_store=token_store,
+                                rate_limiter=rate_limiter) as client:
+        for user in probe_users:
+            client.credentials[user["userName"]] = args.user_password
+
+        sampler = None
+        if not args.no_server_metrics:
+            sampler = ServerMetricsSampler(client.session, args.server_metrics_url or metrics_url_for(args.api_url),
+                                           REQUEST_COUNT_METRIC, args.server_metrics_interval, SUBMIT_ROUTE_LABELS)
+            sampling = asyncio.get_running_loop().create_task(sampler.run())
+
+        with event_sink_from_args(args) as events:
+            results = []
+            skipped = 0
+            tasks = []
+
+            async def probe_as(user, challenge):
+                try:
+                    result = await probe(client, events, args, user, challenge)
+                except Exception as e:
+                    events.record("probes", False, "error", f"Probe as {user['userName']} failed. Error: {e}", user=user["userName"])
+                    result = None
+                finally:
+                    user["busy"] = False
+                if result:
+                    results.append(result)
+
+            events.start_phase("probes")
+            started_at = next_at = time.monotonic()
+            sequence = 0
+            while time.monotonic() - started_at < args.duration:
+                # One probe per user at a time, so the points baseline is its own.
+                idle = [user for user in probe_users if not user["busy"] and user["unsolved"]]
+                if idle:
+                    user = idle[sequence % len(idle)]
+                    user["busy"] = True
+                    tasks.append(asyncio.get_running_loop().create_task(probe_as(user, user["unsolved"].pop())))
+                elif not any(user["unsolved"] for user in probe_users):
+                    print("Every probe user has solved every challenge. Stopping.")
+                    break
+                else:
+                    skipped += 1
+                sequence += 1
+                next_at += args.interval
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+            await asyncio.gather(*tasks)
+            finished_at = time.monotonic()
+            events.finish_phase("probes")
+
+        if sampler:
+            sampling.cancel()
+            if not sampler.samples:
+                print(f"No SubmitFlag request counts found at {sampler.url}; the rate column stays empty.")
+        print_report(results, started_at, finished_at, args.window, sampler, skipped)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long solves take to appear in play/me/solves and play/leaderboards.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password of the probe users.")
+    parser.add_argument("--probe-user-names", type=str, default=None, help="Comma-separated members to probe as (by default --probe-users random members).")
+    parser.add_argument("--probe-users", type=int, default=5, help="Random members to probe as when --probe-user-names isn't given.")
+    parser.add_argument("--interval", type=float, default=2, help="Seconds between probe solves.")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between visibility checks of a probe solve.")
+    parser.add_argument("--visibility-timeout", type=float, default=60, help="Seconds after which a probe solve that hasn't appeared counts as a timeout.")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to probe for.")
+    parser.add_argument("--window", type=float, default=10, help="Seconds per report row.")
+    parser.add_argument("--server-metrics-url", type=str, default=None, help="The API's Prometheus endpoint (defaults to /metrics on the API host).")
+    parser.add_argument("--server-metrics-interval", type=float, default=1, help="Seconds between samples of the API's request counters.")
+    parser.add_argument("--no-server-metrics", action="store_true", help="Don't sample the API's SubmitFlag rate.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for picking probe users and challenges.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    token_store = token_store_from_args(args)
+    rate_limiter = rate_limiter_from_args(args)
+
+    with client_from_args(args, token_store, rate_limiter) as client:
+        access_token = login_admin(client, args.admin_password)
+        if not access_token:
+            return
+        challenges = fetch_all_challenges(client, access_token)
+        if args.probe_user_names:
+            user_names = [name.strip() for name in args.probe_user_names.split(",") if name.strip()]
+        else:
+            users = fetch_all_users(client, access_token)
+            user_names = [user["userName"] for user in rng.sample(users, k=min(args.probe_users, len(users)))]
+
+        probe_users = []
+        for user_name in user_names:
+            user_token = login_user(client, user_name, args.user_password)
+            if user_token:
+                probe_users.append({"userName": user_name, "accessToken": user_token, "busy": False,
+                                    "unsolved": unsolved_challenges(client, user_token, challenges, rng)})
+
+    if not probe_users or not challenges:
+        print("No probe users or challenges available. Aborting.")
+        return
+    print(f"Probing as {len(probe_users)} users: {', '.join(user['userName'] for user in probe_users)}.")
+    asyncio.run(run(args, token_store, rate_limiter, probe_users))
+
+
+if __name__ == "__main__":
+    main()
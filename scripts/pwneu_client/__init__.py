@@ -0,0 +1,37 @@
+from .endpoints import ApiEndpoints, encode_json
+from .client import PwneuClient, DEFAULT_API_URL, DEFAULT_PASSWORD
+from .async_client import AsyncPwneuClient
+from .paging import paginate
+from .ratelimit import RateLimiter, TokenBucket
+from .tokens import TokenStore, authenticate, authenticate_async
+from .trace import TraceRecorder, read_trace
+from .metrics import ClientMetrics
+from .events import EventSink
+from .journal import Journal
+from .synthetic import DataPools, load_pools
+from .scenario import merge_config
+from .helpers import (
+    add_client_arguments,
+    add_event_arguments,
+    event_sink_from_args,
+    add_journal_arguments,
+    journal_from_args,
+    add_data_arguments,
+    data_pools_from_args,
+    client_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    login_user,
+    login_user_async,
+    iter_users,
+    iter_challenges,
+    fetch_all_users,
+    fetch_all_challenges,
+    fetch_all_challenge_ids,
+    fetch_all_categories,
+    fetch_all_members,
+    fetch_all_access_keys,
+)
@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import time
+from .client import DEFAULT_API_URL, stateless_cookie_jar
+from .endpoints import ApiEndpoints
+from .tokens import renew_access_token_async
+
+
+class AsyncPwneuClient(ApiEndpoints):
+    def __init__(self, api_url=DEFAULT_API_URL, max_connections=100, http2=False, timeout=30, token_store=None, rate_limiter=None, recorder=None, metrics=None):
+        try:
+            import httpx  # type: ignore
+        except ImportError:
+            raise RuntimeError("The async engine requires httpx. Install it with: pip install 'httpx[http2]'")
+
+        self.api_url = api_url.rstrip("/")
+        self.token_store = token_store
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder
+        self.metrics = metrics
+        self.credentials = {}
+        self.renewed_tokens = {}
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.session = httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout, cookies=stateless_cookie_jar())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.session.aclose()
+        if self.token_store:
+            self.token_store.save()
+        if self.recorder:
+            self.recorder.flush()
+
+    async def _send(self, method, path, url, params, headers, content):
+        if not self.metrics:
+            return await self.session.request(method, url, params=params, headers=headers, content=content)
+
+        started = self.metrics.start(method, path)
+        response = None
+        try:
+            response = await self.session.request(method, url, params=params, headers=headers, content=content)
+            return response
+        finally:
+            self.metrics.finish(started, content, response)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method, path, access_token=None, params=None, headers=None):
+        # For reading large bodies (artifacts) in chunks: `async with client.stream(...) as response`
+        # returns once the headers arrive. The rate limiter paces streamed requests, but a 429 is
+        # handed back rather than retried, since the caller decides how much of the body to read.
+        # Metrics and the trace time the request to the end of the block, i.e. the last byte read.
+        # The time spent waiting for the limiter is left in response.extensions["waited"], for
+        # callers that time the request themselves.
+        sent_token = self.renewed_tokens.get(access_token, access_token)
+        url, request_headers, _ = self.build_request(path, sent_token, headers=headers)
+        called_at = time.monotonic()
+        if self.rate_limiter:
+            delay = self.rate_limiter.before_request(method, path, sent_token)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        started_at = time.monotonic()
+        started = self.metrics.start(method, path) if self.metrics else None
+        response = None
+        try:
+            async with self.session.stream(method, url, params=params, headers=request_headers) as response:
+                response.extensions["waited"] = started_at - called_at
+                yield response
+        finally:
+            if self.metrics:
+                self.metrics.finish(started, None, response, response.num_bytes_downloaded if response is not None else 0)
+            if self.recorder:
+                self.recorder.record(method, path, sent_token, None, params, started_at, response, started_at - called_at, streamed=True)
+
+    async def request(self, method, path, access_token=None, payload=None, params=None, headers=None, content=None):
+        # Callers keep using the token they were handed, so one that was renewed after a 401 is
+        # swapped for its replacement here.
+        sent_token = self.renewed_tokens.get(access_token, access_token)
+        response = await self._send_with_retries(method, path, sent_token, payload, params, headers, content)
+
+        if response.status_code == 401 and sent_token:
+            renewed = await renew_access_token_async(self, sent_token)
+            if renewed:
+                self.renewed_tokens[access_token] = self.renewed_tokens[sent_token] = renewed
+                response = await self._send_with_retries(method, path, renewed, payload, params, headers, content)
+        return response
+
+    async def _send_with_retries(self, method, path, access_token, payload, params, headers, content):
+        url, request_headers, content = self.build_request(path, access_token, payload, headers, content)
+
+        # The trace records the final attempt's own latency; limiter sleeps, backoff and earlier
+        # 429 attempts are recorded separately as the time waited before it.
+        called_at = attempt_started_at = time.monotonic()
+        response = None
+        try:
+            if not self.rate_limiter:
+                response = await self._send(method, path, url, params, request_headers, content)
+                return response
+
+            attempt = 0
+            while True:
+                delay = self.rate_limiter.before_request(method, path, access_token)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                # Reset so an attempt that raises isn't recorded with the previous attempt's 429.
+                attempt_started_at = time.monotonic()
+                response = None
+                response = await self._send(method, path, url, params, request_headers, content)
+
+                retry_delay = self.rate_limiter.after_response(method, path, access_token, response, attempt)
+                if retry_delay is None:
+                    return response
+
+                if self.metrics:
+                    self.metrics.retried(method, path)
+                await asyncio.sleep(retry_delay)
+                attempt += 1
+        finally:
+            if self.recorder:
+                self.recorder.record(method, path, access_token, payload, params, attempt_started_at, response,
+                                     attempt_started_at - called_at)
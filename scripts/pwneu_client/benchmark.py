@@ -0,0 +1,200 @@
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from .histogram import Histogram
+from .trace import endpoint_template
+
+# Building blocks of run_benchmarks.py: per-endpoint latency capture, the versioned results file,
+# and the comparison against a stored baseline.
+#
+# Results file (RESULTS_VERSION 1):
+#   {"version": 1, "createdAt": ..., "label": ..., "environment": {...}, "settings": {...},
+#    "scenarios": {name: {"metrics": {metric: {"unit", "better", "gated", "samples": [...]}},
+#                         "endpoints": {endpoint: {"histogram": Histogram.to_dict(), "requests", "serverErrors"}}}}}
+#
+# Every metric keeps one sample per repetition of the suite. Comparisons use the median of the
+# samples, and a change only counts as a regression when it exceeds both the relative tolerance
+# and the noise seen between repetitions: NOISE_SIGMAS times the scaled median absolute deviation
+# of the samples (3 or more repetitions needed; with fewer only the relative tolerance applies).
+
+RESULTS_VERSION = 1
+NOISE_SIGMAS = 3.0
+MAD_SCALE = 1.4826
+
+# API handler names for the endpoint templates the suite exercises; anything else is reported by
+# method and template.
+ENDPOINT_NAMES = {
+    ("POST", "identity/login"): "Login",
+    ("POST", "identity/register"): "Register",
+    ("GET", "identity/users"): "GetUsers",
+    ("PUT", "identity/users/{id}/verify"): "VerifyUser",
+    ("DELETE", "identity/users/{id}"): "DeleteUser",
+    ("POST", "identity/keys"): "CreateAccessKey",
+    ("DELETE", "identity/keys/{id}"): "DeleteAccessKey",
+    ("POST", "play/categories"): "CreateCategory",
+    ("DELETE", "play/categories/{id}"): "DeleteCategory",
+    ("POST", "play/categories/{id}/challenges"): "CreateChallenge",
+    ("GET", "play/challenges"): "GetChallenges",
+    ("DELETE", "play/challenges/{id}"): "DeleteChallenge",
+    ("POST", "play/challenges/{id}/hints"): "AddHint",
+    ("POST", "play/hints/{id}"): "UseHint",
+    ("POST", "play/challenges/{id}/submit"): "SubmitFlag",
+    ("GET", "play/leaderboards"): "GetLeaderboards",
+    ("GET", "play/me/rank"): "GetUserRank",
+}
+
+
+def endpoint_name(method, path):
+    template = endpoint_template(path)
+    return ENDPOINT_NAMES.get((method, template), f"{method} {template}")
+
+
+class EndpointRecorder:
+    # Takes the place of ClientMetrics on a PwneuClient or AsyncPwneuClient (same start/finish/
+    # retried hooks) and keeps a full-precision Histogram per API handler instead of Prometheus
+    # buckets, which are too coarse for p99 comparisons.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.requests = {}
+        self.server_errors = {}
+
+    def start(self, method, path):
+        return endpoint_name(method, path), time.perf_counter()
+
+    def finish(self, started, content, response, received=None):
+        name, started_at = started
+        microseconds = (time.perf_counter() - started_at) * 1_000_000
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            if response is None or response.status_code >= 500:
+                self.server_errors[name] = self.server_errors.get(name, 0) + 1
+                return
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(microseconds)
+
+    def retried(self, method, path):
+        pass
+
+    def to_dict(self):
+        return {name: {"histogram": self.histograms[name].to_dict() if name in self.histograms else Histogram().to_dict(),
+                       "requests": count, "serverErrors": self.server_errors.get(name, 0)}
+                for name, count in sorted(self.requests.items())}
+
+
+def merge_endpoints(merged, endpoints):
+    for name, data in endpoints.items():
+        if name not in merged:
+            merged[name] = {"histogram": data["histogram"], "requests": 0, "serverErrors": 0}
+        else:
+            histogram = Histogram.from_dict(merged[name]["histogram"])
+            histogram.merge(Histogram.from_dict(data["histogram"]))
+            merged[name]["histogram"] = histogram.to_dict()
+        merged[name]["requests"] += data["requests"]
+        merged[name]["serverErrors"] += data["serverErrors"]
+    return merged
+
+
+def metric(unit, better, gated=True):
+    return {"unit": unit, "better": better, "gated": gated, "samples": []}
+
+
+def add_sample(metrics, name, value, unit, better, gated=True):
+    metrics.setdefault(name, metric(unit, better, gated))["samples"].append(round(value, 3))
+
+
+def environment(api_url, api_version=None):
+    def git_commit():
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  capture_output=True, text=True, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {
+        "apiUrl": api_url,
+        "apiVersion": api_version,
+        "clientCommit": git_commit(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+    }
+
+
+def new_results(label, environment, settings):
+    return {
+        "version": RESULTS_VERSION,
+        "createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "label": label,
+        "environment": environment,
+        "settings": settings,
+        "scenarios": {},
+    }
+
+
+def save_results(results, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+
+def load_results(path):
+    with open(path) as file:
+        results = json.load(file)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} has results version {results.get('version')}, this runner reads version {RESULTS_VERSION}.")
+    return results
+
+
+def _spread(samples):
+    if len(samples) < 3:
+        return 0.0
+    median = statistics.median(samples)
+    return MAD_SCALE * statistics.median(abs(sample - median) for sample in samples)
+
+
+def compare_results(current, baseline, tolerances, floors=None):
+    # Returns rows (scenario, metric, baseline value, current value, allowed change, verdict) for
+    # every gated metric of the baseline. tolerances and floors are keyed by unit: the relative
+    # change allowed, and the absolute change always allowed (e.g. 1 ms of latency). Scenarios the
+    # current run left out are skipped; a metric missing from a scenario that ran is reported.
+    floors = floors or {}
+    rows = []
+    for scenario, baseline_scenario in baseline["scenarios"].items():
+        if scenario not in current["scenarios"]:
+            continue
+        current_metrics = current["scenarios"][scenario]["metrics"]
+        for name, baseline_metric in baseline_scenario["metrics"].items():
+            if not baseline_metric["gated"] or not baseline_metric["samples"]:
+                continue
+            base = statistics.median(baseline_metric["samples"])
+            current_metric = current_metrics.get(name)
+            if not current_metric or not current_metric["samples"]:
+                rows.append((scenario, name, base, None, None, "missing"))
+                continue
+            value = statistics.median(current_metric["samples"])
+            noise = NOISE_SIGMAS * max(_spread(baseline_metric["samples"]), _spread(current_metric["samples"]))
+            unit = baseline_metric["unit"]
+            allowed = max(tolerances.get(unit, 0) * abs(base), noise, floors.get(unit, 0))
+            worse = value - base if baseline_metric["better"] == "lower" else base - value
+            verdict = "regression" if worse > allowed else "improvement" if -worse > allowed else "ok"
+            rows.append((scenario, name, base, value, allowed, verdict))
+    return rows
+
+
+def settings_differences(current, baseline):
+    keys = sorted(set(current["settings"]) | set(baseline["settings"]))
+    return [(key, baseline["settings"].get(key), current["settings"].get(key)) for key in keys
+            if current["settings"].get(key) != baseline["settings"].get(key)]
@@ -0,0 +1,130 @@
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+from .endpoints import ApiEndpoints
+from .tokens import renew_access_token
+
+DEFAULT_API_URL = "http://localhost:37100/api/v1"
+DEFAULT_PASSWORD = "PwneuPwneu!1"
+
+
+# The pooled session is shared by many users, so it must never carry one user's cookies
+# (such as the refresh token) into another user's requests.
+def stateless_cookie_jar():
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _create_session(pool_connections, pool_maxsize, http2, timeout):
+    if http2:
+        try:
+            import httpx  # type: ignore
+        except ImportError:
+            raise RuntimeError("HTTP/2 requires httpx. Install it with: pip install 'httpx[http2]'")
+
+        limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        return httpx.Client(http2=True, limits=limits, timeout=timeout, cookies=stateless_cookie_jar())
+
+    # The pool is keyed per host, so pool_maxsize is the number of kept-alive sockets per API host.
+    session = requests.Session()
+    session.cookies = stateless_cookie_jar()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PwneuClient(ApiEndpoints):
+    def __init__(self, api_url=DEFAULT_API_URL, pool_connections=4, pool_maxsize=100, http2=False, timeout=30, token_store=None, rate_limiter=None, recorder=None, metrics=None):
+        self.api_url = api_url.rstrip("/")
+        self.token_store = token_store
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder
+        self.metrics = metrics
+        self.credentials = {}
+        self.renewed_tokens = {}
+        self.http2 = http2
+        self.timeout = timeout
+        self.session = _create_session(pool_connections, pool_maxsize, http2, timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+        if self.rate_limiter and self.rate_limiter.throttled:
+            print(f"Rate limited {self.rate_limiter.throttled} times, retried {self.rate_limiter.retries}.")
+        if self.token_store:
+            self.token_store.save()
+        if self.recorder:
+            self.recorder.flush()
+
+    def _send_once(self, method, url, params, headers, content):
+        if self.http2:
+            return self.session.request(method, url, params=params, headers=headers, content=content)
+
+        return self.session.request(method, url, params=params, headers=headers, data=content, timeout=self.timeout)
+
+    def _send(self, method, path, url, params, headers, content):
+        if not self.metrics:
+            return self._send_once(method, url, params, headers, content)
+
+        started = self.metrics.start(method, path)
+        response = None
+        try:
+            response = self._send_once(method, url, params, headers, content)
+            return response
+        finally:
+            self.metrics.finish(started, content, response)
+
+    def request(self, method, path, access_token=None, payload=None, params=None, headers=None, content=None):
+        # Callers keep using the token they were handed, so one that was renewed after a 401 is
+        # swapped for its replacement here.
+        sent_token = self.renewed_tokens.get(access_token, access_token)
+        response = self._send_with_retries(method, path, sent_token, payload, params, headers, content)
+
+        if response.status_code == 401 and sent_token:
+            renewed = renew_access_token(self, sent_token)
+            if renewed:
+                self.renewed_tokens[access_token] = self.renewed_tokens[sent_token] = renewed
+                response = self._send_with_retries(method, path, renewed, payload, params, headers, content)
+        return response
+
+    def _send_with_retries(self, method, path, access_token, payload, params, headers, content):
+        url, request_headers, content = self.build_request(path, access_token, payload, headers, content)
+
+        # The trace records the final attempt's own latency; limiter sleeps, backoff and earlier
+        # 429 attempts are recorded separately as the time waited before it.
+        called_at = attempt_started_at = time.monotonic()
+        response = None
+        try:
+            if not self.rate_limiter:
+                response = self._send(method, path, url, params, request_headers, content)
+                return response
+
+            attempt = 0
+            while True:
+                delay = self.rate_limiter.before_request(method, path, access_token)
+                if delay > 0:
+                    time.sleep(delay)
+
+                # Reset so an attempt that raises isn't recorded with the previous attempt's 429.
+                attempt_started_at = time.monotonic()
+                response = None
+                response = self._send(method, path, url, params, request_headers, content)
+
+                retry_delay = self.rate_limiter.after_response(method, path, access_token, response, attempt)
+                if retry_delay is None:
+                    return response
+
+                if self.metrics:
+                    self.metrics.retried(method, path)
+                time.sleep(retry_delay)
+                attempt += 1
+        finally:
+            if self.recorder:
+                self.recorder.record(method, path, access_token, payload, params, attempt_started_at, response,
+                                     attempt_started_at - called_at)
@@ -0,0 +1,173 @@
+import json
+
+# One encoder instance is reused for every payload instead of building one per json.dumps call.
+_json_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_json(payload):
+    return _json_encoder.encode(payload).encode("utf-8")
+
+
+# Endpoint wrappers shared by the sync and async clients. Each one only describes the call
+# and hands it to self.request, which returns a response or an awaitable depending on the client.
+class ApiEndpoints:
+    def build_request(self, path, access_token=None, payload=None, headers=None, content=None):
+        request_headers = {}
+        if access_token:
+            request_headers['Authorization'] = f'Bearer {access_token}'
+        if payload is not None:
+            request_headers['Content-Type'] = 'application/json'
+            content = encode_json(payload)
+        if headers:
+            request_headers.update(headers)
+
+        return f"{self.api_url}/{path}", request_headers, content
+
+    # Identity endpoints
+
+    def login(self, user_name, password):
+        return self.request("POST", "identity/login", payload={"userName": user_name, "password": password})
+
+    def refresh(self, refresh_token):
+        return self.request("GET", "identity/refresh", headers={"Cookie": f"refreshToken={refresh_token}"})
+
+    def register(self, user_name, email, password, full_name, access_key):
+        payload = {
+            "userName": user_name,
+            "email": email,
+            "password": password,
+            "fullName": full_name,
+            "accessKey": access_key
+        }
+        return self.request("POST", "identity/register", payload=payload)
+
+    def get_users(self, access_token, **params):
+        return self.request("GET", "identity/users", access_token, params=params)
+
+    def verify_user(self, access_token, user_id):
+        return self.request("PUT", f"identity/users/{user_id}/verify", access_token)
+
+    def export_members(self, access_token):
+        return self.request("GET", "identity/members/export", access_token)
+
+    def delete_user(self, access_token, user_id):
+        return self.request("DELETE", f"identity/users/{user_id}", access_token)
+
+    def create_access_key(self, access_token, for_manager, can_be_reused, expiration):
+        payload = {"forManager": for_manager, "canBeReused": can_be_reused, "expiration": expiration}
+        return self.request("POST", "identity/keys", access_token, payload=payload)
+
+    def get_access_keys(self, access_token):
+        return self.request("GET", "identity/keys", access_token)
+
+    def delete_access_key(self, access_token, access_key_id):
+        return self.request("DELETE", f"identity/keys/{access_key_id}", access_token)
+
+    # Play endpoints
+
+    def get_configurations(self, access_token):
+        return self.request("GET", "play/configurations", access_token)
+
+    def allow_submissions(self, access_token):
+        return self.request("PUT", "play/configurations/submissionsAllowed/allow", access_token)
+
+    def deny_submissions(self, access_token):
+        return self.request("PUT", "play/configurations/submissionsAllowed/deny", access_token)
+
+    def lock_challenges(self, access_token):
+        return self.request("PUT", "play/configurations/challengesLocked/lock", access_token)
+
+    def unlock_challenges(self, access_token):
+        return self.request("PUT", "play/configurations/challengesLocked/unlock", access_token)
+
+    def get_all_categories(self, access_token):
+        return self.request("GET", "play/categories/all", access_token)
+
+    def create_category(self, access_token, name, description):
+        return self.request("POST", "play/categories", access_token, payload={"name": name, "description": description})
+
+    def delete_category(self, access_token, category_id):
+        return self.request("DELETE", f"play/categories/{category_id}", access_token)
+
+    def get_challenges(self, access_token, **params):
+        return self.request("GET", "play/challenges", access_token, params=params)
+
+    def get_all_challenge_ids(self, access_token):
+        return self.request("GET", "play/challenges/all", access_token)
+
+    def get_challenge(self, access_token, challenge_id):
+        return self.request("GET", f"play/challenges/{challenge_id}", access_token)
+
+    def create_challenge(self, access_token, category_id, challenge):
+        return self.request("POST", f"play/categories/{category_id}/challenges", access_token, payload=challenge)
+
+    def get_challenge_flags(self, access_token, challenge_id):
+        return self.request("GET", f"play/challenges/{challenge_id}/flags", access_token)
+
+    def update_challenge(self, access_token, challenge_id, challenge):
+        return self.request("PUT", f"play/challenges/{challenge_id}", access_token, payload=challenge)
+
+    def delete_challenge(self, access_token, challenge_id):
+        return self.request("DELETE", f"play/challenges/{challenge_id}", access_token)
+
+    def add_hint(self, access_token, challenge_id, content, deduction):
+        payload = {"content": content, "deduction": deduction}
+        return self.request("POST", f"play/challenges/{challenge_id}/hints", access_token, payload=payload)
+
+    def get_challenge_hints(self, access_token, challenge_id):
+        return self.request("GET", f"play/challenges/{challenge_id}/hints", access_token)
+
+    def remove_hint(self, access_token, hint_id):
+        return self.request("DELETE", f"play/hints/{hint_id}", access_token)
+
+    def add_artifact(self, access_token, challenge_id, upload):
+        # upload is a MultipartUpload, streamed with an explicit Content-Length.
+        headers = {"Content-Type": upload.content_type, "Content-Length": str(len(upload))}
+        return self.request("POST", f"play/challenges/{challenge_id}/artifacts", access_token, headers=headers, content=upload)
+
+    def get_artifact(self, access_token, artifact_id):
+        return self.request("GET", f"play/artifacts/{artifact_id}", access_token)
+
+    def delete_artifact(self, access_token, artifact_id):
+        return self.request("DELETE", f"play/artifacts/{artifact_id}", access_token)
+
+    def use_hint(self, access_token, hint_id):
+        return self.request("POST", f"play/hints/{hint_id}", access_token)
+
+    def submit_flag(self, access_token, challenge_id, flag):
+        return self.request("POST", f"play/challenges/{challenge_id}/submit", access_token, params={"flag": flag})
+
+    def get_user_play_data(self, access_token, user_id):
+        return self.request("GET", f"play/users/{user_id}/data", access_token)
+
+    def get_leaderboards(self, access_token, **params):
+        return self.request("GET", "play/leaderboards", access_token, params=params)
+
+    def get_my_rank(self, access_token):
+        return self.request("GET", "play/me/rank", access_token)
+
+    def get_my_graph(self, access_token):
+        return self.request("GET", "play/me/graph", access_token)
+
+    def get_my_solves(self, access_token, **params):
+        return self.request("GET", "play/me/solves", access_token, params=params)
+
+    def get_my_hint_usages(self, access_token, **params):
+        return self.request("GET", "play/me/hintUsages", access_token, params=params)
+
+    def recalculate_leaderboards(self, access_token):
+        return self.request("DELETE", "play/leaderboards/recalculate", access_token)
+
+    def clear_leaderboards_cache(self, access_token):
+        return self.request("POST", "play/leaderboards/clear", access_token)
+
+    # Announcement endpoints
+
+    def announce(self, access_token, message):
+        return self.request("POST", "announcements", access_token, payload={"message": message})
+
+    def count_online_users(self, access_token):
+        return self.request("GET", "announcements/count", access_token)
+
+    def negotiate_announcements(self, access_token):
+        return self.request("POST", "announcements/negotiate", access_token, params={"negotiateVersion": 1})
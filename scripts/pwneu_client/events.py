@@ -0,0 +1,178 @@
+import json
+import sys
+import threading
+import time
+
+# Per-request outcomes go to one EventSink instead of print(). Recording an outcome is a counter
+# update under a lock; result rows are buffered and appended to an NDJSON file in batches; and a
+# background thread redraws one progress line (rate, failures, ETA per phase) at most every
+# `interval` seconds. Per-request messages are only printed with verbose=True. Without it, the
+# first few failures of each phase are still printed so a broken run is obvious.
+#
+# Results rows: {"t": seconds since start, "phase": ..., "ok": true/false, "status": ..., ...fields}
+
+FAILURES_PRINTED_PER_PHASE = 10
+
+
+class PhaseProgress:
+    def __init__(self, name, total, started_at):
+        self.name = name
+        self.total = total
+        self.started_at = started_at
+        self.finished_at = None
+        self.done = 0
+        self.failed = 0
+        self.statuses = {}
+
+    def summary(self, now):
+        elapsed = (self.finished_at or now) - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0
+        line = f"{self.name} {self.done}" + (f"/{self.total}" if self.total else "")
+        line += f" {rate:.0f}/s failed {self.failed}"
+        if len(self.statuses) > 1 or self.failed:
+            line += " (" + ", ".join(f"{status}: {count}" for status, count in sorted(self.statuses.items(), key=lambda item: -item[1])) + ")"
+        if self.finished_at is not None:
+            line += f" in {elapsed:.1f}s"
+        elif self.total and rate > 0 and self.done < self.total:
+            line += f" ETA {(self.total - self.done) / rate:.0f}s"
+        return line
+
+
+class EventSink:
+    def __init__(self, results_path=None, verbose=False, interval=1.0, flush_every=1000, stream=None):
+        self.results_path = results_path
+        self.verbose = verbose
+        self.interval = interval
+        self.flush_every = flush_every
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty()
+        self.started_at = time.monotonic()
+        self.phases = {}
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.line_drawn = False
+        self.stopped = threading.Event()
+        self.ticker = None
+        if interval > 0:
+            self.ticker = threading.Thread(target=self._tick, daemon=True)
+            self.ticker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def start_phase(self, name, total=None):
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None:
+                self.phases[name] = PhaseProgress(name, total, time.monotonic())
+            elif total is not None:
+                phase.total = total
+
+    def add_to_total(self, name, count):
+        # For phases whose size is only known as work is discovered (e.g. users to verify).
+        with self.lock:
+            phase = self._phase_locked(name)
+            phase.total = (phase.total or 0) + count
+
+    def record(self, phase_name, ok, status=None, message=None, **fields):
+        with self.lock:
+            phase = self._phase_locked(phase_name)
+            phase.done += 1
+            if not ok:
+                phase.failed += 1
+            if status is None:
+                status = "ok" if ok else "failed"
+            phase.statuses[status] = phase.statuses.get(status, 0) + 1
+            if self.results_path:
+                self.buffer.append({"t": round(time.monotonic() - self.started_at, 6), "phase": phase_name, "ok": ok,
+                                    "status": status, **fields})
+                if len(self.buffer) >= self.flush_every:
+                    self._flush_locked()
+            show = message and (self.verbose or (not ok and phase.failed <= FAILURES_PRINTED_PER_PHASE))
+            if show and not ok and not self.verbose and phase.failed == FAILURES_PRINTED_PER_PHASE:
+                message += f" (further {phase_name} failures are only counted; use --verbose to print them)"
+            if show:
+                self._write_locked(message)
+
+    def log(self, message):
+        with self.lock:
+            self._write_locked(message)
+
+    def counts(self, name):
+        # A phase's counters, picklable so a worker process can hand them to the parent. The
+        # monotonic clock is system-wide, so the times compare across processes.
+        with self.lock:
+            phase = self._phase_locked(name)
+            return {"done": phase.done, "failed": phase.failed, "statuses": dict(phase.statuses),
+                    "startedAt": phase.started_at, "finishedAt": phase.finished_at}
+
+    def add_counts(self, name, counts):
+        # Folds another sink's counts() into this sink's phase; the phase starts when the earliest did.
+        with self.lock:
+            phase = self._phase_locked(name)
+            phase.done += counts["done"]
+            phase.failed += counts["failed"]
+            for status, count in counts["statuses"].items():
+                phase.statuses[status] = phase.statuses.get(status, 0) + count
+            phase.started_at = min(phase.started_at, counts["startedAt"])
+
+    def finish_phase(self, name, finished_at=None):
+        with self.lock:
+            phase = self.phases.get(name)
+            if phase is None or phase.finished_at is not None:
+                return
+            phase.finished_at = finished_at or time.monotonic()
+            self._write_locked(phase.summary(phase.finished_at))
+
+    def close(self):
+        self.stopped.set()
+        if self.ticker:
+            self.ticker.join()
+        for name in list(self.phases):
+            self.finish_phase(name)
+        with self.lock:
+            self._flush_locked()
+
+    def _phase_locked(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseProgress(name, None, time.monotonic())
+        return phase
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        with open(self.results_path, "a", encoding="utf-8") as file:
+            file.write("\n".join(json.dumps(row, separators=(",", ":"), default=str) for row in self.buffer))
+            file.write("\n")
+        self.buffer = []
+
+    def _clear_line_locked(self):
+        if self.line_drawn:
+            self.stream.write("\r\x1b[K")
+            self.line_drawn = False
+
+    def _write_locked(self, message):
+        self._clear_line_locked()
+        self.stream.write(message + "\n")
+        self.stream.flush()
+
+    def _tick(self):
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                now = time.monotonic()
+                active = [phase.summary(now) for phase in self.phases.values() if phase.finished_at is None]
+                if not active:
+                    continue
+                line = " | ".join(active)
+                # A terminal gets one line redrawn in place; a pipe or file gets a line per interval.
+                if self.live:
+                    self._clear_line_locked()
+                    self.stream.write(line)
+                    self.line_drawn = True
+                else:
+                    self.stream.write(line + "\n")
+                self.stream.flush()
@@ -0,0 +1,290 @@
+import asyncio
+import concurrent.futures
+import inspect
+import time
+from datetime import datetime, timedelta
+from .client import DEFAULT_PASSWORD
+from .tokens import authenticate, authenticate_async
+
+# Operation handlers are generators that yield client calls and receive their responses.
+# The threads engine feeds each yielded response straight back; the async engine awaits it
+# first. That way one handler per operation serves every engine.
+
+
+class ExecutionContext:
+    def __init__(self, admin_token, password, is_async=False, events=None):
+        self.admin_token = admin_token
+        self.password = password
+        self.is_async = is_async
+        self.events = events
+        self.access_key = None
+        self.ids = {}
+        self.user_names = {}
+        self.tokens = {}
+
+
+def _text_id(response):
+    return response.text.strip().strip('"')
+
+
+def _password(context, operation):
+    # Register and login steps carry the scenario's users.password; a password given on the
+    # command line overrides it, and plans compiled before the field existed use the default.
+    return context.password or operation.get("password", DEFAULT_PASSWORD)
+
+
+# A failed call records itself (with its status code) and makes the handler return None. A handler
+# returning False was skipped because an earlier step it depends on failed.
+def _failed(context, operation, response):
+    message = f"Step {operation['step']} {operation['op']} failed. Status code: {response.status_code}, Response: {response.text}"
+    if context.events:
+        context.events.record(operation["phase"], False, response.status_code, message, step=operation["step"], op=operation["op"])
+    else:
+        print(message)
+    return None
+
+
+def _raised(context, operation, error):
+    # A transport error fails its operation only; the rest of the plan goes on.
+    message = f"Step {operation['step']} {operation['op']} failed. Error: {error}"
+    if context.events:
+        context.events.record(operation["phase"], False, "error", message, step=operation["step"], op=operation["op"])
+    else:
+        print(message)
+    return None
+
+
+def _record(context, operation, outcome):
+    if context.events and outcome is not None:
+        context.events.record(operation["phase"], outcome, None if outcome else "skipped", step=operation["step"], op=operation["op"])
+    return bool(outcome)
+
+
+def create_access_key_op(context, client, operation):
+    expiration = (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    response = yield client.create_access_key(context.admin_token, False, True, expiration)
+    if response.status_code != 200:
+        return _failed(context, operation, response)
+    context.access_key = _text_id(response)
+    return True
+
+
+def allow_submissions_op(context, client, operation):
+    response = yield client.allow_submissions(context.admin_token)
+    return response.status_code == 204 or _failed(context, operation, response)
+
+
+def register_op(context, client, operation):
+    context.user_names[operation["user"]] = operation["userName"]
+    response = yield client.register(operation["userName"], operation["email"], _password(context, operation),
+                                     operation["fullName"], context.access_key)
+    return response.status_code == 201 or _failed(context, operation, response)
+
+
+def resolve_users_op(context, client, operation):
+    # identity/register returns no id, so every planned user name is matched against the listing.
+    ids_by_user_name = {}
+    page = 1
+    while True:
+        response = yield client.get_users(context.admin_token, page=page, pageSize=50)
+        if response.status_code != 200:
+            return _failed(context, operation, response)
+        data = response.json()
+        for user in data["items"]:
+            ids_by_user_name[user["userName"]] = user["id"]
+        if not data["hasNextPage"]:
+            break
+        page += 1
+
+    for user_key, user_name in context.user_names.items():
+        if user_name in ids_by_user_name:
+            context.ids[user_key] = ids_by_user_name[user_name]
+    return True
+
+
+def verify_user_op(context, client, operation):
+    user_id = context.ids.get(operation["user"])
+    if user_id is None:
+        return False
+    response = yield client.verify_user(context.admin_token, user_id)
+    return response.status_code == 204 or _failed(context, operation, response)
+
+
+def create_category_op(context, client, operation):
+    response = yield client.create_category(context.admin_token, operation["name"], operation["description"])
+    if response.status_code != 200:
+        return _failed(context, operation, response)
+    context.ids[operation["category"]] = _text_id(response)
+    return True
+
+
+def create_challenge_op(context, client, operation):
+    category_id = context.ids.get(operation["category"])
+    if category_id is None:
+        return False
+    challenge = {
+        "name": operation["name"],
+        "description": operation["description"],
+        "points": operation["points"],
+        "deadlineEnabled": False,
+        "deadline": "1970-01-01T00:00:00.000Z",
+        "maxAttempts": operation["maxAttempts"],
+        "tags": [],
+        "flags": [operation["flag"]],
+    }
+    response = yield client.create_challenge(context.admin_token, category_id, challenge)
+    if response.status_code != 200:
+        return _failed(context, operation, response)
+    context.ids[operation["challenge"]] = _text_id(response)
+    return True
+
+
+def add_hint_op(context, client, operation):
+    challenge_id = context.ids.get(operation["challenge"])
+    if challenge_id is None:
+        return False
+    response = yield client.add_hint(context.admin_token, challenge_id, operation["content"], operation["deduction"])
+    if response.status_code != 200:
+        return _failed(context, operation, response)
+    context.ids[operation["hint"]] = _text_id(response)
+    return True
+
+
+def login_op(context, client, operation):
+    user_name = context.user_names.get(operation["user"])
+    if user_name is None:
+        return False
+    login = authenticate_async if context.is_async else authenticate
+    entry, failed_response = yield login(client, user_name, _password(context, operation))
+    if entry is None:
+        return _failed(context, operation, failed_response)
+    context.tokens[operation["user"]] = entry["accessToken"]
+    return True
+
+
+def use_hint_op(context, client, operation):
+    access_token = context.tokens.get(operation["user"])
+    hint_id = context.ids.get(operation["hint"])
+    if access_token is None or hint_id is None:
+        return False
+    response = yield client.use_hint(access_token, hint_id)
+    return response.status_code == 200 or _failed(context, operation, response)
+
+
+def submit_flag_op(context, client, operation):
+    access_token = context.tokens.get(operation["user"])
+    challenge_id = context.ids.get(operation["challenge"])
+    if access_token is None or challenge_id is None:
+        return False
+    response = yield client.submit_flag(access_token, challenge_id, operation["flag"])
+    return response.status_code == 200 or _failed(context, operation, response)
+
+
+OPERATIONS = {
+    "create_access_key": create_access_key_op,
+    "allow_submissions": allow_submissions_op,
+    "register": register_op,
+    "resolve_users": resolve_users_op,
+    "verify_user": verify_user_op,
+    "create_category": create_category_op,
+    "create_challenge": create_challenge_op,
+    "add_hint": add_hint_op,
+    "login": login_op,
+    "use_hint": use_hint_op,
+    "submit_flag": submit_flag_op,
+}
+
+
+def run_operation(context, client, operation):
+    handler = OPERATIONS[operation["op"]](context, client, operation)
+    try:
+        response = next(handler)
+        while True:
+            response = handler.send(response)
+    except StopIteration as stop:
+        return _record(context, operation, stop.value)
+    except Exception as e:
+        handler.close()
+        return _record(context, operation, _raised(context, operation, e))
+
+
+async def run_operation_async(context, client, operation):
+    handler = OPERATIONS[operation["op"]](context, client, operation)
+    try:
+        response = handler.send(None)
+        while True:
+            if inspect.isawaitable(response):
+                response = await response
+            response = handler.send(response)
+    except StopIteration as stop:
+        return _record(context, operation, stop.value)
+    except Exception as e:
+        handler.close()
+        return _record(context, operation, _raised(context, operation, e))
+
+
+# Phases run one after another because later phases need ids from earlier ones. Inside a phase,
+# operations with the same actor (one player) run in plan order, since the API rejects a
+# player's concurrent submissions; everything else runs concurrently.
+def _groups(operations):
+    groups = {}
+    for operation in operations:
+        actor = operation.get("actor")
+        key = actor if actor is not None else ("step", operation["step"])
+        groups.setdefault(key, []).append(operation)
+    return list(groups.values())
+
+
+def _phases(operations):
+    phases = {}
+    for operation in operations:
+        phases.setdefault(operation["phase"], []).append(operation)
+    return phases.items()
+
+
+def _start_phase(context, phase, operations):
+    if context.events:
+        context.events.start_phase(phase, len(operations))
+    return time.time()
+
+
+def _print_phase(context, phase, succeeded, total, started_at):
+    if context.events:
+        context.events.finish_phase(phase)
+    else:
+        print(f"Phase {phase}: {succeeded}/{total} operations succeeded in {time.time() - started_at:.1f}s.")
+
+
+def execute_plan(operations, client, context, concurrency=32):
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for phase, phase_operations in _phases(operations):
+            started_at = _start_phase(context, phase, phase_operations)
+
+            def run_group(group):
+                return [run_operation(context, client, operation) for operation in group]
+
+            outcomes = [ok for group in executor.map(run_group, _groups(phase_operations)) for ok in group]
+            results[phase] = (sum(outcomes), len(outcomes))
+            _print_phase(context, phase, sum(outcomes), len(outcomes), started_at)
+    return results
+
+
+async def execute_plan_async(operations, client, context, concurrency=256):
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def run_group(group):
+        outcomes = []
+        for operation in group:
+            async with semaphore:
+                outcomes.append(await run_operation_async(context, client, operation))
+        return outcomes
+
+    for phase, phase_operations in _phases(operations):
+        started_at = _start_phase(context, phase, phase_operations)
+        groups = await asyncio.gather(*(run_group(group) for group in _groups(phase_operations)))
+        outcomes = [ok for group in groups for ok in group]
+        results[phase] = (sum(outcomes), len(outcomes))
+        _print_phase(context, phase, sum(outcomes), len(outcomes), started_at)
+    return results
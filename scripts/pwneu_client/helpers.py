@@ -0,0 +1,207 @@
+import atexit
+import csv
+import io
+from .client import PwneuClient, DEFAULT_API_URL
+from .events import EventSink
+from .journal import DEFAULT_SYNC_EVERY, DEFAULT_SYNC_INTERVAL, Journal
+from .metrics import ClientMetrics
+from .paging import DEFAULT_PAGE_WINDOW, USERS_MAX_PAGE_SIZE, CHALLENGES_MAX_PAGE_SIZE, paginate
+from .ratelimit import RateLimiter
+from .synthetic import DEFAULT_POOLS_DIR, load_pools
+from .tokens import DEFAULT_TOKEN_STORE_PATH, TokenStore, authenticate, authenticate_async
+from .trace import TraceRecorder
+
+
+def add_client_arguments(parser):
+    parser.add_argument("--api-url", type=str, default=DEFAULT_API_URL, help="Base URL of the API.")
+    parser.add_argument("--pool-size", type=int, default=100, help="Maximum kept-alive connections per API host.")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 (requires httpx[http2]).")
+    parser.add_argument("--token-store", type=str, default=DEFAULT_TOKEN_STORE_PATH, help="File caching access and refresh tokens between runs.")
+    parser.add_argument("--no-token-store", action="store_true", help="Always log in with a password instead of reusing cached tokens.")
+    parser.add_argument("--rate-limits", choices=["learn", "production", "off"], default="learn",
+                        help="Client throttling: learn windows from 429 responses, pace to the production policies from the start, or disable.")
+    parser.add_argument("--max-retries", type=int, default=8, help="Retries for a request rejected with 429.")
+    parser.add_argument("--record-trace", type=str, default=None, help="Append every request to this NDJSON trace for replay_traffic.py.")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve client metrics for Prometheus on this port (e.g. 9464).")
+    parser.add_argument("--metrics-file", type=str, default=None, help="Write timestamped client metrics to this OpenMetrics file on exit.")
+
+
+def add_event_arguments(parser):
+    parser.add_argument("--verbose", action="store_true", help="Print every request's outcome instead of only the first failures of each phase.")
+    parser.add_argument("--results", type=str, default=None, help="Append every request's outcome to this NDJSON file.")
+    parser.add_argument("--progress-interval", type=float, default=1, help="Seconds between progress updates (0 disables them).")
+
+
+def event_sink_from_args(args):
+    return EventSink(args.results, verbose=args.verbose, interval=args.progress_interval)
+
+
+def add_journal_arguments(parser):
+    parser.add_argument("--journal", type=str, default=None, help="Record completed steps in this file and skip them when run again with it.")
+    parser.add_argument("--journal-sync-interval", type=float, default=DEFAULT_SYNC_INTERVAL, help="Seconds between fsyncs of the journal.")
+    parser.add_argument("--journal-sync-every", type=int, default=DEFAULT_SYNC_EVERY, help="Completed steps that trigger an early fsync of the journal.")
+
+
+def journal_from_args(args, part=None):
+    if not args.journal:
+        return None
+    return Journal(args.journal, part, sync_interval=args.journal_sync_interval, sync_every=args.journal_sync_every)
+
+
+def add_data_arguments(parser):
+    parser.add_argument("--data-seed", type=int, default=0, help="Seed of the name and word pools synthetic records are drawn from.")
+    parser.add_argument("--data-pools-dir", type=str, default=DEFAULT_POOLS_DIR, help="Directory caching the generated pools between runs.")
+    parser.add_argument("--refresh-data-pools", action="store_true", help="Rebuild the pools with Faker instead of reading the cached ones.")
+
+
+def data_pools_from_args(args):
+    return load_pools(args.data_seed, args.data_pools_dir, args.refresh_data_pools)
+
+
+def token_store_from_args(args):
+    return None if args.no_token_store else TokenStore(args.token_store)
+
+
+def rate_limiter_from_args(args):
+    return RateLimiter(args.rate_limits, max_retries=args.max_retries)
+
+
+def trace_recorder_from_args(args):
+    return TraceRecorder(args.record_trace) if args.record_trace else None
+
+
+# Metrics are shared by every client a script creates, so they are closed at exit rather than
+# when the first client closes.
+def metrics_from_args(args):
+    if args.metrics_port is None and not args.metrics_file:
+        return None
+    metrics = ClientMetrics()
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+    if args.metrics_file:
+        metrics.record_to(args.metrics_file)
+    atexit.register(metrics.close)
+    return metrics
+
+
+def client_from_args(args, token_store=None, rate_limiter=None, recorder=None, metrics=None):
+    token_store = token_store or token_store_from_args(args)
+    rate_limiter = rate_limiter or rate_limiter_from_args(args)
+    recorder = recorder or trace_recorder_from_args(args)
+    metrics = metrics or metrics_from_args(args)
+    return PwneuClient(args.api_url, pool_maxsize=args.pool_size, http2=args.http2, token_store=token_store,
+                       rate_limiter=rate_limiter, recorder=recorder, metrics=metrics)
+
+
+def login_admin(client, admin_password):
+    entry, failed_response = authenticate(client, "admin", admin_password)
+
+    if entry:
+        print("Admin logged in successfully. Access token retrieved.")
+        return entry['accessToken']
+    else:
+        print(f"Failed to log in admin. Status code: {failed_response.status_code}, Response: {failed_response.text}")
+        return None
+
+
+def _member_access_token(entry, failed_response, user_name, events=None):
+    if entry:
+        if "Member" in entry.get("roles", []):
+            message, status = f"User '{user_name}' logged in successfully.", None
+        else:
+            message, status = f"User '{user_name}' does not have 'Member' role. Skipping.", "not a member"
+    else:
+        message, status = (f"Failed to log in user '{user_name}'. Status code: {failed_response.status_code}, "
+                           f"Response: {failed_response.text}"), failed_response.status_code
+
+    if events:
+        events.record("logins", entry is not None, status, message, user=user_name)
+    else:
+        print(message)
+    return entry['accessToken'] if entry and status is None else None
+
+
+def login_user(client, user_name, password, events=None):
+    return _member_access_token(*authenticate(client, user_name, password), user_name, events)
+
+
+async def login_user_async(client, user_name, password, events=None):
+    return _member_access_token(*await authenticate_async(client, user_name, password), user_name, events)
+
+
+def iter_users(client, access_token, window=DEFAULT_PAGE_WINDOW, ordered=True, **params):
+    def fetch_page(page, page_size):
+        return client.get_users(access_token, page=page, pageSize=page_size, **params)
+
+    return paginate(fetch_page, "users", USERS_MAX_PAGE_SIZE, window, ordered)
+
+
+def iter_challenges(client, access_token, window=DEFAULT_PAGE_WINDOW, ordered=True, **params):
+    def fetch_page(page, page_size):
+        return client.get_challenges(access_token, page=page, pageSize=page_size, **params)
+
+    return paginate(fetch_page, "challenges", CHALLENGES_MAX_PAGE_SIZE, window, ordered)
+
+
+def fetch_all_users(client, access_token, window=DEFAULT_PAGE_WINDOW, **params):
+    users = list(iter_users(client, access_token, window, **params))
+    print(f"Total users retrieved: {len(users)}")
+    return users
+
+
+def fetch_all_challenges(client, access_token, window=DEFAULT_PAGE_WINDOW, **params):
+    challenges = list(iter_challenges(client, access_token, window, **params))
+    print(f"Total challenges retrieved: {len(challenges)}")
+    return challenges
+
+
+# play/challenges/all returns every challenge id in one response, so callers that only
+# need ids should use it instead of paging through play/challenges.
+def fetch_all_challenge_ids(client, access_token):
+    response = client.get_all_challenge_ids(access_token)
+
+    if response.status_code == 200:
+        challenge_ids = response.json()
+        print(f"Total challenges retrieved: {len(challenge_ids)}")
+        return challenge_ids
+    else:
+        print(f"Failed to fetch challenges. Status code: {response.status_code}, Response: {response.text}")
+        return []
+
+
+def fetch_all_categories(client, access_token):
+    response = client.get_all_categories(access_token)
+
+    if response.status_code == 200:
+        categories = response.json()
+        print(f"Total categories retrieved: {len(categories)}")
+        return categories
+    else:
+        print(f"Failed to fetch categories. Status code: {response.status_code}, Response: {response.text}")
+        return []
+
+
+def fetch_all_members(client, access_token):
+    # The members export lists every user outside the Manager role (admins are managers too),
+    # so one admin-side call replaces a login per user. Returns {id: userName}.
+    response = client.export_members(access_token)
+
+    if response.status_code == 200:
+        members = {row['Id']: row['Username'] for row in csv.DictReader(io.StringIO(response.text))}
+        print(f"Total members retrieved: {len(members)}")
+        return members
+    else:
+        print(f"Failed to export members. Status code: {response.status_code}, Response: {response.text}")
+        return {}
+
+
+def fetch_all_access_keys(client, access_token):
+    response = client.get_access_keys(access_token)
+
+    if response.status_code == 200:
+        access_keys = response.json()
+        print(f"Total access keys retrieved: {len(access_keys)}")
+        return access_keys
+    else:
+        print(f"Failed to fetch access keys. Status code: {response.status_code}, Response: {response.text}")
+        return []
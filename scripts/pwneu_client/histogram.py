@@ -0,0 +1,87 @@
+import math
+
+# Log-linear histogram in the spirit of HdrHistogram. Values are integers (microseconds by default).
+# Each power-of-two range is split into 2 ** sub_bucket_bits linear buckets, so the relative
+# error of any recorded value is bounded by 2 ** -sub_bucket_bits regardless of magnitude.
+
+
+class Histogram:
+    def __init__(self, sub_bucket_bits=7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = {}
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        key = self._bucket(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("Cannot merge histograms with different precision.")
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.total:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent):
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(self.total * percent / 100))
+        seen = 0
+        for shift, sub_bucket in sorted(self.counts, key=lambda key: key[1] << key[0]):
+            seen += self.counts[(shift, sub_bucket)]
+            if seen >= target:
+                # Report the highest value the bucket can hold, as HdrHistogram does.
+                return min(((sub_bucket + 1) << shift) - 1, self.max)
+        return self.max
+
+    def count_above(self, value):
+        # Counts by bucket, so values sharing a bucket with `value` are counted too.
+        return sum(count for (shift, sub_bucket), count in self.counts.items() if ((sub_bucket + 1) << shift) - 1 > value)
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0
+
+    def to_dict(self):
+        return {
+            "subBucketBits": self.sub_bucket_bits,
+            "total": self.total,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "counts": [[shift, sub_bucket, count] for (shift, sub_bucket), count in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["subBucketBits"])
+        histogram.counts = {(shift, sub_bucket): count for shift, sub_bucket, count in data["counts"]}
+        histogram.total = data["total"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def format_latency_summary(label, histogram, duration):
+    throughput = histogram.total / duration if duration > 0 else 0
+    p50, p90, p99, p999 = (histogram.percentile(p) / 1000 for p in (50, 90, 99, 99.9))
+    return (
+        f"{label:<21} count={histogram.total:<8} rps={throughput:<9.1f} "
+        f"p50={p50:.1f}ms p90={p90:.1f}ms p99={p99:.1f}ms p99.9={p999:.1f}ms max={(histogram.max or 0) / 1000:.1f}ms"
+    )
@@ -0,0 +1,117 @@
+import glob
+import json
+import os
+import threading
+
+# An append-only record of completed plan steps, so a long seed run that crashes or loses the
+# network can be started again and skip what already went through, instead of sending those
+# submissions (and their attempts) twice.
+#
+# The file is NDJSON: a header row {"plan": {...}} describing how the steps were generated, then
+# one {"step": key, ...fields} row per completed step; the fields are only there for people
+# reading the file. Marking a step done is a set insert and a list append under a lock. A
+# background thread writes the pending rows and fsyncs every `sync_interval` seconds, or as soon
+# as `sync_every` rows are pending, so a crash loses at most that much and those steps are simply
+# sent again on restart. A row cut off by a crash is ignored.
+#
+# Worker processes each append to their own part (path.0, path.1, ...); opening a journal reads
+# the base file and every part, so a run can resume with a different number of workers.
+
+DEFAULT_SYNC_INTERVAL = 1.0
+DEFAULT_SYNC_EVERY = 10000
+
+
+class Journal:
+    def __init__(self, path, part=None, sync_interval=DEFAULT_SYNC_INTERVAL, sync_every=DEFAULT_SYNC_EVERY):
+        self.path = path
+        self.write_path = path if part is None else f"{path}.{part}"
+        self.sync_interval = sync_interval
+        self.sync_every = sync_every
+        self.plan = None
+        self.steps = set()
+        self.skipped = 0
+        self.pending = []
+        self.lock = threading.Lock()
+        self.file_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        for part_path in self.part_paths():
+            self._load(part_path)
+        self.resumed = len(self.steps)
+        self.file = open(self.write_path, "a", encoding="utf-8")
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def part_paths(self):
+        parts = [path for path in glob.glob(glob.escape(self.path) + ".*") if path.rsplit(".", 1)[1].isdigit()]
+        return ([self.path] if os.path.exists(self.path) else []) + sorted(parts, key=lambda path: int(path.rsplit(".", 1)[1]))
+
+    def _load(self, path):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if "plan" in row:
+                    self.plan = self.plan or row["plan"]
+                elif "step" in row:
+                    self.steps.add(row["step"])
+
+    def use_plan(self, plan):
+        # Returns the plan the journal was started with, or records `plan` for a new journal. A
+        # resumed run must generate its steps from the stored plan, or the keys won't line up.
+        if self.plan is None:
+            self.plan = plan
+            with self.file_lock:
+                self.file.write(json.dumps({"plan": plan}, separators=(",", ":")) + "\n")
+                self.file.flush()
+                os.fsync(self.file.fileno())
+        return self.plan
+
+    def done(self, key):
+        # Counts the hit, since callers ask exactly once per step they would otherwise send.
+        if key not in self.steps:
+            return False
+        with self.lock:
+            self.skipped += 1
+        return True
+
+    def record(self, key, **fields):
+        with self.lock:
+            self.steps.add(key)
+            self.pending.append(dict(step=key, **fields))
+            if len(self.pending) >= self.sync_every:
+                self.wake.set()
+
+    def _sync(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+        if rows:
+            with self.file_lock:
+                self.file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def _flush_loop(self):
+        while not self.stopped:
+            self.wake.wait(self.sync_interval)
+            self.wake.clear()
+            self._sync()
+
+    def close(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        self.wake.set()
+        self.flusher.join()
+        self._sync()
+        self.file.close()
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from .histogram import Histogram, format_latency_summary
+
+
+def rate_at(elapsed, rate, rate_end, duration):
+    if rate_end is None or duration <= 0:
+        return rate
+    return rate + (rate_end - rate) * min(elapsed / duration, 1.0)
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.histograms = {}
+        self.dropped = 0
+        self.max_backlog = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, status_class, latency_seconds, offset=None):
+        histogram = self.histograms.get(status_class)
+        if histogram is None:
+            histogram = self.histograms[status_class] = Histogram()
+        histogram.record(latency_seconds * 1_000_000)
+
+    def overall(self):
+        overall = Histogram()
+        for histogram in self.histograms.values():
+            overall.merge(histogram)
+        return overall
+
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0
+        return self.finished_at - self.started_at
+
+    # to_dict/from_dict/merge let recorders from worker processes (see workers.py) be combined
+    # into one report. started_at/finished_at are wall-clock times, so they compare across processes.
+    def to_dict(self):
+        return {
+            "histograms": {status_class: histogram.to_dict() for status_class, histogram in self.histograms.items()},
+            "dropped": self.dropped,
+            "maxBacklog": self.max_backlog,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        recorder = cls()
+        recorder.histograms = {status_class: Histogram.from_dict(histogram) for status_class, histogram in data["histograms"].items()}
+        recorder.dropped = data["dropped"]
+        recorder.max_backlog = data["maxBacklog"]
+        recorder.started_at = data["startedAt"]
+        recorder.finished_at = data["finishedAt"]
+        return recorder
+
+    def merge(self, other):
+        for status_class, histogram in other.histograms.items():
+            self.histograms.setdefault(status_class, Histogram()).merge(histogram)
+        self.dropped += other.dropped
+        self.max_backlog = max(self.max_backlog, other.max_backlog)
+        if other.started_at is not None:
+            self.started_at = other.started_at if self.started_at is None else min(self.started_at, other.started_at)
+        if other.finished_at is not None:
+            self.finished_at = other.finished_at if self.finished_at is None else max(self.finished_at, other.finished_at)
+
+    def print_report(self, status_classes=()):
+        duration = self.duration()
+        print(f"Duration: {duration:.1f}s, dropped (client in-flight limit): {self.dropped}, peak backlog: {self.max_backlog}")
+        for status_class in list(status_classes) + sorted(set(self.histograms) - set(status_classes)):
+            if status_class in self.histograms:
+                print(format_latency_summary(status_class, self.histograms[status_class], duration))
+        print(format_latency_summary("total", self.overall(), duration))
+
+
+# Adds per-window histograms keyed by when each request was due to start (seconds since the run
+# began), so latency can be followed over time, e.g. around a cache clear.
+class TimelineRecorder(LatencyRecorder):
+    def __init__(self, window_seconds=1.0):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.windows = {}
+
+    def record(self, status_class, latency_seconds, offset=None):
+        super().record(status_class, latency_seconds)
+        if offset is None:
+            return
+        window = self.windows.setdefault(int(offset // self.window_seconds), {})
+        histogram = window.get(status_class)
+        if histogram is None:
+            histogram = window[status_class] = Histogram()
+        histogram.record(latency_seconds * 1_000_000)
+
+    def window_histogram(self, index, status_classes=None):
+        merged = Histogram()
+        for status_class, histogram in self.windows.get(index, {}).items():
+            if status_classes is None or status_class in status_classes:
+                merged.merge(histogram)
+        return merged
+
+
+# Open-loop driver: arrivals follow a precomputed schedule and never wait for earlier responses.
+# Latency is measured from the intended start time, so a slow server shows up as latency rather
+# than as a lower send rate (no coordinated omission). A fixed set of `workers` senders, sized to
+# the connection pool, takes arrivals from a backlog queue; arrivals that find `max_in_flight`
+# requests already pending (sending or queued) are counted as dropped.
+async def run_open_loop(send, recorder, rate, duration, rate_end=None, max_in_flight=1000, workers=100):
+    loop = asyncio.get_running_loop()
+    backlog = asyncio.Queue()
+    pending = 0
+
+    async def worker():
+        nonlocal pending
+        while True:
+            arrival = await backlog.get()
+            if arrival is None:
+                return
+            intended_start, sequence = arrival
+            try:
+                status_class = await send(sequence)
+            finally:
+                pending -= 1
+            recorder.record(status_class, loop.time() - intended_start, intended_start - start)
+
+    senders = [loop.create_task(worker()) for _ in range(max(1, min(workers, max_in_flight)))]
+    start = loop.time()
+    recorder.started_at = time.time()
+    next_offset = 0.0
+    sequence = 0
+
+    while next_offset < duration:
+        delay = start + next_offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if pending >= max_in_flight:
+            recorder.dropped += 1
+        else:
+            pending += 1
+            backlog.put_nowait((start + next_offset, sequence))
+            recorder.max_backlog = max(recorder.max_backlog, backlog.qsize())
+
+        sequence += 1
+        current_rate = rate_at(next_offset, rate, rate_end, duration)
+        next_offset += 1.0 / current_rate if current_rate > 0 else 0.1
+
+    for _ in senders:
+        backlog.put_nowait(None)
+    await asyncio.gather(*senders)
+    recorder.finished_at = time.time()
@@ -0,0 +1,199 @@
+import bisect
+import http.server
+import os
+import tempfile
+import threading
+import time
+from .trace import endpoint_template
+
+# Client-side request metrics in the Prometheus/OpenMetrics text format. The duration buckets
+# match the ones ASP.NET Core's OpenTelemetry instrumentation uses for the API's own
+# http_server_request_duration_seconds, so client and server histograms can share a panel.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 7.5, 10)
+
+_BUCKET_LABELS = [str(float(bound)) for bound in DURATION_BUCKETS] + ["+Inf"]
+
+DEFAULT_METRICS_PORT = 9464
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class _Series:
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+class ClientMetrics:
+    def __init__(self, namespace="pwneu_client"):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.durations = {}
+        self.in_flight = {}
+        self.retries = {}
+        self.throttled = {}
+        self.bytes_sent = {}
+        self.bytes_received = {}
+        self.server = None
+        self.snapshot_path = None
+        self.snapshots = []
+        self.snapshot_stop = None
+
+    # Instrumentation
+
+    def start(self, method, path):
+        key = (method, endpoint_template(path))
+        with self.lock:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return key, time.perf_counter()
+
+    def finish(self, started, content, response, received=None):
+        # Streamed responses pass `received`, since their body was read by the caller.
+        key, started_at = started
+        seconds = time.perf_counter() - started_at
+        status = str(response.status_code) if response is not None else "error"
+        series_key = key + (status,)
+        if received is None:
+            received = len(response.content) if response is not None else 0
+
+        with self.lock:
+            self.in_flight[key] -= 1
+            series = self.durations.get(series_key)
+            if series is None:
+                series = self.durations[series_key] = _Series()
+            series.buckets[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+            series.count += 1
+            series.sum += seconds
+            self.bytes_sent[key] = self.bytes_sent.get(key, 0) + len(content or b"")
+            self.bytes_received[key] = self.bytes_received.get(key, 0) + received
+            if status == "429":
+                self.throttled[key] = self.throttled.get(key, 0) + 1
+
+    def retried(self, method, path):
+        key = (method, endpoint_template(path))
+        with self.lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    # Exposition
+
+    def families(self):
+        # Returns (name, type, help, [(suffix, labels, value)]) for every metric family.
+        prefix = self.namespace
+        route = ("method", "route")
+        with self.lock:
+            requests = [("_total", _labels(route + ("status",), key), series.count) for key, series in self.durations.items()]
+            durations = []
+            for key, series in self.durations.items():
+                labels = _labels(route + ("status",), key)
+                cumulative = 0
+                for bound, count in zip(_BUCKET_LABELS, series.buckets):
+                    cumulative += count
+                    durations.append(("_bucket", f'{labels},le="{bound}"', cumulative))
+                durations.append(("_count", labels, series.count))
+                durations.append(("_sum", labels, round(series.sum, 6)))
+            gauges = [("", _labels(route, key), value) for key, value in self.in_flight.items()]
+            counters = {
+                "retries": [("_total", _labels(route, key), value) for key, value in self.retries.items()],
+                "throttled": [("_total", _labels(route, key), value) for key, value in self.throttled.items()],
+                "request_body_bytes": [("_total", _labels(route, key), value) for key, value in self.bytes_sent.items()],
+                "response_body_bytes": [("_total", _labels(route, key), value) for key, value in self.bytes_received.items()],
+            }
+
+        return [
+            (f"{prefix}_requests", "counter", "Requests completed, by endpoint and status.", requests),
+            (f"{prefix}_request_duration_seconds", "histogram", "Client-observed request duration.", durations),
+            (f"{prefix}_requests_in_flight", "gauge", "Requests currently waiting for a response.", gauges),
+            (f"{prefix}_retries", "counter", "Requests re-sent after a 429.", counters["retries"]),
+            (f"{prefix}_throttled", "counter", "Responses with status 429.", counters["throttled"]),
+            (f"{prefix}_request_body_bytes", "counter", "Request body bytes sent.", counters["request_body_bytes"]),
+            (f"{prefix}_response_body_bytes", "counter", "Response body bytes received.", counters["response_body_bytes"]),
+        ]
+
+    def render(self):
+        lines = []
+        for name, metric_type, help_text, samples in self.families():
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"# HELP {name} {help_text}")
+            lines.extend(f"{name}{suffix}{{{labels}}} {value}" for suffix, labels, value in samples)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    # Scrape endpoint for a running Prometheus (see the pwneu-scripts job in conf/prometheus.yml).
+
+    def serve(self, port=DEFAULT_METRICS_PORT, host="0.0.0.0"):
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving client metrics on http://{host}:{port}/metrics")
+
+    # Timestamped OpenMetrics file for runs Prometheus didn't scrape. Snapshots are taken every
+    # `interval` seconds and written grouped by family, which is what
+    # `promtool tsdb create-blocks-from openmetrics` expects for backfilling.
+
+    def record_to(self, path, interval=5):
+        self.snapshot_path = path
+        self.snapshot_stop = threading.Event()
+
+        def take_snapshots():
+            while not self.snapshot_stop.wait(interval):
+                self._snapshot()
+
+        threading.Thread(target=take_snapshots, daemon=True).start()
+
+    def _snapshot(self):
+        self.snapshots.append((time.time(), self.families()))
+
+    def _write_snapshots(self):
+        # A histogram's buckets, count and sum form one point per timestamp, so samples are
+        # grouped by their labels without "le", then written one timestamp at a time.
+        headers = {}
+        points_by_family = {}
+        for timestamp, families in self.snapshots:
+            for name, metric_type, help_text, samples in families:
+                headers[name] = (metric_type, help_text)
+                points = points_by_family.setdefault(name, {})
+                blocks = {}
+                for suffix, labels, value in samples:
+                    line = f"{name}{suffix}{{{labels}}} {value} {timestamp:.3f}"
+                    blocks.setdefault(labels.split(',le="')[0], []).append(line)
+                for series, lines in blocks.items():
+                    points.setdefault(series, []).extend(lines)
+
+        directory = os.path.dirname(self.snapshot_path) or "."
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        with os.fdopen(file_descriptor, "w") as file:
+            for name, (metric_type, help_text) in headers.items():
+                file.write(f"# TYPE {name} {metric_type}\n# HELP {name} {help_text}\n")
+                for lines in points_by_family[name].values():
+                    file.write("\n".join(lines))
+                    file.write("\n")
+            file.write("# EOF\n")
+        os.replace(temp_path, self.snapshot_path)
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.snapshot_path:
+            self.snapshot_stop.set()
+            self._snapshot()
+            self._write_snapshots()
+            print(f"Client metrics written to {self.snapshot_path}")
+            self.snapshot_path = None
@@ -0,0 +1,60 @@
+import collections
+import concurrent.futures
+import itertools
+import math
+
+DEFAULT_PAGE_WINDOW = 8
+
+# Largest page sizes the API accepts (GetUsers caps at 50, GetChallenges at 20, the solve
+# listing at 30 and the hint usage listing at 20).
+USERS_MAX_PAGE_SIZE = 50
+CHALLENGES_MAX_PAGE_SIZE = 20
+SOLVES_MAX_PAGE_SIZE = 30
+HINT_USAGES_MAX_PAGE_SIZE = 20
+
+
+# Streams the items of a PagedList endpoint. The first page tells us totalCount, then the
+# remaining pages are fetched concurrently, at most `window` at a time. With ordered=True
+# items come out in page order; otherwise each page is yielded as soon as it arrives.
+def paginate(fetch_page, label, page_size, window=DEFAULT_PAGE_WINDOW, ordered=True):
+    response = fetch_page(1, page_size)
+    if response.status_code != 200:
+        print(f"Failed to fetch {label}. Status code: {response.status_code}, Response: {response.text}")
+        return
+
+    data = response.json()
+    yield from data['items']
+
+    page_size = data.get('pageSize') or page_size
+    total_pages = math.ceil(data['totalCount'] / page_size)
+    if total_pages <= 1:
+        return
+
+    def fetch(page):
+        return page, fetch_page(page, page_size)
+
+    def items_of(page, response):
+        if response.status_code == 200:
+            return response.json()['items']
+        print(f"Failed to fetch {label} page {page}. Status code: {response.status_code}, Response: {response.text}")
+        return []
+
+    pages = iter(range(2, total_pages + 1))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=window) as executor:
+        if ordered:
+            pending = collections.deque(executor.submit(fetch, page) for page in itertools.islice(pages, window))
+            while pending:
+                page, response = pending.popleft().result()
+                for next_page in itertools.islice(pages, 1):
+                    pending.append(executor.submit(fetch, next_page))
+                yield from items_of(page, response)
+        else:
+            pending = {executor.submit(fetch, page) for page in itertools.islice(pages, window)}
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for next_page in itertools.islice(pages, 1):
+                        pending.add(executor.submit(fetch, next_page))
+                for future in done:
+                    yield from items_of(*future.result())
@@ -0,0 +1,188 @@
+import collections
+import random
+import re
+import threading
+import time
+
+
+# Thread-safe token bucket: `rate` permits per second refill up to `capacity`.
+# acquire() blocks until a permit is available.
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self):
+        # Takes a permit now and returns how long the caller must wait before using it.
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Production policies from ConfigureProductionRateLimiter in RateLimitingExtensions.cs:
+# name -> (permit limit, window seconds, partition). "user" policies are partitioned by the
+# logged-in user, "ip" policies by the Cf-Connecting-Ip header.
+PRODUCTION_POLICIES = {
+    "Fixed": (10, 10, "user"),
+    "ExpensiveRequest": (2, 10, "user"),
+    "VerifyEmail": (3, 10, "ip"),
+    "OnceEveryMinute": (1, 60, "ip"),
+    "AntiEmailAbuse": (6, 86400, "ip"),
+    "GetUsers": (10, 10, "user"),
+    "Registration": (100, 60, "ip"),
+    "ResetPassword": (5, 60, "ip"),
+    "FileGeneration": (5, 60, "user"),
+    "GetArtifact": (3, 10, "user"),
+    "GetChallenges": (10, 5, "user"),
+    "UseHint": (4, 10, "user"),
+}
+
+_GUID = r"[^/]+"
+
+# (method, path pattern, policy) for every endpoint that calls RequireRateLimiting.
+ENDPOINT_POLICIES = [
+    (method, re.compile(f"^{pattern}$"), policy) for method, pattern, policy in [
+        ("GET", "identity/users", "GetUsers"),
+        ("POST", "identity/register", "Registration"),
+        ("POST", "identity/verify", "VerifyEmail"),
+        ("PUT", "identity/me/password", "OnceEveryMinute"),
+        ("PUT", "identity/resetPassword", "ResetPassword"),
+        ("POST", "identity/forgotPassword", "AntiEmailAbuse"),
+        ("GET", "identity/resend", "AntiEmailAbuse"),
+        ("GET", "identity/members/export", "FileGeneration"),
+        ("GET", "identity/me/certificate(/check)?", "FileGeneration"),
+        ("GET", "play/challenges", "GetChallenges"),
+        ("POST", f"play/hints/{_GUID}", "UseHint"),
+        ("GET", f"play/hints/{_GUID}/check", "Fixed"),
+        ("GET", f"play/artifacts/{_GUID}", "GetArtifact"),
+        ("GET", f"play/challenges/{_GUID}/(solves|hintUsages)", "Fixed"),
+        ("GET", "play/leaderboards", "Fixed"),
+        ("GET", "play/leaderboards/download", "FileGeneration"),
+        ("DELETE", "play/leaderboards/recalculate", "OnceEveryMinute"),
+        ("GET", "play/me/(data|solves|hintUsages)", "Fixed"),
+        ("GET", f"play/users/{_GUID}/(solves|hintUsages)", "Fixed"),
+        ("GET", "play/me/(graph|evaluate)", "ExpensiveRequest"),
+        ("GET", "play/me/stats", "FileGeneration"),
+        ("GET", "play/audits", "Fixed"),
+        ("GET", "chat/conversations(/me)?", "Fixed"),
+        ("POST", "chat/conversations", "Fixed"),
+        ("GET", "analysis/categories/leaderboards", "ExpensiveRequest"),
+    ]
+]
+
+
+def policy_for(method, path):
+    for policy_method, pattern, policy in ENDPOINT_POLICIES:
+        if policy_method == method and pattern.match(path):
+            return policy
+    return None
+
+
+# Keeps at most `limit` starts in any `window`-second span. Because that holds for every span,
+# it also holds for whichever fixed window the server happens to be counting.
+class SlidingWindow:
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.starts = collections.deque(maxlen=limit)
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            start = now if len(self.starts) < self.limit else max(now, self.starts[0] + self.window)
+            self.starts.append(start)
+            return start - now
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+# Client-side throttling per (policy, partition).
+#   learn:      send freely; the first 429 on a policy switches that partition to the policy's window.
+#   production: pace every known policy from the start.
+#   off:        no pacing and no retries.
+# In learn and production modes a 429 is retried after Retry-After, or after a jittered
+# exponential backoff, up to max_retries times.
+class RateLimiter:
+    def __init__(self, mode="learn", policies=PRODUCTION_POLICIES, max_retries=8, base_backoff=0.5, max_backoff=30.0):
+        self.mode = mode
+        self.policies = policies
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.windows = {}
+        self.lock = threading.Lock()
+        self.throttled = 0
+        self.retries = 0
+
+    def _partition(self, policy, access_token):
+        _, _, partition = self.policies[policy]
+        return (policy, access_token or "") if partition == "user" else (policy, "")
+
+    def _install_window(self, policy, access_token):
+        partition = self._partition(policy, access_token)
+        with self.lock:
+            window = self.windows.get(partition)
+            if window is None:
+                limit, seconds, _ = self.policies[policy]
+                window = self.windows[partition] = SlidingWindow(limit, seconds)
+            return window
+
+    def before_request(self, method, path, access_token):
+        if self.mode == "off":
+            return 0.0
+
+        policy = policy_for(method, path)
+        if policy is None or policy not in self.policies:
+            return 0.0
+
+        if self.mode == "production":
+            window = self._install_window(policy, access_token)
+        else:
+            window = self.windows.get(self._partition(policy, access_token))
+
+        return window.reserve() if window else 0.0
+
+    def after_response(self, method, path, access_token, response, attempt):
+        if response.status_code != 429:
+            return None
+
+        with self.lock:
+            self.throttled += 1
+
+        if self.mode == "off" or attempt >= self.max_retries:
+            return None
+
+        policy = policy_for(method, path)
+        if policy in self.policies:
+            self._install_window(policy, access_token)
+
+        with self.lock:
+            self.retries += 1
+
+        delay = retry_after_seconds(response)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        return delay
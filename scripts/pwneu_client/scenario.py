@@ -0,0 +1,213 @@
+import json
+import random
+
+# A scenario describes a dataset and its traffic declaratively; compile_plan() turns it into a
+# flat, deterministic list of operations. The same scenario and seed always compile to the same
+# plan, so two runs against different API builds send exactly the same work.
+
+DEFAULT_SCENARIO = {
+    "name": "default",
+    "seed": 1,
+    "users": {
+        "count": 30,
+        "userNamePrefix": "player",
+        "password": "PwneuPwneu!1",
+        "emailDomain": "example.com",
+    },
+    "categories": {"count": 7},
+    "challenges": {
+        "perCategory": 30,
+        "points": [50, 500],
+        "pointsStep": 50,
+        "maxAttempts": 0,
+        "flag": "PWNEU{PWNEU}",
+    },
+    "hints": {
+        "perChallenge": 1,
+        "deduction": [5, 50],
+        "deductionStep": 5,
+        "usedFraction": [0.3, 0.6],
+    },
+    "submissions": {
+        "solvedFraction": [0.7, 1.0],
+        "incorrectAttempts": [1, 3],
+        "incorrectFlag": "INCORRECT_FLAG",
+    },
+}
+
+PHASES = [
+    "setup",
+    "users",
+    "resolve",
+    "verify",
+    "categories",
+    "challenges",
+    "hints",
+    "logins",
+    "hint_usages",
+    "submissions",
+]
+
+_WORDS = [
+    "alpha", "binary", "cipher", "daemon", "exploit", "forensic", "gadget", "hash", "inject",
+    "kernel", "lattice", "memory", "nonce", "overflow", "packet", "quantum", "reverse", "shell",
+    "token", "unicode", "vector", "web", "xor", "yara", "zero",
+]
+
+
+def merge_config(defaults, overrides):
+    # Deep-merges nested dicts; anything else in `overrides` (lists included) replaces the default.
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(defaults.get(key), dict):
+            merged[key] = merge_config(defaults[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_scenario(path):
+    with open(path) as file:
+        if path.endswith((".yml", ".yaml")):
+            try:
+                import yaml  # type: ignore
+            except ImportError:
+                raise RuntimeError("YAML scenarios require PyYAML. Install it with: pip install pyyaml")
+            overrides = yaml.safe_load(file)
+        else:
+            overrides = json.load(file)
+    return merge_config(DEFAULT_SCENARIO, overrides or {})
+
+
+def _stepped(rng, bounds, step):
+    low, high = bounds
+    return rng.randint(low // step, high // step) * step
+
+
+def _fraction_count(rng, bounds, total, minimum=0):
+    low, high = bounds
+    return min(total, max(minimum, rng.randint(int(total * low), int(total * high))))
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+
+def compile_plan(scenario):
+    rng = random.Random(scenario["seed"])
+    users = scenario["users"]
+    challenges_spec = scenario["challenges"]
+    hints_spec = scenario["hints"]
+    submissions_spec = scenario["submissions"]
+    operations = []
+
+    def add(phase, op, actor=None, **fields):
+        operations.append({"step": len(operations), "phase": phase, "op": op, "actor": actor, **fields})
+
+    add("setup", "create_access_key")
+    add("setup", "allow_submissions")
+
+    user_keys = []
+    for i in range(users["count"]):
+        user_key = f"u{i}"
+        user_keys.append(user_key)
+        user_name = f"{users['userNamePrefix']}{scenario['seed']}n{i}"
+        add(
+            "users",
+            "register",
+            user=user_key,
+            userName=user_name,
+            email=f"{user_name}@{users['emailDomain']}",
+            password=users["password"],
+            fullName=_words(rng, 2).title(),
+        )
+
+    add("resolve", "resolve_users")
+    for user_key in user_keys:
+        add("verify", "verify_user", user=user_key)
+
+    challenge_keys = []
+    hint_keys_by_challenge = {}
+    for c in range(scenario["categories"]["count"]):
+        category_key = f"c{c}"
+        add("categories", "create_category", category=category_key, name=_words(rng, 1).capitalize(), description=_words(rng, 8))
+
+        for h in range(challenges_spec["perCategory"]):
+            challenge_key = f"{category_key}.ch{h}"
+            challenge_keys.append(challenge_key)
+            add(
+                "challenges",
+                "create_challenge",
+                category=category_key,
+                challenge=challenge_key,
+                name=_words(rng, 3),
+                description=_words(rng, 8),
+                points=_stepped(rng, challenges_spec["points"], challenges_spec["pointsStep"]),
+                maxAttempts=challenges_spec["maxAttempts"],
+                flag=challenges_spec["flag"],
+            )
+
+            hint_keys_by_challenge[challenge_key] = []
+            for n in range(hints_spec["perChallenge"]):
+                hint_key = f"{challenge_key}.h{n}"
+                hint_keys_by_challenge[challenge_key].append(hint_key)
+                add(
+                    "hints",
+                    "add_hint",
+                    challenge=challenge_key,
+                    hint=hint_key,
+                    content=_words(rng, 6),
+                    deduction=_stepped(rng, hints_spec["deduction"], hints_spec["deductionStep"]),
+                )
+
+    all_hint_keys = [hint_key for keys in hint_keys_by_challenge.values() for hint_key in keys]
+
+    for user_key in user_keys:
+        add("logins", "login", actor=user_key, user=user_key, password=users["password"])
+
+    # Hints are used before any flag is submitted because UseHint rejects solved challenges.
+    for user_key in user_keys:
+        used_hints = rng.sample(all_hint_keys, k=_fraction_count(rng, hints_spec["usedFraction"], len(all_hint_keys)))
+        for hint_key in used_hints:
+            add("hint_usages", "use_hint", actor=user_key, user=user_key, hint=hint_key)
+
+    for user_key in user_keys:
+        solved = rng.sample(
+            challenge_keys,
+            k=_fraction_count(rng, submissions_spec["solvedFraction"], len(challenge_keys), minimum=min(1, len(challenge_keys))),
+        )
+        for challenge_key in solved:
+            for _ in range(rng.randint(*submissions_spec["incorrectAttempts"])):
+                add("submissions", "submit_flag", actor=user_key, user=user_key, challenge=challenge_key,
+                    flag=submissions_spec["incorrectFlag"], correct=False)
+            add("submissions", "submit_flag", actor=user_key, user=user_key, challenge=challenge_key,
+                flag=challenges_spec["flag"], correct=True)
+
+    return operations
+
+
+def summarize_plan(operations):
+    counts = {}
+    for operation in operations:
+        key = (operation["phase"], operation["op"])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def write_plan(operations, path):
+    with open(path, "w") as file:
+        for operation in operations:
+            file.write(json.dumps(operation, separators=(",", ":")))
+            file.write("\n")
+
+
+def read_plan(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def load_operations(path):
+    # A compiled plan (.ndjson/.jsonl) is read as is; anything else is a scenario to compile.
+    if path.endswith((".ndjson", ".jsonl")):
+        return read_plan(path)
+    return compile_plan(load_scenario(path))
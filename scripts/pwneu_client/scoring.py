@@ -0,0 +1,191 @@
+import re
+from .trace import GUID_PATTERN
+
+# Expected scores are built column-wise: one row per scored event (a solve or a hint usage),
+# deduplicated per (user, item) and summed per user with NumPy, so 100k users are checked with a
+# handful of array operations instead of a loop per user. A user's points are the points of every
+# challenge they solved minus the deduction of every hint they used, which is what
+# SaveBuffersService writes as PointsActivities once the buffers are flushed.
+
+_SUBMIT_PATH = re.compile(rf"play/challenges/({GUID_PATTERN.pattern})/submit")
+_USE_HINT_PATH = re.compile(rf"play/hints/({GUID_PATTERN.pattern})")
+
+MISMATCH_KINDS = ["not registered", "missing", "unexpected", "points", "solves", "hint usages"]
+
+
+def _numpy():
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        raise RuntimeError("The leaderboard verifier requires NumPy. Install it with: pip install numpy")
+    return numpy
+
+
+class ScoredEvents:
+    def __init__(self):
+        self.user_names = set()
+        self.solve_users = []
+        self.solve_challenges = []
+        self.solve_points = []
+        self.hint_users = []
+        self.hint_ids = []
+        self.hint_deductions = []
+        self.unknown_outcomes = 0
+        self.unknown_items = 0
+
+    def add_user(self, user_name):
+        self.user_names.add(user_name)
+
+    def add_solve(self, user_name, challenge, points):
+        self.user_names.add(user_name)
+        self.solve_users.append(user_name)
+        self.solve_challenges.append(challenge)
+        self.solve_points.append(points)
+
+    def add_hint_usage(self, user_name, hint, deduction):
+        self.user_names.add(user_name)
+        self.hint_users.append(user_name)
+        self.hint_ids.append(hint)
+        self.hint_deductions.append(deduction)
+
+
+def events_from_plan(operations):
+    # The plan says what should have happened if every step succeeded. Correct flags submitted
+    # after a challenge's maxAttempts incorrect ones are rejected, so they don't score.
+    events = ScoredEvents()
+    user_names, points, max_attempts, deductions, attempts = {}, {}, {}, {}, {}
+    for operation in operations:
+        op = operation["op"]
+        if op == "register":
+            user_names[operation["user"]] = operation["userName"]
+            events.add_user(operation["userName"])
+        elif op == "create_challenge":
+            points[operation["challenge"]] = operation["points"]
+            max_attempts[operation["challenge"]] = operation.get("maxAttempts", 0)
+        elif op == "add_hint":
+            deductions[operation["hint"]] = operation["deduction"]
+        elif op == "use_hint":
+            events.add_hint_usage(user_names[operation["user"]], operation["hint"], deductions[operation["hint"]])
+        elif op == "submit_flag":
+            key = (operation["user"], operation["challenge"])
+            limit = max_attempts[operation["challenge"]]
+            if limit > 0 and attempts.get(key, 0) >= limit:
+                continue
+            if operation["correct"]:
+                events.add_solve(user_names[operation["user"]], operation["challenge"], points[operation["challenge"]])
+            else:
+                attempts[key] = attempts.get(key, 0) + 1
+    return events
+
+
+def events_from_trace(entries, challenge_points, hint_deductions, admin_user="admin"):
+    # Recorded outcomes: a submission scored if the API answered "Correct" ("o" in the trace) and
+    # a hint usage if UseHint answered 200. Points come from the deployment's current catalog.
+    events = ScoredEvents()
+    for entry in entries:
+        user_name = entry.get("u")
+        if not user_name or user_name == admin_user:
+            continue
+        events.add_user(user_name)
+        if entry["m"] != "POST" or entry["s"] != 200:
+            continue
+
+        match = _SUBMIT_PATH.fullmatch(entry["p"])
+        if match:
+            if "o" not in entry:
+                events.unknown_outcomes += 1
+            elif entry["o"] == "Correct":
+                if match.group(1) in challenge_points:
+                    events.add_solve(user_name, match.group(1), challenge_points[match.group(1)])
+                else:
+                    events.unknown_items += 1
+            continue
+
+        match = _USE_HINT_PATH.fullmatch(entry["p"])
+        if match:
+            if match.group(1) in hint_deductions:
+                events.add_hint_usage(user_name, match.group(1), hint_deductions[match.group(1)])
+            else:
+                events.unknown_items += 1
+    return events
+
+
+class ExpectedScores:
+    def __init__(self, user_names, points, solves, hint_usages, duplicate_solves, duplicate_hint_usages):
+        self.user_names = user_names
+        self.points = points
+        self.solves = solves
+        self.hint_usages = hint_usages
+        self.duplicate_solves = duplicate_solves
+        self.duplicate_hint_usages = duplicate_hint_usages
+
+
+def _per_user(np, user_names, users, items, values):
+    # Sums values per user over unique (user, item) pairs, as the Solves and HintUsages tables
+    # only keep one row per pair. Also returns how many duplicate events were dropped.
+    if not users:
+        zeros = np.zeros(len(user_names), dtype=np.int64)
+        return zeros, zeros.copy(), 0
+    user_index = np.searchsorted(user_names, np.array(users))
+    item_index = np.unique(np.array(items), return_inverse=True)[1].reshape(-1)
+    keys = user_index.astype(np.int64) * (int(item_index.max()) + 1) + item_index
+    first = np.unique(keys, return_index=True)[1]
+    user_index = user_index[first]
+    totals = np.bincount(user_index, weights=np.array(values, dtype=np.int64)[first], minlength=len(user_names))
+    counts = np.bincount(user_index, minlength=len(user_names))
+    return totals.astype(np.int64), counts.astype(np.int64), len(users) - len(first)
+
+
+def expected_scores(events):
+    np = _numpy()
+    user_names = np.array(sorted(events.user_names), dtype=str)
+    gained, solves, duplicate_solves = _per_user(np, user_names, events.solve_users, events.solve_challenges, events.solve_points)
+    lost, hint_usages, duplicate_hint_usages = _per_user(np, user_names, events.hint_users, events.hint_ids, events.hint_deductions)
+    return ExpectedScores(user_names, gained - lost, solves, hint_usages, duplicate_solves, duplicate_hint_usages)
+
+
+def align(user_names, names, values):
+    # Places values keyed by name into a column ordered like user_names (sorted). Returns the
+    # column and a mask of which rows were present.
+    np = _numpy()
+    column = np.zeros(len(user_names), dtype=np.int64)
+    present = np.zeros(len(user_names), dtype=bool)
+    if not len(names) or not len(user_names):
+        return column, present
+    names = np.array(names, dtype=str)
+    positions = np.minimum(np.searchsorted(user_names, names), len(user_names) - 1)
+    found = user_names[positions] == names
+    column[positions[found]] = np.array(values, dtype=np.int64)[found]
+    present[positions[found]] = True
+    return column, present
+
+
+def find_mismatches(expected, users, user_ranks, play_data=None):
+    # users: identity/users items; user_ranks: play/leaderboards userRanks; play_data: user name ->
+    # play/users/{id}/data response, for the users it was fetched for. Returns a dict of kind ->
+    # indices into expected.user_names, plus the leaderboard points column for reporting.
+    np = _numpy()
+    names = expected.user_names
+    visible, registered = align(names, [user["userName"] for user in users],
+                                [user["isVisibleOnLeaderboards"] for user in users])
+    board_points, on_board = align(names, [rank["userName"] for rank in user_ranks], [rank["points"] for rank in user_ranks])
+    # Only visible users with positive points are ranked (GetUserRanks).
+    ranked = registered & visible.astype(bool) & (expected.points > 0)
+
+    mismatches = {
+        "not registered": ~registered,
+        "missing": ranked & ~on_board,
+        "unexpected": on_board & ~ranked,
+        "points": on_board & ranked & (board_points != expected.points),
+    }
+    if play_data is not None:
+        data_names = list(play_data)
+        solves, has_data = align(names, data_names, [play_data[name]["totalSolves"] for name in data_names])
+        hint_usages, _ = align(names, data_names, [play_data[name]["totalHintUsages"] for name in data_names])
+        mismatches["solves"] = has_data & (solves != expected.solves)
+        mismatches["hint usages"] = has_data & (hint_usages != expected.hint_usages)
+    else:
+        solves = hint_usages = np.zeros(len(names), dtype=np.int64)
+
+    actual = {"points": board_points, "solves": solves, "hint usages": hint_usages}
+    return {kind: np.nonzero(mask)[0] for kind, mask in mismatches.items()}, actual
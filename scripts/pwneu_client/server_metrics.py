@@ -0,0 +1,80 @@
+import asyncio
+import re
+import time
+from urllib.parse import urlsplit
+
+# Samples the API's own Prometheus endpoint while a benchmark runs. ServiceDefaults maps it with
+# UseOpenTelemetryPrometheusScrapingEndpoint at /metrics on the API host (next to /api/v1), fed by
+# the process and runtime instrumentation. Only series whose metric name matches `pattern` are
+# kept, and the series of one metric (e.g. one per GC generation) are summed. `labels` narrows
+# that to series whose label set matches, e.g. the request counter of one route.
+
+DEFAULT_MEMORY_METRICS = (r"process_memory_usage_bytes|process_runtime_dotnet_gc_heap_size_bytes"
+                          r"|process_runtime_dotnet_gc_committed_memory_size_bytes")
+
+# Label values are quoted and may contain braces (e.g. http_route="play/challenges/{id:guid}/submit").
+_SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[^"}]|"(?:[^"\\]|\\.)*")*)\})?\s+(\S+)')
+
+
+def metrics_url_for(api_url):
+    parts = urlsplit(api_url)
+    return f"{parts.scheme}://{parts.netloc}/metrics"
+
+
+def parse_samples(text, pattern, labels=None):
+    totals = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_LINE.match(line)
+        if not match or not pattern.fullmatch(match.group(1)):
+            continue
+        if labels and not labels.search(match.group(2) or ""):
+            continue
+        try:
+            value = float(match.group(3))
+        except ValueError:
+            continue
+        totals[match.group(1)] = totals.get(match.group(1), 0.0) + value
+    return totals
+
+
+class ServerMetricsSampler:
+    # session is an httpx.AsyncClient (e.g. AsyncPwneuClient.session); the scrape needs no token.
+    def __init__(self, session, url, pattern=DEFAULT_MEMORY_METRICS, interval=1.0, labels=None):
+        self.session = session
+        self.url = url
+        self.pattern = re.compile(pattern)
+        self.labels = re.compile(labels) if labels else None
+        self.interval = interval
+        self.samples = []
+        self.failed = 0
+
+    async def sample(self):
+        try:
+            response = await self.session.get(self.url)
+        except Exception:
+            self.failed += 1
+            return
+        values = parse_samples(response.text, self.pattern, self.labels) if response.status_code == 200 else None
+        if values:
+            self.samples.append((time.monotonic(), values))
+        else:
+            self.failed += 1
+
+    async def run(self):
+        # Samples until cancelled.
+        while True:
+            await self.sample()
+            await asyncio.sleep(self.interval)
+
+    def print_report(self):
+        if not self.samples:
+            print(f"No server metrics matched at {self.url} ({self.failed} failed scrapes).")
+            return
+        print(f"Server memory from {self.url} ({len(self.samples)} samples):")
+        for name in sorted({name for _, values in self.samples for name in values}):
+            series = [values[name] for _, values in self.samples if name in values]
+            first, peak, last = series[0], max(series), series[-1]
+            print(f"  {name}: before {first / 2 ** 20:.1f}MB, peak {peak / 2 ** 20:.1f}MB "
+                  f"({(peak - first) / 2 ** 20:+.1f}MB), after {last / 2 ** 20:.1f}MB")
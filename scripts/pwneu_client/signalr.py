@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from urllib.parse import quote, urlsplit, urlunsplit
+
+# Minimal SignalR client for AnnouncementHub: the JSON hub protocol over WebSockets, which is
+# all the hub is used with. Messages are JSON objects terminated by a record separator.
+# https://github.com/dotnet/aspnetcore/blob/main/src/SignalR/docs/specs/HubProtocol.md
+
+RECORD_SEPARATOR = "\x1e"
+ANNOUNCEMENTS_HUB_PATH = "announcements"
+RECEIVE_ANNOUNCEMENT = "ReceiveAnnouncement"
+
+INVOCATION = 1
+PING = 6
+CLOSE = 7
+
+# The server drops a connection it hasn't heard from in 30 seconds (ClientTimeoutInterval), so
+# the client pings whenever it has sent nothing for KEEP_ALIVE_SECONDS. Incoming traffic (the
+# server's own pings, announcements) doesn't count: it says nothing about what the server heard.
+KEEP_ALIVE_SECONDS = 15
+
+_HANDSHAKE = json.dumps({"protocol": "json", "version": 1}) + RECORD_SEPARATOR
+_PING = json.dumps({"type": PING}) + RECORD_SEPARATOR
+
+
+def hub_url(api_url, hub_path, access_token, connection_token=None):
+    # Browsers can't set headers on a WebSocket, so the API reads the token from ?access_token=.
+    scheme, netloc, path, _, _ = urlsplit(api_url)
+    query = f"access_token={quote(access_token, safe='')}"
+    if connection_token:
+        query = f"id={quote(connection_token, safe='')}&{query}"
+    return urlunsplit(("wss" if scheme == "https" else "ws", netloc, f"{path.rstrip('/')}/{hub_path}", query, ""))
+
+
+class HubError(Exception):
+    pass
+
+
+class HubConnection:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.closed = False
+        self.last_sent_at = time.monotonic()
+
+    @classmethod
+    async def open(cls, client, access_token, negotiate=True, hub_path=ANNOUNCEMENTS_HUB_PATH, open_timeout=30):
+        try:
+            import websockets  # type: ignore
+        except ImportError:
+            raise RuntimeError("Hub connections require websockets. Install it with: pip install websockets")
+
+        connection_token = None
+        if negotiate:
+            response = await client.negotiate_announcements(access_token)
+            if response.status_code != 200:
+                raise HubError(f"Negotiate failed. Status code: {response.status_code}, Response: {response.text}")
+            connection_token = response.json().get("connectionToken")
+
+        # SignalR's own pings keep the connection alive, so WebSocket-level pings are left off.
+        url = hub_url(client.api_url, hub_path, access_token, connection_token)
+        websocket = await websockets.connect(url, open_timeout=open_timeout, ping_interval=None, max_size=None)
+        try:
+            await websocket.send(_HANDSHAKE)
+            reply = json.loads((await asyncio.wait_for(websocket.recv(), open_timeout)).split(RECORD_SEPARATOR)[0] or "{}")
+        except BaseException:
+            await websocket.close()
+            raise
+        if reply.get("error"):
+            await websocket.close()
+            raise HubError(f"Handshake failed: {reply['error']}")
+        return cls(websocket)
+
+    async def invocations(self):
+        # Yields (target, arguments) until the server closes the hub connection or the socket.
+        # A ping goes out KEEP_ALIVE_SECONDS after the client last sent anything.
+        import websockets  # type: ignore
+
+        while True:
+            try:
+                ping_in = self.last_sent_at + KEEP_ALIVE_SECONDS - time.monotonic()
+                if ping_in <= 0:
+                    await self.send(_PING)
+                    continue
+                frame = await asyncio.wait_for(self.websocket.recv(), ping_in)
+            except asyncio.TimeoutError:
+                continue
+            except websockets.ConnectionClosed:
+                return
+
+            for raw_message in frame.split(RECORD_SEPARATOR):
+                if not raw_message:
+                    continue
+                message = json.loads(raw_message)
+                if message.get("type") == INVOCATION:
+                    yield message.get("target"), message.get("arguments", [])
+                elif message.get("type") == CLOSE:
+                    return
+
+    async def send(self, message):
+        await self.websocket.send(message)
+        self.last_sent_at = time.monotonic()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.websocket.send(json.dumps({"type": CLOSE}) + RECORD_SEPARATOR)
+        except Exception:
+            pass
+        await self.websocket.close()
@@ -0,0 +1,122 @@
+import json
+import os
+import random
+import re
+import secrets
+import tempfile
+
+# Synthetic records without a Faker call per record. Faker builds seeded pools of user name stems,
+# first and last names and words once; they are cached on disk, so later runs don't import Faker
+# at all. Records are then put together by picking from the pools a batch at a time with
+# Random.choices, which costs well under a microsecond per field and keeps the I/O threads'
+# GIL free.
+#
+# Uniqueness comes from construction rather than from checking: a user name is a letters-only
+# stem followed by the suffix {tag}x{index}, digits of the run tag, an "x" and the record's
+# index. The first digit marks where the stem ends and the "x" where the tag ends, so no two
+# (tag, index) pairs can produce the same name. Emails use the same suffix. Names also follow the Register validator: user names are 5-40 letters and
+# digits, full names at most 40 letters and spaces.
+
+DEFAULT_POOLS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pwneu")
+POOLS_VERSION = 1
+POOL_SIZES = {"userNames": 5000, "firstNames": 1000, "lastNames": 1000, "words": 3000}
+MAX_USER_NAME_LENGTH = 40
+MAX_FULL_NAME_LENGTH = 40
+
+_NOT_LETTERS = re.compile(r"[^a-zA-Z]")
+_FULL_NAME_PART = re.compile(r"^[^\W\d_]+$")
+
+
+def _build_pools(seed):
+    try:
+        from faker import Faker  # type: ignore
+    except ImportError:
+        raise RuntimeError("Building data pools requires Faker. Install it with: pip install Faker")
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    generators = {
+        "userNames": lambda: _NOT_LETTERS.sub("", fake.user_name()).lower()[:20],
+        "firstNames": fake.first_name,
+        "lastNames": fake.last_name,
+        "words": fake.word,
+    }
+    valid = {
+        "userNames": lambda value: len(value) >= 3,
+        "firstNames": _FULL_NAME_PART.match,
+        "lastNames": _FULL_NAME_PART.match,
+        "words": _FULL_NAME_PART.match,
+    }
+    pools = {}
+    for name, size in POOL_SIZES.items():
+        values = set()
+        # Providers have fewer distinct values than some pool sizes; stop once they run dry.
+        for _ in range(size * 4):
+            value = generators[name]()
+            if valid[name](value):
+                values.add(value)
+            if len(values) >= size:
+                break
+        pools[name] = sorted(values)
+    return pools
+
+
+def load_pools(seed=0, directory=DEFAULT_POOLS_DIR, refresh=False):
+    path = os.path.join(directory, f"pools-v{POOLS_VERSION}-{seed}.json")
+    if not refresh:
+        try:
+            with open(path) as file:
+                return DataPools(json.load(file), seed)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            print(f"Ignoring unreadable data pools: {path}")
+
+    pools = _build_pools(seed)
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".pools-")
+    with os.fdopen(file_descriptor, "w") as file:
+        json.dump(pools, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+    return DataPools(pools, seed)
+
+
+class DataPools:
+    def __init__(self, pools, seed=0):
+        self.user_names = pools["userNames"]
+        self.first_names = pools["firstNames"]
+        self.last_names = pools["lastNames"]
+        self.word_pool = pools["words"]
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def users(self, count, email_domain, tag=None, batch_size=10_000):
+        # Lazily yields {"userName", "email", "fullName"} for records 0..count-1. The tag (digits,
+        # random 10 digits by default) keeps names unique across runs and processes.
+        tag = str(10 ** 9 + secrets.randbelow(9 * 10 ** 9)) if tag is None else str(tag)
+        if not tag.isdigit():
+            raise ValueError(f"The run tag must be digits, got '{tag}'.")
+        rng = random.Random(f"{self.seed}:{tag}")
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            stems = rng.choices(self.user_names, k=size)
+            email_stems = rng.choices(self.user_names, k=size)
+            first_names = rng.choices(self.first_names, k=size)
+            last_names = rng.choices(self.last_names, k=size)
+            for offset in range(size):
+                suffix = f"{tag}x{start + offset}"
+                yield {
+                    "userName": stems[offset][:max(0, MAX_USER_NAME_LENGTH - len(suffix))] + suffix,
+                    "email": f"{email_stems[offset]}{suffix}@{email_domain}",
+                    "fullName": f"{first_names[offset]} {last_names[offset]}"[:MAX_FULL_NAME_LENGTH].rstrip(),
+                }
+
+    def word(self):
+        return self.rng.choice(self.word_pool)
+
+    def words(self, count):
+        return self.rng.choices(self.word_pool, k=count)
+
+    def sentence(self, nb_words=6):
+        text = " ".join(self.rng.choices(self.word_pool, k=nb_words))
+        return text[:1].upper() + text[1:] + "."
@@ -0,0 +1,206 @@
+import base64
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+DEFAULT_TOKEN_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pwneu", "tokens.json")
+
+# Tokens are treated as expired this many seconds early so they don't lapse mid-request.
+EXPIRY_SKEW_SECONDS = 60
+
+_refresh_cookie_pattern = re.compile(r"refreshToken=([^;,\s]+)")
+
+
+def jwt_claims(token):
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except (AttributeError, IndexError, ValueError, TypeError):
+        return {}
+
+
+def jwt_expiry(token):
+    try:
+        return int(jwt_claims(token).get("exp", 0))
+    except (ValueError, TypeError):
+        return 0
+
+
+def is_fresh(expiry):
+    return expiry - EXPIRY_SKEW_SECONDS > time.time()
+
+
+def refresh_token_from_response(response):
+    # The API only hands out the refresh token as a Secure cookie, which cookie jars refuse to
+    # keep over plain http, so it is read straight from the Set-Cookie header.
+    match = _refresh_cookie_pattern.search(response.headers.get("set-cookie", ""))
+    return match.group(1) if match else None
+
+
+def entry_from_response(response, refresh_token):
+    user_info = response.json()
+    access_token = user_info["accessToken"]
+    return {
+        "id": user_info.get("id"),
+        "userName": user_info.get("userName"),
+        "roles": user_info.get("roles", []),
+        "accessToken": access_token,
+        "accessTokenExpiry": jwt_expiry(access_token),
+        "refreshToken": refresh_token,
+        "refreshTokenExpiry": jwt_expiry(refresh_token) if refresh_token else 0,
+    }
+
+
+# On-disk cache of access and refresh tokens keyed by API URL and username, so repeated runs
+# don't re-run password verification on identity/login for every member.
+class TokenStore:
+    def __init__(self, path=DEFAULT_TOKEN_STORE_PATH):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(api_url, user_name):
+        return f"{api_url}|{user_name}"
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+        except ValueError:
+            print(f"Ignoring unreadable token store: {self.path}")
+            self.entries = {}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=".tokens-")
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(self.entries, file, separators=(",", ":"))
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+    def get(self, api_url, user_name):
+        return self.entries.get(self._key(api_url, user_name))
+
+    def put(self, api_url, user_name, entry):
+        with self.lock:
+            self.entries[self._key(api_url, user_name)] = entry
+            self.dirty = True
+
+    def remove(self, api_url, user_name):
+        with self.lock:
+            if self.entries.pop(self._key(api_url, user_name), None) is not None:
+                self.dirty = True
+
+    def discard_access_token(self, api_url, user_name, access_token):
+        # Only drops the entry if it still holds the rejected token, so a token another thread
+        # has just renewed isn't thrown away.
+        key = self._key(api_url, user_name)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry.get("accessToken") == access_token:
+                del self.entries[key]
+                self.dirty = True
+
+
+# authenticate returns (entry, None) on success or (None, failed_login_response).
+# A cached access token is used while it is fresh, then identity/refresh is tried,
+# and a password login is the last resort. The password is remembered on the client (never in
+# the store) so a request answered with 401 can log the user in again; see renew_access_token.
+
+
+def authenticate(client, user_name, password):
+    client.credentials[user_name] = password
+    store = client.token_store
+    entry = store.get(client.api_url, user_name) if store else None
+
+    if entry:
+        if is_fresh(entry["accessTokenExpiry"]):
+            return entry, None
+        if entry.get("refreshToken") and is_fresh(entry["refreshTokenExpiry"]):
+            response = client.refresh(entry["refreshToken"])
+            if response.status_code == 200:
+                entry = entry_from_response(response, entry["refreshToken"])
+                store.put(client.api_url, user_name, entry)
+                return entry, None
+
+    response = client.login(user_name, password)
+    if response.status_code != 200:
+        # The user may have been deleted or re-created, so a stale entry must not outlive this.
+        if entry:
+            store.remove(client.api_url, user_name)
+        return None, response
+
+    entry = entry_from_response(response, refresh_token_from_response(response))
+    if store:
+        store.put(client.api_url, user_name, entry)
+    return entry, None
+
+
+async def authenticate_async(client, user_name, password):
+    client.credentials[user_name] = password
+    store = client.token_store
+    entry = store.get(client.api_url, user_name) if store else None
+
+    if entry:
+        if is_fresh(entry["accessTokenExpiry"]):
+            return entry, None
+        if entry.get("refreshToken") and is_fresh(entry["refreshTokenExpiry"]):
+            response = await client.refresh(entry["refreshToken"])
+            if response.status_code == 200:
+                entry = entry_from_response(response, entry["refreshToken"])
+                store.put(client.api_url, user_name, entry)
+                return entry, None
+
+    response = await client.login(user_name, password)
+    if response.status_code != 200:
+        # The user may have been deleted or re-created, so a stale entry must not outlive this.
+        if entry:
+            store.remove(client.api_url, user_name)
+        return None, response
+
+    entry = entry_from_response(response, refresh_token_from_response(response))
+    if store:
+        store.put(client.api_url, user_name, entry)
+    return entry, None
+
+
+# A 401 means the token was revoked, belongs to a deleted user, or was issued by a deployment that
+# has since been reset. The cached entry is dropped and, if the client has the user's password from
+# an earlier authenticate call, the user is authenticated again. Returns the new access token or None.
+
+
+def _rejected_user(client, access_token):
+    user_name = jwt_claims(access_token).get("name")
+    if user_name and client.token_store:
+        client.token_store.discard_access_token(client.api_url, user_name, access_token)
+    return user_name if user_name in client.credentials else None
+
+
+def renew_access_token(client, access_token):
+    user_name = _rejected_user(client, access_token)
+    if user_name is None:
+        return None
+    entry, _ = authenticate(client, user_name, client.credentials[user_name])
+    return entry["accessToken"] if entry else None
+
+
+async def renew_access_token_async(client, access_token):
+    user_name = _rejected_user(client, access_token)
+    if user_name is None:
+        return None
+    entry, _ = await authenticate_async(client, user_name, client.credentials[user_name])
+    return entry["accessToken"] if entry else None
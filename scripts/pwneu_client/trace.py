@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+import re
+import threading
+import time
+from .tokens import jwt_claims
+
+# Traces are NDJSON, one request per line, appended as the run goes:
+#   t  Unix time the attempt was sent        m  method         p  path
+#   q  query params                          b  JSON payload   u  user name from the access token
+#   s  status code (0 if the request raised)  l  latency in ms  r  ids handed out by the response
+#   w  ms spent in client throttling and 429 retries before the recorded attempt (omitted if none)
+#   o  the FlagStatus a successful SubmitFlag answered with ("Correct", "Incorrect", ...)
+# t and l describe the final attempt only, so t + l is when the recorded response arrived. t is
+# wall-clock time rather than time since the recorder started because --record-trace appends:
+# runs of several scripts (or worker processes) recorded into one file must interleave in the
+# order they really happened. read_trace rebases t to the first request.
+# "r" is what lets a replay follow ids that differ between deployments: a create endpoint's new id
+# (a string), an id listing matched by position (a list), or ids keyed to user names (a dict).
+# Passwords are never written; the replayer logs users in with its own password.
+
+GUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+_REDACTED_FIELDS = ("password",)
+
+
+def endpoint_template(path):
+    return GUID_PATTERN.sub("{id}", path)
+
+
+def returned_id(response):
+    # Create endpoints answer with the new id as a bare JSON string.
+    text = response.text.strip()
+    if len(text) == 38 and text.startswith('"') and GUID_PATTERN.fullmatch(text[1:-1]):
+        return text[1:-1]
+    return None
+
+
+def response_ids(method, path, response):
+    if response is None or response.status_code != 200:
+        return None
+    try:
+        if method == "POST":
+            if path == "identity/login":
+                user_info = response.json()
+                return {user_info["id"]: user_info["userName"]}
+            return returned_id(response)
+        if method != "GET":
+            return None
+        if path == "identity/users":
+            return {user["id"]: user["userName"] for user in response.json()["items"]}
+        if path == "identity/members/export":
+            return {row["Id"]: row["Username"] for row in csv.DictReader(io.StringIO(response.text))}
+        if response.text.startswith("["):
+            ids = [item.get("id") if isinstance(item, dict) else item for item in response.json()]
+            if ids and all(isinstance(item, str) and GUID_PATTERN.fullmatch(item) for item in ids):
+                return ids
+    except (ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _redact(payload):
+    if not isinstance(payload, dict) or not any(field in payload for field in _REDACTED_FIELDS):
+        return payload
+    return {key: value for key, value in payload.items() if key not in _REDACTED_FIELDS}
+
+
+class TraceRecorder:
+    def __init__(self, path, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        # Recorded times come from time.monotonic(), so they are shifted onto the wall clock once.
+        self.wall_clock_offset = time.time() - time.monotonic()
+        self.user_names = {}
+        self.buffer = []
+        self.lock = threading.Lock()
+
+    def _user_name(self, access_token):
+        if not access_token:
+            return None
+        user_name = self.user_names.get(access_token)
+        if user_name is None:
+            user_name = self.user_names[access_token] = jwt_claims(access_token).get("name")
+        return user_name
+
+    def record(self, method, path, access_token, payload, params, started_at, response, waited=0.0, streamed=False):
+        # A streamed body was consumed by the caller, so there are no ids to read from it.
+        entry = {"t": round(started_at + self.wall_clock_offset, 6), "m": method, "p": path}
+        if params:
+            entry["q"] = params
+        if payload is not None:
+            entry["b"] = _redact(payload)
+        user_name = self._user_name(access_token)
+        if user_name is None and path == "identity/login":
+            user_name = payload.get("userName")
+        if user_name:
+            entry["u"] = user_name
+        entry["s"] = response.status_code if response is not None else 0
+        entry["l"] = round((time.monotonic() - started_at) * 1000, 3)
+        if waited >= 0.001:
+            entry["w"] = round(waited * 1000, 3)
+        ids = None if streamed else response_ids(method, path, response)
+        if ids:
+            entry["r"] = ids
+        if method == "POST" and path.endswith("/submit") and entry["s"] == 200:
+            entry["o"] = response.text.strip().strip('"')
+
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self.lock:
+            self.buffer.append(line)
+            if len(self.buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write("\n".join(self.buffer))
+            file.write("\n")
+        self.buffer = []
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+
+def read_trace(path):
+    with open(path, encoding="utf-8") as file:
+        entries = [json.loads(line) for line in file if line.strip()]
+    entries.sort(key=lambda entry: entry["t"])
+    if entries:
+        base = entries[0]["t"]
+        for entry in entries:
+            entry["t"] = round(entry["t"] - base, 6)
+    return entries
@@ -0,0 +1,60 @@
+import random
+import re
+import secrets
+
+# multipart/form-data bodies that are produced while the HTTP library sends them, so uploading a
+# several-hundred-MB artifact never holds more than one chunk in client memory. The length is
+# known up front and sent as Content-Length (ASP.NET Core's form reader handles that better than a
+# chunked body), and every iteration yields the same bytes again, so a retried request resends an
+# identical body. Works as `data=` for requests and as `content=` for a sync httpx.Client.
+
+CHUNK_SIZE = 256 * 1024
+
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value):
+    # "512", "64KB", "1.5MB", "2GiB" -> bytes (binary units, like the API's 30 * 1024 * 1024 limit).
+    match = _SIZE_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid size '{value}'. Use a number of bytes or a KB, MB or GB suffix.")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" or size == int(size) else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def generated_chunks(size, seed, chunk_size=CHUNK_SIZE):
+    # One pseudo-random block repeated up to `size` bytes: incompressible enough for transport and
+    # storage measurements, and cheap to produce at hundreds of MB per second.
+    block = random.Random(seed).randbytes(min(size, chunk_size))
+    remaining = size
+    while remaining > 0:
+        yield block if remaining >= len(block) else block[:remaining]
+        remaining -= len(block)
+
+
+class MultipartUpload:
+    def __init__(self, file_name, size, seed=0, field="file", content_type="application/octet-stream"):
+        self.file_name = file_name
+        self.size = size
+        self.seed = seed
+        boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.head = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'
+                     f"Content-Type: {content_type}\r\n\r\n").encode()
+        self.tail = f"\r\n--{boundary}--\r\n".encode()
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        yield from generated_chunks(self.size, self.seed)
+        yield self.tail
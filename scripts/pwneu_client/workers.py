@@ -0,0 +1,109 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+
+# --workers N runs the load in N processes, each pinned to its own core, so JSON encoding, TLS
+# and the event loop stop competing for one GIL. The parent logs every user in once and deals
+# the (user, token) pairs out round-robin (shard()); each worker builds its own client and calls
+# ready(), a barrier the parent also waits on, so every worker starts sending at the same moment.
+# A worker returns a picklable result (histograms as to_dict(), plain counters) that the parent
+# merges into one report. Workers are started with "spawn", so `target` must be a module-level
+# function of a script guarded by `if __name__ == "__main__"`.
+
+READY_TIMEOUT = 600
+
+
+def shard(items, count, index):
+    return items[index::count]
+
+
+def share(total, count):
+    # A worker's part of a total limit (connections, in-flight requests), rounded up.
+    return max(1, -(-total // count))
+
+
+def worker_args(args, index):
+    # A copy of the parsed arguments for one worker: the files it writes get a ".{index}" suffix
+    # and the metrics port is offset, so workers neither interleave lines nor compete for a port.
+    # Workers use the tokens the parent hands them and never write the token store, which would
+    # otherwise be overwritten by whichever worker saved last.
+    args = argparse.Namespace(**vars(args))
+    for name in ("results", "record_trace", "metrics_file"):
+        if getattr(args, name, None):
+            setattr(args, name, f"{getattr(args, name)}.{index}")
+    if getattr(args, "metrics_port", None) is not None:
+        args.metrics_port += 1 + index
+    args.no_token_store = True
+    return args
+
+
+def pin_to_core(index):
+    # Linux only; elsewhere the OS scheduler places the workers.
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    cores = sorted(os.sched_getaffinity(0))
+    core = cores[index % len(cores)]
+    os.sched_setaffinity(0, {core})
+    return core
+
+
+def _run_worker(target, index, payload, barrier, results):
+    pin_to_core(index)
+
+    def ready():
+        barrier.wait(READY_TIMEOUT)
+
+    try:
+        result = target(index, payload, ready)
+    except BaseException as e:
+        # Releases the others (and the parent) from the barrier instead of leaving them waiting.
+        barrier.abort()
+        result = {"error": f"{type(e).__name__}: {e}"}
+    results.put((index, result))
+
+
+def run_workers(target, payloads):
+    # Runs target(index, payload, ready) in one process per payload and returns their results in
+    # payload order. A worker that failed or died is reported and left out.
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(len(payloads) + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_run_worker, args=(target, index, payload, barrier, results), daemon=True)
+                 for index, payload in enumerate(payloads)]
+    for process in processes:
+        process.start()
+
+    ready = threading.Event()
+
+    def wait_for_start():
+        try:
+            barrier.wait(READY_TIMEOUT)
+            print(f"All {len(processes)} workers ready. Starting the load.")
+        except threading.BrokenBarrierError:
+            print("A worker failed before the start; the others were stopped.")
+        ready.set()
+
+    # The parent waits at the barrier on a thread, so a worker dying before it (and never
+    # reaching the barrier) is still noticed by the result loop below.
+    threading.Thread(target=wait_for_start, daemon=True).start()
+
+    collected = {}
+    while len(collected) < len(processes):
+        try:
+            index, result = results.get(timeout=1)
+            collected[index] = result
+        except queue.Empty:
+            for index, process in enumerate(processes):
+                if index not in collected and not process.is_alive():
+                    barrier.abort()
+                    collected[index] = {"error": f"exited with code {process.exitcode}"}
+    for process in processes:
+        process.join()
+    ready.wait(1)
+
+    for index, result in sorted(collected.items()):
+        if "error" in result:
+            print(f"Worker {index} failed: {result['error']}")
+    return [result for _, result in sorted(collected.items()) if "error" not in result]
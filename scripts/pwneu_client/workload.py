@@ -0,0 +1,126 @@
+import bisect
+import itertools
+import json
+import math
+import random
+from .scenario import merge_config
+
+# A workload model for flag submissions that looks like a real event rather than every user
+# solving a uniform sample of challenges:
+#
+# - Popularity is Zipf-distributed over difficulty: challenges are ranked by points (cheapest
+#   first), and the challenge of rank r is picked with weight 1 / r ** zipfExponent, so a few easy
+#   challenges take most of the traffic and their cache keys (UserAttemptsInChallenge,
+#   UserHasSolvedChallenge, ...) stay hot.
+# - Each user belongs to an archetype. An attempt solves with probability
+#   skill * (cheapest points / points) ** pointsExponent, so expensive challenges are solved less.
+#   Solvers send a few wrong flags first; everyone else keeps guessing until they give up, and
+#   brute-forcers guess long enough to run into maxAttempts and the recent-incorrect throttle.
+# - Users arrive following arrivalCurve, pairs of (fraction of the event, relative rate) that
+#   are interpolated linearly: by default a rush at the start, a quiet middle and a surge in the
+#   last stretch. Within a session, submissions are separated by the archetype's think time,
+#   compressed if needed so that every session ends with the event.
+#
+# A session depends only on the seed and the user name, so sharding users across workers (or
+# changing their order) doesn't change what each user sends.
+
+DEFAULT_WORKLOAD = {
+    "zipfExponent": 1.1,
+    "pointsExponent": 1.0,
+    "arrivalCurve": [[0.0, 8.0], [0.08, 1.0], [0.85, 1.0], [0.92, 4.0], [1.0, 4.0]],
+    "archetypes": {
+        "casual": {
+            "share": 0.6,
+            "skill": 0.5,
+            "challenges": [0.02, 0.1],
+            "attemptsBeforeSolve": [0, 3],
+            "attemptsBeforeGivingUp": [1, 5],
+            "thinkSeconds": [2.0, 20.0],
+        },
+        "strong": {
+            "share": 0.3,
+            "skill": 0.95,
+            "challenges": [0.2, 0.6],
+            "attemptsBeforeSolve": [0, 2],
+            "attemptsBeforeGivingUp": [2, 8],
+            "thinkSeconds": [1.0, 10.0],
+        },
+        "bruteforcer": {
+            "share": 0.1,
+            "skill": 0.1,
+            "challenges": [0.01, 0.05],
+            "attemptsBeforeSolve": [5, 30],
+            "attemptsBeforeGivingUp": [20, 80],
+            "thinkSeconds": [0.05, 0.5],
+        },
+    },
+}
+
+
+def load_workload(path=None):
+    if path is None:
+        return DEFAULT_WORKLOAD
+    with open(path) as file:
+        return merge_config(DEFAULT_WORKLOAD, json.load(file))
+
+
+def sample_arrival(rng, curve):
+    # Inverse-CDF sample from the piecewise-linear density `curve`, as a fraction of the event.
+    areas = [(y0 + y1) / 2 * (x1 - x0) for (x0, y0), (x1, y1) in zip(curve, curve[1:])]
+    cumulative = list(itertools.accumulate(areas))
+    target = rng.random() * cumulative[-1]
+    segment = min(bisect.bisect_right(cumulative, target), len(areas) - 1)
+    (x0, y0), (x1, y1) = curve[segment], curve[segment + 1]
+    # Solve y0 * t + (y1 - y0) * t ** 2 / 2 = share of this segment's area, for t in [0, 1].
+    share = (target - (cumulative[segment] - areas[segment])) / (x1 - x0) if x1 > x0 else 0
+    if abs(y1 - y0) < 1e-12:
+        t = share / y0 if y0 > 0 else 0
+    else:
+        t = (-y0 + math.sqrt(max(0.0, y0 * y0 + 2 * (y1 - y0) * share))) / (y1 - y0)
+    return x0 + (x1 - x0) * min(max(t, 0.0), 1.0)
+
+
+class WorkloadModel:
+    def __init__(self, spec, challenges, seed=0):
+        # challenges: [{"id", "points"}, ...], as listed by play/challenges.
+        self.spec = spec
+        self.seed = seed
+        ranked = sorted(challenges, key=lambda challenge: (challenge["points"], challenge["id"]))
+        self.challenge_ids = [challenge["id"] for challenge in ranked]
+        self.weights = [1 / rank ** spec["zipfExponent"] for rank in range(1, len(ranked) + 1)]
+        cheapest = max(1, ranked[0]["points"]) if ranked else 1
+        self.difficulty = {challenge["id"]: (cheapest / max(1, challenge["points"])) ** spec["pointsExponent"] for challenge in ranked}
+        self.archetype_names = list(spec["archetypes"])
+        self.archetype_shares = [spec["archetypes"][name]["share"] for name in self.archetype_names]
+
+    def _pick_challenges(self, rng, count):
+        # Weighted sampling without replacement (Efraimidis-Spirakis): keep the `count` largest
+        # u ** (1 / weight), compared as logarithms so tiny weights don't underflow.
+        keys = sorted(((math.log(1 - rng.random()) / weight, challenge_id) for weight, challenge_id in zip(self.weights, self.challenge_ids)),
+                      reverse=True)
+        return [challenge_id for _, challenge_id in keys[:count]]
+
+    def session(self, user_name, event_seconds=0):
+        # Returns (archetype, start offset in seconds, [(delay before sending, challenge id, correct), ...]).
+        rng = random.Random(f"{self.seed}:{user_name}")
+        archetype = rng.choices(self.archetype_names, weights=self.archetype_shares)[0]
+        profile = self.spec["archetypes"][archetype]
+        start = sample_arrival(rng, self.spec["arrivalCurve"]) * event_seconds
+
+        low, high = profile["challenges"]
+        count = max(1, round(len(self.challenge_ids) * rng.uniform(low, high))) if self.challenge_ids else 0
+        submissions = []
+        for challenge_id in self._pick_challenges(rng, count):
+            solves = rng.random() < profile["skill"] * self.difficulty[challenge_id]
+            wrong = rng.randint(*profile["attemptsBeforeSolve" if solves else "attemptsBeforeGivingUp"])
+            for correct in [False] * wrong + ([True] if solves else []):
+                # Drawn either way, so a burst run (event_seconds=0) sends the same submissions.
+                delay = rng.uniform(*profile["thinkSeconds"])
+                submissions.append((delay if event_seconds else 0, challenge_id, correct))
+
+        # Think times are compressed when a session would run past the end of the event.
+        thinking = sum(delay for delay, _, _ in submissions)
+        if thinking > event_seconds - start > 0:
+            factor = (event_seconds - start) / thinking
+            submissions = [(delay * factor, challenge_id, correct) for delay, challenge_id, correct in submissions]
+        return archetype, start, submissions
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import bisect
+import json
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    token_store_from_args,
+    rate_limiter_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    authenticate_async,
+    read_trace,
+)
+from pwneu_client.histogram import Histogram, format_latency_summary
+from pwneu_client.trace import GUID_PATTERN, endpoint_template, response_ids
+
+# Sample commands:
+#   python seed_leaderboards.py --record-trace leaderboards.ndjson
+#   python replay_traffic.py leaderboards.ndjson --api-url http://staging:37100/api/v1 --speed 10
+#   python replay_traffic.py leaderboards.ndjson --speed 0   (as fast as dependencies allow)
+
+# identity/refresh is skipped because traces never hold refresh tokens; the replayer logs users
+# in itself whenever it needs a token.
+SKIPPED_PATHS = {"identity/refresh"}
+PASSWORD_PATHS = {"identity/login", "identity/register"}
+# A recorded user listing can include members whose registration response hadn't arrived yet, so
+# its replay may run before those registrations and miss them. It is then sent again, up to
+# LISTING_RETRIES times, LISTING_RETRY_DELAY seconds apart.
+LISTING_RETRIES = 20
+LISTING_RETRY_DELAY = 0.05
+
+
+class Replay:
+    def __init__(self, client, entries, args):
+        self.client = client
+        self.entries = entries
+        self.args = args
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+        self.id_map = {}
+        self.tokens = {}
+        self.login_locks = {}
+        self.recorded = {}
+        self.replayed = {}
+        self.status_mismatches = {}
+        self.failed = 0
+        self.skipped = 0
+        self.registered = {entry["b"].get("userName") for entry in entries if entry["p"] == "identity/register" and isinstance(entry.get("b"), dict)}
+
+        # An id is ready once the first request that handed it out has been replayed.
+        self.produced = {}
+        for index, entry in enumerate(entries):
+            for old_id in self._ids_of(entry.get("r")):
+                if old_id not in self.produced:
+                    self.produced[old_id] = (index, asyncio.Event())
+
+        # Causal order: a request waits for every request whose recorded response arrived before
+        # it was sent (t + l < t). Ids alone miss effects such as an admin verifying a member
+        # before that member logs in. Entries are ranked by completion time, and a request
+        # needs the first `causal_prefix[index]` of them to have been replayed.
+        completions = [entry["t"] + entry["l"] / 1000 for entry in entries]
+        self.completion_order = sorted(range(len(entries)), key=completions.__getitem__)
+        sorted_completions = [completions[index] for index in self.completion_order]
+        self.causal_prefix = [bisect.bisect_left(sorted_completions, entry["t"]) for entry in entries]
+        self.completion_rank = {index: rank for rank, index in enumerate(self.completion_order)}
+        self.replayed_ranks = [False] * len(entries)
+        self.replayed_prefix = 0
+        self.prefix_waiters = {}
+
+    @staticmethod
+    def _ids_of(ids):
+        if isinstance(ids, str):
+            return [ids]
+        return list(ids or [])
+
+    def password_for(self, user_name):
+        return self.args.admin_password if user_name == self.args.admin_user else self.args.user_password
+
+    def _rewrite(self, text):
+        return GUID_PATTERN.sub(lambda match: self.id_map.get(match.group(0), match.group(0)), text)
+
+    def _mark_replayed(self, index):
+        self.replayed_ranks[self.completion_rank[index]] = True
+        while self.replayed_prefix < len(self.replayed_ranks) and self.replayed_ranks[self.replayed_prefix]:
+            self.replayed_prefix += 1
+            event = self.prefix_waiters.pop(self.replayed_prefix, None)
+            if event:
+                event.set()
+
+    async def _wait_for_causes(self, index):
+        needed = self.causal_prefix[index]
+        if self.replayed_prefix < needed:
+            await self.prefix_waiters.setdefault(needed, asyncio.Event()).wait()
+
+    async def _wait_for_ids(self, index, entry):
+        referenced = GUID_PATTERN.findall(entry["p"] + json.dumps(entry.get("q")) + json.dumps(entry.get("b")))
+        for old_id in referenced:
+            producer = self.produced.get(old_id)
+            if producer and producer[0] < index:
+                await producer[1].wait()
+
+    def _map_ids(self, old_ids, new_ids):
+        if isinstance(old_ids, str) and isinstance(new_ids, str):
+            self.id_map[old_ids] = new_ids
+        elif isinstance(old_ids, list) and isinstance(new_ids, list):
+            self.id_map.update(zip(old_ids, new_ids))
+        elif isinstance(old_ids, dict) and isinstance(new_ids, dict):
+            new_ids_by_name = {name: new_id for new_id, name in new_ids.items()}
+            for old_id, name in old_ids.items():
+                if name in new_ids_by_name:
+                    self.id_map[old_id] = new_ids_by_name[name]
+
+    async def _token(self, user_name):
+        token = self.tokens.get(user_name)
+        if token:
+            return token
+        lock = self.login_locks.setdefault(user_name, asyncio.Lock())
+        async with lock:
+            if user_name not in self.tokens:
+                entry, failed_response = await authenticate_async(self.client, user_name, self.password_for(user_name))
+                if entry is None:
+                    print(f"Failed to log in '{user_name}'. Status code: {failed_response.status_code}")
+                self.tokens[user_name] = entry["accessToken"] if entry else None
+        return self.tokens[user_name]
+
+    async def _send(self, entry):
+        path = self._rewrite(entry["p"])
+        params = {key: self._rewrite(value) if isinstance(value, str) else value for key, value in entry.get("q", {}).items()} or None
+        payload = json.loads(self._rewrite(json.dumps(entry["b"]))) if "b" in entry else None
+        user_name = entry.get("u")
+
+        if entry["p"] in PASSWORD_PATHS and isinstance(payload, dict):
+            payload["password"] = self.password_for(payload.get("userName"))
+            access_token = None
+        else:
+            access_token = await self._token(user_name) if user_name else None
+
+        async with self.semaphore:
+            started_at = time.monotonic()
+            response = await self.client.request(entry["m"], path, access_token, payload=payload, params=params)
+            latency = time.monotonic() - started_at
+
+        if entry["p"] == "identity/login" and response.status_code == 200:
+            self.tokens[user_name] = response.json()["accessToken"]
+        return response, latency
+
+    def _missing_registered(self, entry, response):
+        recorded = entry.get("r")
+        if entry["m"] != "GET" or not isinstance(recorded, dict):
+            return False
+        replayed = response_ids(entry["m"], self._rewrite(entry["p"]), response) or {}
+        return bool((set(recorded.values()) & self.registered) - set(replayed.values()))
+
+    async def replay_entry(self, index, entry, previous):
+        if previous is not None:
+            await asyncio.wait([previous])
+        await self._wait_for_ids(index, entry)
+        await self._wait_for_causes(index)
+
+        template = f"{entry['m']} {endpoint_template(entry['p'])}"
+        try:
+            response, latency = await self._send(entry)
+            for _ in range(LISTING_RETRIES):
+                if not self._missing_registered(entry, response):
+                    break
+                await asyncio.sleep(LISTING_RETRY_DELAY)
+                response, latency = await self._send(entry)
+            if entry.get("r"):
+                self._map_ids(entry["r"], response_ids(entry["m"], self._rewrite(entry["p"]), response))
+        except Exception as e:
+            print(f"Replay of step {index} ({template}) failed: {e}")
+            self.failed += 1
+            return
+        finally:
+            for old_id in self._ids_of(entry.get("r")):
+                if self.produced[old_id][0] == index:
+                    self.produced[old_id][1].set()
+            self._mark_replayed(index)
+
+        self.recorded.setdefault(template, Histogram()).record(entry["l"] * 1000)
+        self.replayed.setdefault(template, Histogram()).record(latency * 1_000_000)
+        if response.status_code != entry["s"]:
+            self.status_mismatches[template] = self.status_mismatches.get(template, 0) + 1
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        last_task_by_user = {}
+        tasks = []
+
+        for index, entry in enumerate(self.entries):
+            if entry["p"] in SKIPPED_PATHS:
+                self.skipped += 1
+                self._mark_replayed(index)
+                continue
+
+            if self.args.speed > 0:
+                delay = start + entry["t"] / self.args.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            # A member's requests keep their recorded order, since SubmitFlag and UseHint reject
+            # concurrent calls by the same user. Admin requests only wait for the ids they use.
+            user_name = entry.get("u")
+            previous = last_task_by_user.get(user_name) if user_name and user_name != self.args.admin_user else None
+            task = loop.create_task(self.replay_entry(index, entry, previous))
+            if user_name and user_name != self.args.admin_user:
+                last_task_by_user[user_name] = task
+            tasks.append(task)
+
+        await asyncio.gather(*tasks)
+        return loop.time() - start
+
+    def print_report(self, duration):
+        recorded_duration = self.entries[-1]["t"] if self.entries else 0
+        print(f"Replayed {sum(h.total for h in self.replayed.values())} requests in {duration:.1f}s "
+              f"(recorded run: {recorded_duration:.1f}s), failed: {self.failed}, skipped: {self.skipped}.")
+        for template in sorted(self.replayed, key=lambda key: -self.replayed[key].total):
+            mismatches = self.status_mismatches.get(template, 0)
+            print(template + (f" ({mismatches} status mismatches)" if mismatches else ""))
+            print(format_latency_summary("  recorded", self.recorded[template], recorded_duration))
+            print(format_latency_summary("  replayed", self.replayed[template], duration))
+
+
+async def replay(args, entries):
+    token_store = token_store_from_args(args)
+    rate_limiter = rate_limiter_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2,
+                                token_store=token_store, rate_limiter=rate_limiter, recorder=recorder,
+                                metrics=metrics) as client:
+        replay = Replay(client, entries, args)
+        duration = await replay.run()
+        replay.print_report(duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded API trace against another deployment.")
+    parser.add_argument("trace", help="Trace written with --record-trace.")
+    parser.add_argument("--speed", type=float, default=1, help="Replay speed multiplier (1, 10, ...); 0 replays as fast as possible.")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum requests in flight.")
+    parser.add_argument("--admin-user", type=str, default="admin", help="User name whose requests are not serialized.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password for every other traced user.")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    entries = read_trace(args.trace)
+    print(f"Loaded {len(entries)} recorded requests from {args.trace}.")
+    asyncio.run(replay(args, entries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import concurrent.futures
+import secrets
+import statistics
+import sys
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    PwneuClient,
+    add_client_arguments,
+    add_event_arguments,
+    event_sink_from_args,
+    rate_limiter_from_args,
+    login_admin,
+    iter_users,
+    iter_challenges,
+)
+from pwneu_client.benchmark import (
+    EndpointRecorder,
+    add_sample,
+    compare_results,
+    environment,
+    load_results,
+    merge_endpoints,
+    new_results,
+    save_results,
+    settings_differences,
+)
+from pwneu_client.executor import ExecutionContext, execute_plan_async
+from pwneu_client.loadgen import LatencyRecorder, run_open_loop
+from pwneu_client.scenario import DEFAULT_SCENARIO, compile_plan, merge_config
+
+# Sample commands:
+#   python run_benchmarks.py run --label v1.4.0 --repeat 3 --save-baseline baselines/main.json
+#   python run_benchmarks.py run --label v1.5.0-rc1 --repeat 3 --baseline baselines/main.json --output results/v1.5.0-rc1.json
+#   python run_benchmarks.py compare results/v1.5.0-rc1.json baselines/main.json
+#
+# Runs a fixed suite of named scenarios against --api-url, --repeat times, and writes the results
+# (see pwneu_client/benchmark.py for the format) with the environment they were measured in:
+#
+#   seeding       A fixed scenario plan (scenario.py) with a fresh user name prefix per
+#                 repetition: registrations, verifications, categories, challenges, hints and
+#                 logins. Throughput per phase; Register, VerifyUser, CreateChallenge, AddHint and
+#                 Login latency. Always runs, since every other scenario uses its data.
+#   submissions   The plan's hint usages and flag submissions: UseHint and SubmitFlag latency.
+#   leaderboards  Open-loop play/leaderboards and play/me/rank reads by the seeded players at
+#                 --read-rate for --read-duration seconds: GetLeaderboards and GetUserRank latency.
+#   paging        --paging-passes walks through play/challenges and identity/users: GetChallenges
+#                 and GetUsers latency and pages per second.
+#   teardown      Deletes what seeding created (challenges and categories one at a time, as
+#                 IChallengePointsConcurrencyGuard requires, members with --concurrency in flight).
+#                 Leaves submissions denied, like delete_challenges.py.
+#
+# Latency metrics are p50 (reported) and p99 (gated); throughput and failure counts are gated too.
+# With --baseline (or the compare command) every gated metric is checked against the baseline's,
+# and the exit status is 1 if any regressed beyond its tolerance. Logins are always real: the
+# token store is bypassed so Login is measured. Relax the API's rate limits on the target and use
+# --rate-limits off, or the suite measures the limiter.
+
+SCENARIOS = ["seeding", "submissions", "leaderboards", "paging", "teardown"]
+SEEDING_PHASES = ["setup", "users", "resolve", "verify", "categories", "challenges", "hints", "logins"]
+SUBMISSION_PHASES = ["hint_usages", "submissions"]
+LATENCY_ENDPOINTS = {
+    "seeding": ["Register", "VerifyUser", "CreateChallenge", "AddHint", "Login"],
+    "submissions": ["UseHint", "SubmitFlag"],
+    "paging": ["GetChallenges", "GetUsers"],
+    "teardown": ["DeleteChallenge", "DeleteCategory", "DeleteUser"],
+}
+READS = [
+    ("GetLeaderboards", lambda client, access_token: client.get_leaderboards(access_token)),
+    ("GetUserRank", lambda client, access_token: client.get_my_rank(access_token)),
+]
+GUARD_RETRIES = 20
+GUARD_RETRY_DELAY = 0.5
+
+
+def benchmark_scenario(args):
+    # The same plan every repetition, apart from the user name prefix: registering a name twice fails.
+    prefix = f"bench{secrets.token_hex(3)}"
+    return merge_config(DEFAULT_SCENARIO, {
+        "name": "benchmark",
+        "seed": args.seed,
+        "users": {"count": args.users, "userNamePrefix": prefix, "password": args.user_password},
+        "categories": {"count": args.categories},
+        "challenges": {"perCategory": args.challenges_per_category},
+    })
+
+
+def add_latencies(metrics, histograms, names):
+    for name in names:
+        histogram = histograms.get(name)
+        if histogram and histogram.total:
+            add_sample(metrics, f"{name} p50", histogram.percentile(50) / 1000, "ms", "lower", gated=False)
+            add_sample(metrics, f"{name} p99", histogram.percentile(99) / 1000, "ms", "lower")
+
+
+def add_endpoint_metrics(scenario, recorder):
+    add_latencies(scenario["metrics"], recorder.histograms, LATENCY_ENDPOINTS.get(scenario["name"], []))
+    add_sample(scenario["metrics"], "server errors", sum(recorder.server_errors.values()), "requests", "lower")
+    merge_endpoints(scenario["endpoints"], recorder.to_dict())
+
+
+async def run_phases(args, events, context, operations, phases, scenario):
+    recorder = EndpointRecorder()
+    context.events = events
+    async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2, rate_limiter=rate_limiter_from_args(args),
+                                metrics=recorder) as client:
+        for phase in phases:
+            phase_operations = [operation for operation in operations if operation["phase"] == phase]
+            if not phase_operations:
+                continue
+            started_at = time.perf_counter()
+            succeeded, total = (await execute_plan_async(phase_operations, client, context, args.concurrency))[phase]
+            elapsed = time.perf_counter() - started_at
+            # A one-operation phase (setup, resolve) is too short for its rate to mean anything.
+            add_sample(scenario["metrics"], f"{phase} throughput", succeeded / elapsed if elapsed > 0 else 0, "ops/s", "higher",
+                       gated=total > 1)
+            add_sample(scenario["metrics"], f"{phase} failed", total - succeeded, "operations", "lower")
+    add_endpoint_metrics(scenario, recorder)
+
+
+async def leaderboard_reads(args, context, scenario):
+    tokens = list(context.tokens.values())
+    if not tokens:
+        print("No seeded players are logged in; skipping the leaderboard reads.")
+        return
+    recorder = EndpointRecorder()
+    reads = LatencyRecorder()
+    async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2, rate_limiter=rate_limiter_from_args(args),
+                                metrics=recorder) as client:
+        async def send(sequence):
+            name, read = READS[sequence % len(READS)]
+            try:
+                response = await read(client, tokens[sequence % len(tokens)])
+            except Exception:
+                return f"{name} error"
+            return name if response.status_code == 200 else f"{name} {response.status_code}"
+
+        await run_open_loop(send, reads, args.read_rate, args.read_duration, max_in_flight=args.concurrency * 4, workers=args.concurrency)
+
+    # Latency comes from the open-loop recorder, which measures from each read's intended start.
+    metrics = scenario["metrics"]
+    add_latencies(metrics, reads.histograms, [name for name, _ in READS])
+    completed = sum(reads.histograms[name].total for name, _ in READS if name in reads.histograms)
+    add_sample(metrics, "reads throughput", completed / reads.duration() if reads.duration() > 0 else 0, "ops/s", "higher")
+    add_sample(metrics, "dropped reads", reads.dropped, "operations", "lower")
+    add_endpoint_metrics(scenario, recorder)
+
+
+def paging(args, admin_token, scenario):
+    recorder = EndpointRecorder()
+    with PwneuClient(args.api_url, pool_maxsize=args.pool_size, http2=args.http2, rate_limiter=rate_limiter_from_args(args),
+                     metrics=recorder) as client:
+        started_at = time.perf_counter()
+        for _ in range(args.paging_passes):
+            for _ in iter_challenges(client, admin_token):
+                pass
+            for _ in iter_users(client, admin_token):
+                pass
+        elapsed = time.perf_counter() - started_at
+    pages = recorder.requests.get("GetChallenges", 0) + recorder.requests.get("GetUsers", 0)
+    add_sample(scenario["metrics"], "pages throughput", pages / elapsed if elapsed > 0 else 0, "ops/s", "higher")
+    add_endpoint_metrics(scenario, recorder)
+
+
+def delete_guarded(delete, item_id):
+    # Challenges and categories are deleted behind IChallengePointsConcurrencyGuard, which turns
+    # requests away while SaveBuffersService or another guarded request holds it.
+    for _ in range(GUARD_RETRIES):
+        response = delete(item_id)
+        if response.status_code != 400 or "AnotherProcessRunning" not in response.text:
+            return response
+        time.sleep(GUARD_RETRY_DELAY)
+    return response
+
+
+def teardown(args, events, admin_token, context, scenario):
+    # Plan keys: "u3" is a user, "c1" a category, "c1.ch4" a challenge and "c1.ch4.h0" its hint.
+    user_ids = [item_id for key, item_id in context.ids.items() if key.startswith("u")]
+    category_ids = [item_id for key, item_id in context.ids.items() if key.startswith("c") and key.count(".") == 0]
+    challenge_ids = [item_id for key, item_id in context.ids.items() if key.startswith("c") and key.count(".") == 1]
+
+    recorder = EndpointRecorder()
+    deleted = failed = 0
+    events.start_phase("teardown", len(user_ids) + len(category_ids) + len(challenge_ids))
+    with PwneuClient(args.api_url, pool_maxsize=args.pool_size, http2=args.http2, rate_limiter=rate_limiter_from_args(args),
+                     metrics=recorder) as client:
+        response = client.deny_submissions(admin_token)
+        if response.status_code != 204:
+            print(f"Failed to deny submissions. Status code: {response.status_code}, Response: {response.text}")
+
+        def record(kind, item_id, response):
+            nonlocal deleted, failed
+            ok = response.status_code == 204
+            deleted += ok
+            failed += not ok
+            events.record("teardown", ok, response.status_code, None if ok else
+                          f"Failed to delete {kind} {item_id}. Status code: {response.status_code}, Response: {response.text}", id=item_id)
+
+        started_at = time.perf_counter()
+        for challenge_id in challenge_ids:
+            record("challenge", challenge_id, delete_guarded(lambda item_id: client.delete_challenge(admin_token, item_id), challenge_id))
+        for category_id in category_ids:
+            record("category", category_id, delete_guarded(lambda item_id: client.delete_category(admin_token, item_id), category_id))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for user_id, response in zip(user_ids, executor.map(lambda user_id: client.delete_user(admin_token, user_id), user_ids)):
+                record("member", user_id, response)
+        elapsed = time.perf_counter() - started_at
+        if context.access_key:
+            client.delete_access_key(admin_token, context.access_key)
+    events.finish_phase("teardown")
+
+    add_sample(scenario["metrics"], "deletes throughput", deleted / elapsed if elapsed > 0 else 0, "ops/s", "higher")
+    add_sample(scenario["metrics"], "deletes failed", failed, "operations", "lower")
+    add_endpoint_metrics(scenario, recorder)
+
+
+def run_repetition(args, admin_token, scenarios):
+    operations = compile_plan(benchmark_scenario(args))
+    context = ExecutionContext(admin_token, args.user_password, is_async=True)
+    # Seeding always runs; a scenario left out of --scenarios is measured into a throwaway dict.
+    unreported = {"name": "seeding", "metrics": {}, "endpoints": {}}
+
+    with event_sink_from_args(args) as events:
+        async def run_async():
+            await run_phases(args, events, context, operations, SEEDING_PHASES, scenarios.get("seeding", unreported))
+            if "submissions" in scenarios:
+                await run_phases(args, events, context, operations, SUBMISSION_PHASES, scenarios["submissions"])
+            if "leaderboards" in scenarios:
+                await leaderboard_reads(args, context, scenarios["leaderboards"])
+
+        asyncio.run(run_async())
+        if "paging" in scenarios:
+            paging(args, admin_token, scenarios["paging"])
+        if "teardown" in scenarios:
+            teardown(args, events, admin_token, context, scenarios["teardown"])
+
+
+def tolerances_from_args(args):
+    tolerances = {"ms": args.latency_tolerance, "ops/s": args.throughput_tolerance, "operations": 0, "requests": 0}
+    floors = {"ms": args.latency_floor}
+    return tolerances, floors
+
+
+def format_value(value, unit):
+    if value is None:
+        return "-"
+    return f"{value:.1f} {unit}" if unit in ("ms", "ops/s") else f"{value:g}"
+
+
+def print_results(results):
+    for name, scenario in results["scenarios"].items():
+        print(name)
+        for metric_name, metric in scenario["metrics"].items():
+            samples = metric["samples"]
+            spread = f" (min {format_value(min(samples), metric['unit'])}, max {format_value(max(samples), metric['unit'])})" if len(samples) > 1 else ""
+            print(f"  {metric_name:<28} {format_value(statistics.median(samples), metric['unit']):>14}{spread}")
+
+
+def print_comparison(current, baseline, args):
+    # Returns the number of regressed (or missing) gated metrics.
+    for key, base, value in settings_differences(current, baseline):
+        print(f"Warning: setting {key} was {base!r} in the baseline and is {value!r} now; the numbers may not be comparable.")
+    tolerances, floors = tolerances_from_args(args)
+    rows = compare_results(current, baseline, tolerances, floors)
+    units = {(scenario, name): metric["unit"] for scenario, data in baseline["scenarios"].items() for name, metric in data["metrics"].items()}
+
+    print(f"Compared with the baseline from {baseline['createdAt']} ({baseline.get('label') or 'no label'}):")
+    print(f"  {'scenario':<13} {'metric':<28} {'baseline':>14} {'current':>14} {'allowed':>12}  verdict")
+    failures = 0
+    for scenario, name, base, value, allowed, verdict in rows:
+        unit = units[(scenario, name)]
+        change = f"±{format_value(allowed, unit)}" if allowed is not None else "-"
+        print(f"  {scenario:<13} {name:<28} {format_value(base, unit):>14} {format_value(value, unit):>14} {change:>12}  {verdict}")
+        failures += verdict in ("regression", "missing")
+    print(f"{failures} regressions." if failures else "No regressions.")
+    return failures
+
+
+def add_gate_arguments(parser):
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Relative p99 increase tolerated (0.2 = 20%%).")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.1, help="Relative throughput drop tolerated (0.1 = 10%%).")
+    parser.add_argument("--latency-floor", type=float, default=1.0, help="Milliseconds of p99 change always tolerated.")
+
+
+def run(args):
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()] if args.scenarios else SCENARIOS
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from: {', '.join(SCENARIOS)}.")
+        return 2
+    baseline = None
+    if args.baseline:
+        # Read before the suite runs, so an unusable baseline doesn't cost a whole run.
+        try:
+            baseline = load_results(args.baseline)
+        except (OSError, ValueError) as e:
+            print(f"Cannot compare: {e}")
+            return 2
+    settings = {
+        "scenarios": selected, "repeat": args.repeat, "seed": args.seed, "users": args.users, "categories": args.categories,
+        "challengesPerCategory": args.challenges_per_category, "concurrency": args.concurrency, "readRate": args.read_rate,
+        "readDuration": args.read_duration, "pagingPasses": args.paging_passes, "rateLimits": args.rate_limits, "http2": args.http2,
+    }
+    results = new_results(args.label, environment(args.api_url), settings)
+    scenarios = {name: {"name": name, "metrics": {}, "endpoints": {}} for name in SCENARIOS if name in selected}
+
+    with PwneuClient(args.api_url, rate_limiter=rate_limiter_from_args(args)) as client:
+        admin_token = login_admin(client, args.admin_password)
+    if not admin_token:
+        return 2
+    for repetition in range(args.repeat):
+        print(f"Repetition {repetition + 1}/{args.repeat}")
+        run_repetition(args, admin_token, scenarios)
+
+    results["scenarios"] = {name: {"metrics": scenario["metrics"], "endpoints": scenario["endpoints"]} for name, scenario in scenarios.items()}
+    output = args.output or f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    save_results(results, output)
+    print(f"Results written to {output}.")
+    print_results(results)
+    if args.save_baseline:
+        save_results(results, args.save_baseline)
+        print(f"Baseline written to {args.save_baseline}.")
+    if baseline:
+        return 1 if print_comparison(results, baseline, args) else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API benchmark suite, store its results and gate on regressions against a baseline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and write its results.")
+    run_parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    run_parser.add_argument("--user-password", type=str, default=DEFAULT_PASSWORD, help="Password the seeded players register with.")
+    run_parser.add_argument("--label", type=str, default=None, help="What was measured, e.g. the API version or build.")
+    run_parser.add_argument("--output", type=str, default=None, help="Results file (defaults to benchmark-<timestamp>.json).")
+    run_parser.add_argument("--baseline", type=str, default=None, help="Compare with this results file and exit 1 on regressions.")
+    run_parser.add_argument("--save-baseline", type=str, default=None, help="Also write the results to this baseline file.")
+    run_parser.add_argument("--scenarios", type=str, default=None, help=f"Comma-separated scenarios to report (default all: {','.join(SCENARIOS)}).")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Repetitions of the suite; gating uses their median and spread.")
+    run_parser.add_argument("--seed", type=int, default=1, help="Seed of the seeding plan.")
+    run_parser.add_argument("--users", type=int, default=50, help="Players seeded per repetition.")
+    run_parser.add_argument("--categories", type=int, default=3, help="Categories seeded per repetition.")
+    run_parser.add_argument("--challenges-per-category", type=int, default=10, help="Challenges seeded per category.")
+    run_parser.add_argument("--concurrency", type=int, default=64, help="Requests in flight (and member deletions in parallel).")
+    run_parser.add_argument("--read-rate", type=float, default=200, help="Leaderboard reads per second.")
+    run_parser.add_argument("--read-duration", type=float, default=20, help="Seconds of leaderboard reads.")
+    run_parser.add_argument("--paging-passes", type=int, default=5, help="Walks through the challenge and user listings.")
+    add_gate_arguments(run_parser)
+    add_client_arguments(run_parser)
+    add_event_arguments(run_parser)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a results file with a baseline and exit 1 on regressions.")
+    compare_parser.add_argument("results", help="Results file to check.")
+    compare_parser.add_argument("baseline", help="Baseline results file.")
+    add_gate_arguments(compare_parser)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        try:
+            current, baseline = load_results(args.results), load_results(args.baseline)
+        except (OSError, ValueError) as e:
+            print(f"Cannot compare: {e}")
+            sys.exit(2)
+        sys.exit(1 if print_comparison(current, baseline, args) else 0)
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
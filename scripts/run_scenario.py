@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+)
+from pwneu_client.executor import ExecutionContext, execute_plan, execute_plan_async
+from pwneu_client.scenario import compile_plan, load_operations, load_scenario, summarize_plan, write_plan
+
+# Sample commands:
+#   python run_scenario.py plan scenarios/default.json --output plan.ndjson
+#   python run_scenario.py execute plan.ndjson --engine async --concurrency 500
+
+
+def print_summary(operations):
+    phase_totals = {}
+    for (phase, op), count in summarize_plan(operations).items():
+        print(f"{phase:<12} {op:<18} {count}")
+        phase_totals[phase] = phase_totals.get(phase, 0) + count
+    print(f"Total operations: {len(operations)} in {len(phase_totals)} phases.")
+
+
+def execute(args, operations):
+    token_store = token_store_from_args(args)
+    rate_limiter = rate_limiter_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with event_sink_from_args(args) as events:
+        with client_from_args(args, token_store, rate_limiter, recorder, metrics) as client:
+            admin_token = login_admin(client, args.admin_password)
+            if not admin_token:
+                return
+
+            if args.engine == "threads":
+                context = ExecutionContext(admin_token, args.user_password, events=events)
+                execute_plan(operations, client, context, args.concurrency)
+                return
+
+        async def run_async():
+            context = ExecutionContext(admin_token, args.user_password, is_async=True, events=events)
+            async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2,
+                                        token_store=token_store, rate_limiter=rate_limiter, recorder=recorder,
+                                        metrics=metrics) as client:
+                await execute_plan_async(operations, client, context, args.concurrency)
+
+        asyncio.run(run_async())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile scenario files into deterministic plans and execute them.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Compile a scenario and print its operation counts.")
+    plan_parser.add_argument("scenario", help="Scenario file (.json, .yml or .yaml).")
+    plan_parser.add_argument("--output", type=str, default=None, help="Write the compiled plan as NDJSON.")
+
+    execute_parser = subparsers.add_parser("execute", help="Execute a scenario or a compiled plan (.ndjson).")
+    execute_parser.add_argument("plan", help="Scenario file or compiled plan.")
+    execute_parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    execute_parser.add_argument("--user-password", type=str, default=None, help="Overrides the scenario's users.password for registering and logging in.")
+    execute_parser.add_argument("--engine", choices=["threads", "async"], default="threads", help="Execution engine.")
+    execute_parser.add_argument("--concurrency", type=int, default=64, help="Worker threads or in-flight requests.")
+    add_client_arguments(execute_parser)
+    add_event_arguments(execute_parser)
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        operations = compile_plan(load_scenario(args.scenario))
+        print_summary(operations)
+        if args.output:
+            write_plan(operations, args.output)
+            print(f"Plan written to {args.output}.")
+    else:
+        operations = load_operations(args.plan)
+        print_summary(operations)
+        execute(args, operations)
+
+
+if __name__ == "__main__":
+    main()
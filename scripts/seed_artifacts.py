@@ -0,0 +1,101 @@
+import argparse
+import concurrent.futures
+import resource
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    add_client_arguments,
+    add_event_arguments,
+    client_from_args,
+    event_sink_from_args,
+    login_admin,
+    fetch_all_challenge_ids,
+)
+from pwneu_client.uploads import MultipartUpload, format_size, parse_size
+
+# Sample command: python seed_artifacts.py --sizes 64KB,1MB,25MB --per-challenge 2 --concurrency 4
+#
+# Attaches generated files to challenges through play/challenges/{id}/artifacts. Each file is
+# produced chunk by chunk while it is sent, so uploading hundreds of MB takes one chunk of client
+# memory (the peak RSS is printed at the end). The API copies every upload into memory and stores
+# it in Postgres, and Kestrel refuses bodies over 30,000,000 bytes with 413 unless its
+# MaxRequestBodySize is raised, so larger sizes measure how the server rejects them.
+
+KESTREL_MAX_REQUEST_BODY_SIZE = 30_000_000
+
+
+def parse_sizes(value):
+    try:
+        return [parse_size(part) for part in value.split(",") if part.strip()]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def upload_artifact(client, events, access_token, challenge_id, upload):
+    started_at = time.perf_counter()
+    response = client.add_artifact(access_token, challenge_id, upload)
+    elapsed = time.perf_counter() - started_at
+
+    if response.status_code == 200:
+        artifact_id = response.text.strip().strip('"')
+        events.record("artifacts", True,
+                      message=f"Artifact {upload.file_name} ({format_size(upload.size)}) added to challenge {challenge_id} in {elapsed:.2f}s: {artifact_id}",
+                      challenge=challenge_id, artifact=artifact_id, size=upload.size, seconds=round(elapsed, 3))
+        return upload.size
+    else:
+        events.record("artifacts", False, response.status_code,
+                      f"Failed to add artifact {upload.file_name} ({format_size(upload.size)}) to challenge {challenge_id}. "
+                      f"Status code: {response.status_code}, Response: {response.text}",
+                      challenge=challenge_id, size=upload.size, seconds=round(elapsed, 3))
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attach generated artifacts to challenges with streamed uploads.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("64KB,1MB,10MB"),
+                        help="Comma-separated artifact sizes (e.g. 64KB,1MB,25MB), used in turn across uploads.")
+    parser.add_argument("--per-challenge", type=int, default=1, help="Artifacts to attach to each challenge.")
+    parser.add_argument("--challenges-limit", type=int, default=None, help="Maximum number of challenges to attach artifacts to.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Uploads in flight.")
+    parser.add_argument("--content-type", type=str, default="application/octet-stream", help="Content type of the uploaded files.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated file contents.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    args = parser.parse_args()
+
+    oversized = sorted({size for size in args.sizes if size > KESTREL_MAX_REQUEST_BODY_SIZE})
+    if oversized:
+        print(f"Warning: {', '.join(format_size(size) for size in oversized)} exceed Kestrel's default request body limit "
+              f"({KESTREL_MAX_REQUEST_BODY_SIZE} bytes); expect 413 unless the API raises MaxRequestBodySize.")
+
+    with client_from_args(args) as client, event_sink_from_args(args) as events:
+        access_token = login_admin(client, args.admin_password)
+        if not access_token:
+            return
+        challenge_ids = fetch_all_challenge_ids(client, access_token)[:args.challenges_limit]
+        if not challenge_ids:
+            return
+
+        uploads = []
+        for challenge_id in challenge_ids:
+            for _ in range(args.per_challenge):
+                index = len(uploads)
+                size = args.sizes[index % len(args.sizes)]
+                upload = MultipartUpload(f"artifact-{index:05d}-{format_size(size)}.bin", size, seed=args.seed + index,
+                                         content_type=args.content_type)
+                uploads.append((challenge_id, upload))
+
+        events.start_phase("artifacts", len(uploads))
+        started_at = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            uploaded = sum(executor.map(lambda item: upload_artifact(client, events, access_token, *item), uploads))
+        elapsed = time.perf_counter() - started_at
+        events.finish_phase("artifacts")
+
+    print(f"Uploaded {format_size(uploaded)} in {elapsed:.1f}s ({uploaded / 2 ** 20 / elapsed if elapsed > 0 else 0:.1f}MB/s), "
+          f"peak client memory {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,102 @@
-import requests  # type: ignore
-import json
 import argparse
 import random
 import concurrent.futures
-from faker import Faker  # type: ignore
-
-fake = Faker()
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    add_client_arguments,
+    add_event_arguments,
+    add_data_arguments,
+    client_from_args,
+    event_sink_from_args,
+    data_pools_from_args,
+    login_admin,
+    login_user,
+    fetch_all_users,
+    fetch_all_challenge_ids,
+)
 
 # Sample command: python seed_hint_usages.py --admin-password "PwneuPwneu!1" --api-url "http://localhost:37100"
 
-def login_admin(api_url, admin_password):
-    login_payload = {"userName": "admin", "password": admin_password}
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-
-    if response.status_code == 200:
-        access_token = response.json().get('accessToken')
-        print("Admin logged in successfully. Access token retrieved.")
-        return access_token
-    else:
-        print(f"Failed to log in admin. Status code: {response.status_code}, Response: {response.text}")
-        return None
-
-
-def fetch_all_challenges(api_url, access_token):
-    challenges = []
-    page = 1
-    has_next_page = True
-
-    while has_next_page:
-        response = requests.get(f"{api_url}/play/challenges?page={page}", headers={'Authorization': f'Bearer {access_token}'})
-        if response.status_code == 200:
-            data = response.json()
-            challenges.extend(data['items'])
-            has_next_page = data['hasNextPage']
-            page += 1
-        else:
-            print(f"Failed to fetch challenges. Status code: {response.status_code}, Response: {response.text}")
-            break
-
-    print(f"Total challenges retrieved: {len(challenges)}")
-    return challenges
-
-
-def add_hint_to_challenge(api_url, access_token, challenge_id):
-    content = fake.sentence(nb_words=6)
+def add_hint_to_challenge(client, events, access_token, challenge_id, content):
     deduction = random.randint(1, 10) * 5
-    hint_payload = {"content": content, "deduction": deduction}
 
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    response = requests.post(f"{api_url}/play/challenges/{challenge_id}/hints", data=json.dumps(hint_payload), headers=headers)
+    response = client.add_hint(access_token, challenge_id, content, deduction)
 
     if response.status_code == 200:
         hint_id = response.text.strip('"')
-        print(f"Hint added to challenge ID: {challenge_id}, Hint ID: {hint_id}")
+        events.record("hints", True, message=f"Hint added to challenge ID: {challenge_id}, Hint ID: {hint_id}",
+                      challenge=challenge_id, hint=hint_id)
         return hint_id
     else:
-        print(f"Failed to add hint to challenge ID: {challenge_id}. Status code: {response.status_code}, Response: {response.text}")
-        return None
-
-
-def fetch_all_users(api_url, access_token):
-    users = []
-    page = 1
-    has_next_page = True
-
-    while has_next_page:
-        response = requests.get(f"{api_url}/identity/users?page={page}", headers={'Authorization': f'Bearer {access_token}'})
-        if response.status_code == 200:
-            data = response.json()
-            users.extend(data['items'])
-            has_next_page = data['hasNextPage']
-            page += 1
-        else:
-            print(f"Failed to fetch users. Status code: {response.status_code}, Response: {response.text}")
-            break
-
-    print(f"Total users retrieved: {len(users)}")
-    return users
-
-
-def login_user(api_url, user_name, password):
-    login_payload = {"userName": user_name, "password": password}
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-
-    if response.status_code == 200:
-        user_info = response.json()
-        if "Member" in user_info.get("roles", []):
-            print(f"User '{user_name}' logged in successfully.")
-            return user_info['accessToken']
-        else:
-            print(f"User '{user_name}' does not have 'Member' role. Skipping.")
-            return None
-    else:
-        print(f"Failed to log in user '{user_name}'. Status code: {response.status_code}, Response: {response.text}")
+        events.record("hints", False, response.status_code,
+                      f"Failed to add hint to challenge ID: {challenge_id}. Status code: {response.status_code}, Response: {response.text}",
+                      challenge=challenge_id)
         return None
 
 
-def use_hint(api_url, access_token, hint_id):
-    headers = {'Authorization': f'Bearer {access_token}'}
-    response = requests.post(f"{api_url}/play/hints/{hint_id}", headers=headers)
+def use_hint(client, events, access_token, hint_id):
+    response = client.use_hint(access_token, hint_id)
 
     if response.status_code == 200:
-        print(f"Hint {hint_id} used successfully.")
+        events.record("hint usages", True, message=f"Hint {hint_id} used successfully.", hint=hint_id)
     else:
-        print(f"Failed to use hint {hint_id}. Status code: {response.status_code}, Response: {response.text}")
+        events.record("hint usages", False, response.status_code,
+                      f"Failed to use hint {hint_id}. Status code: {response.status_code}, Response: {response.text}",
+                      hint=hint_id)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Seed hints via API.")
-    parser.add_argument("--admin-password", type=str, default="PwneuPwneu!1", help="Password for the admin user.")
-    parser.add_argument("--api-url", type=str, default="http://localhost:37100/api/v1", help="The base API URL (default: http://localhost:37100).")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    add_data_arguments(parser)
     args = parser.parse_args()
-
-    api_url = args.api_url
-
-    access_token = login_admin(api_url, args.admin_password)
-
-    if access_token:
-        challenges = fetch_all_challenges(api_url, access_token)
-
-        hint_ids = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_hint = {executor.submit(add_hint_to_challenge, api_url, access_token, challenge['id']): challenge for challenge in challenges}
-            for future in concurrent.futures.as_completed(future_to_hint):
-                hint_id = future.result()
-                if hint_id:
-                    hint_ids.append(hint_id)
-
-        print(f"Total hints added: {len(hint_ids)}")
-
-        users = fetch_all_users(api_url, access_token)
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            for user in users:
-                user_name = user['userName']
-                user_access_token = login_user(api_url, user_name, args.admin_password)
-
-                if user_access_token:
-                    num_hints_to_use = random.randint(int(len(hint_ids) * 0.3), int(len(hint_ids) * 0.6))
-                    hints_to_use = random.sample(hint_ids, k=num_hints_to_use)
-
-                    for hint_id in hints_to_use:
-                        executor.submit(use_hint, api_url, user_access_token, hint_id)
+    pools = data_pools_from_args(args)
+
+    with client_from_args(args) as client, event_sink_from_args(args) as events:
+        access_token = login_admin(client, args.admin_password)
+
+        if access_token:
+            challenge_ids = fetch_all_challenge_ids(client, access_token)
+
+            hint_ids = []
+            events.start_phase("hints", len(challenge_ids))
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                future_to_hint = {executor.submit(add_hint_to_challenge, client, events, access_token, challenge_id, pools.sentence(6)): challenge_id for challenge_id in challenge_ids}
+                for future in concurrent.futures.as_completed(future_to_hint):
+                    hint_id = future.result()
+                    if hint_id:
+                        hint_ids.append(hint_id)
+
+            events.finish_phase("hints")
+            print(f"Total hints added: {len(hint_ids)}")
+
+            users = fetch_all_users(client, access_token)
+
+            futures = []
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                for user in users:
+                    user_name = user['userName']
+                    user_access_token = login_user(client, user_name, args.admin_password, events)
+
+                    if user_access_token:
+                        num_hints_to_use = random.randint(int(len(hint_ids) * 0.3), int(len(hint_ids) * 0.6))
+                        hints_to_use = random.sample(hint_ids, k=num_hints_to_use)
+
+                        events.add_to_total("hint usages", len(hints_to_use))
+                        for hint_id in hints_to_use:
+                            futures.append(executor.submit(use_hint, client, events, user_access_token, hint_id))
+
+                # Wait on every usage so exceptions surface instead of being dropped with the future.
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        events.record("hint usages", False, "error", f"Hint usage failed. Error: {e}")
+
+            events.finish_phase("hint usages")
+            print(f"Total hint usages sent: {len(futures)}")
 
 
 if __name__ == "__main__":
@@ -1,32 +1,69 @@
-import requests  # type: ignore
-import json
 import argparse
+import asyncio
+import contextlib
+import hashlib
 import random
+import time
 import concurrent.futures
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    EventSink,
+    add_client_arguments,
+    add_event_arguments,
+    add_journal_arguments,
+    client_from_args,
+    event_sink_from_args,
+    journal_from_args,
+    token_store_from_args,
+    rate_limiter_from_args,
+    trace_recorder_from_args,
+    metrics_from_args,
+    login_admin,
+    login_user,
+    login_user_async,
+    fetch_all_users,
+    fetch_all_challenges,
+    fetch_all_challenge_ids,
+)
+from pwneu_client.loadgen import LatencyRecorder
+from pwneu_client.workload import WorkloadModel, load_workload
+from pwneu_client.workers import run_workers, shard, share, worker_args
 
 # Sample command: python seed_leaderboards.py --admin-password "PwneuPwneu!1" --api-url "http://localhost:37100"
-
-def login_admin(api_url, admin_password):
-    login_payload = {
-        "userName": "admin",
-        "password": admin_password
-    }
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-
-    if response.status_code == 200:
-        access_token = response.json().get('accessToken')
-        print("Admin logged in successfully. Access token retrieved.")
-        return access_token
-    else:
-        print(f"Failed to log in admin. Status code: {response.status_code}, Response: {response.text}")
-        return None
-
-
-def allow_submissions(api_url, access_token):
-    allow_payload = {"allowed": True}
-    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {access_token}'}
-    response = requests.put(f"{api_url}/play/configurations/submissionsAllowed/allow", data=json.dumps(allow_payload), headers=headers)
+# Async engine: python seed_leaderboards.py --engine async --concurrency 2000
+# One async engine per core: python seed_leaderboards.py --workers 8 --concurrency 4000
+#
+# With --workers N the users are logged in once here, then dealt out to N processes (see
+# pwneu_client/workers.py) that start submitting together. --concurrency is the total and is split
+# between them; so are the per-user rate limits, since each user belongs to exactly one worker.
+# Each worker prints its own summary, writes --results and --record-trace to files suffixed with
+# its index, and the merged counts and SubmitFlag latencies are printed at the end.
+#
+# Event-like traffic: python seed_leaderboards.py --engine async --workload realistic --event-duration 3600
+#
+# --workload realistic replaces the uniform challenge sample with pwneu_client/workload.py: Zipf
+# popularity over difficulty, solves weighted by points, casual/strong/brute-forcer players, and
+# session starts following an arrival curve stretched over --event-duration seconds (0 sends
+# everything at once). --workload-file overrides parts of the model with a JSON file.
+#
+# Resumable: python seed_leaderboards.py --engine async --journal leaderboards.journal
+#
+# With --journal, every submission the API answered is recorded in the journal (see
+# pwneu_client/journal.py) under its plan step, "{user name}:{index in the user's session}".
+# Sessions are generated from the seed stored in the journal, so running the same command again
+# after a crash rebuilds the same sessions and skips the steps already done, along with their
+# think time. Submissions that failed or never got an answer are sent again.
+
+CORRECT_FLAG = "PWNEU{PWNEU}"
+INCORRECT_FLAG = "INCORRECT_FLAG"
+
+# Latency report order; anything else (429, error, ...) follows.
+SUBMISSION_CLASSES = ["Correct", "Incorrect", "AlreadySolved", "MaxAttemptReached", "DeadlineReached", "SubmittingTooOften"]
+
+
+def allow_submissions(client, access_token):
+    response = client.allow_submissions(access_token)
 
     if response.status_code == 204:
         print("Submissions allowed successfully.")
@@ -34,135 +71,320 @@ def allow_submissions(api_url, access_token):
         print(f"Failed to allow submissions. Status code: {response.status_code}, Response: {response.text}")
 
 
-def fetch_all_challenges(api_url, access_token):
-    challenges = []
-    page = 1
-    has_next_page = True
-
-    while has_next_page:
-        response = requests.get(f"{api_url}/play/challenges?page={page}&pageSize=20", headers={'Authorization': f'Bearer {access_token}'})
-        if response.status_code == 200:
-            data = response.json()
-            challenges.extend(data['items'])
-            has_next_page = data['hasNextPage']
-            page += 1
-        else:
-            print(f"Failed to fetch challenges. Status code: {response.status_code}, Response: {response.text}")
-            break
-
-
-    print(f"Total challenges retrieved: {len(challenges)}")
-    return challenges
-
-
-def fetch_all_users(api_url, access_token):
-    users = []
-    page = 1
-    has_next_page = True
-
-    while has_next_page:
-        response = requests.get(f"{api_url}/identity/users?page={page}", headers={'Authorization': f'Bearer {access_token}'})
-        if response.status_code == 200:
-            data = response.json()
-            users.extend(data['items'])
-            has_next_page = data['hasNextPage']
-            page += 1
-        else:
-            print(f"Failed to fetch users. Status code: {response.status_code}, Response: {response.text}")
-            break
-
-    print(f"Total users retrieved: {len(users)}")
-    return users
-
-
-def login_user(api_url, user_name):
-    login_payload = {
-        "userName": user_name,
-        "password": "PwneuPwneu!1"
-    }
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-
-    if response.status_code == 200:
-        user_info = response.json()
-        if "Member" in user_info.get("roles", []):
-            print(f"User '{user_name}' logged in successfully.")
-            return user_info['accessToken']
-        else:
-            print(f"User '{user_name}' does not have 'Member' role. Skipping.")
-            return None
+def record_submission(events, flag, challenge_id, status_code, response_text, phase="submissions"):
+    if status_code == 200:
+        events.record(phase, True, response_text,
+                      f"Flag '{flag}' submitted successfully for challenge ID: {challenge_id} with response: {response_text}.",
+                      challenge=challenge_id, flag=flag)
     else:
-        print(f"Failed to log in user '{user_name}'. Status code: {response.status_code}, Response: {response.text}")
-        return None
+        events.record(phase, False, status_code,
+                      f"Failed to submit flag '{flag}' for challenge ID: {challenge_id}. Status code: {status_code}, Response: {response_text}.",
+                      challenge=challenge_id, flag=flag)
 
 
-def submit_flag(api_url, access_token, challenge_id, flag):
-    response = requests.post(f"{api_url}/play/challenges/{challenge_id}/submit?flag={flag}", headers={'Authorization': f'Bearer {access_token}'})
+def submit_flag(client, events, access_token, challenge_id, flag):
+    response = client.submit_flag(access_token, challenge_id, flag)
     response_text = response.text.strip('"')
-    
-    if response.status_code == 200:
-        print(f"Flag '{flag}' submitted successfully for challenge ID: {challenge_id} with response: {response_text}.")
-    else:
-        print(f"Failed to submit flag '{flag}' for challenge ID: {challenge_id}. Status code: {response.status_code}, Response: {response_text}.")
-
-    return response_text
-
-
-def process_user_submission(api_url, user_access_token, challenges):
-    for challenge in challenges:
-        challenge_id = challenge['id']
-
-        incorrect_attempts = random.randint(1, 3)
-
-        for _ in range(incorrect_attempts):
-            incorrect_flag = "INCORRECT_FLAG"  
-            submit_flag(api_url, user_access_token, challenge_id, incorrect_flag)
-
-        correct_flag = "PWNEU{PWNEU}"
-        submit_flag(api_url, user_access_token, challenge_id, correct_flag)
-
-
-def get_user_access_tokens(api_url, users):
+    record_submission(events, flag, challenge_id, response.status_code, response_text)
+    return response.status_code
+
+
+def uniform_session(rng, challenge_ids):
+    # 70-100% of the challenges, each with one to three incorrect flags before the correct one, in
+    # the session format of WorkloadModel.session() with no think time.
+    total_challenges = len(challenge_ids)
+    num_challenges_to_submit = rng.randint(max(int(total_challenges * 0.7), 1), total_challenges)
+    submissions = []
+    for challenge_id in rng.sample(challenge_ids, k=num_challenges_to_submit):
+        incorrect_attempts = rng.randint(1, 3)
+        submissions += [(0, challenge_id, False)] * incorrect_attempts + [(0, challenge_id, True)]
+    return "uniform", 0, submissions
+
+
+def user_session(user_name, challenge_ids, workload, seed):
+    # workload is (WorkloadModel, event seconds), or None for the uniform sample. Either way the
+    # session only depends on the seed and the user name, which is what lets a journal resume it.
+    if workload:
+        model, event_seconds = workload
+        return model.session(user_name, event_seconds)
+    return uniform_session(random.Random(f"{seed}:{user_name}"), challenge_ids)
+
+
+def resumed_event_time(sessions, journal=None):
+    # How far into the event an earlier run got: the scheduled time of the latest step it
+    # finished. sessions are (user name, session) pairs for every user of the run.
+    latest = 0.0
+    if not journal or not journal.resumed:
+        return latest
+    for user_name, (_, start, submissions) in sessions:
+        at = start
+        for index, (delay, _, _) in enumerate(submissions):
+            at += delay
+            if f"{user_name}:{index}" in journal.steps:
+                latest = max(latest, at)
+    return latest
+
+
+def pending_steps(user_name, session, journal=None, resumed_at=0.0):
+    # Yields the steps still to do, each with the seconds to wait before it. The waits follow the
+    # session's schedule on an event clock that starts at resumed_at, so a resumed run neither
+    # waits out the start offsets again nor sleeps through the delays of steps already done.
+    _, start, submissions = session
+    clock, at = resumed_at, start
+    for index, (delay, challenge_id, correct) in enumerate(submissions):
+        at += delay
+        step = f"{user_name}:{index}"
+        if journal and journal.done(step):
+            continue
+        yield step, max(at - clock, 0), challenge_id, correct
+        clock = max(clock, at)
+
+
+def process_user_session(client, events, user_name, user_access_token, session, journal=None, resumed_at=0.0):
+    for step, wait, challenge_id, correct in pending_steps(user_name, session, journal, resumed_at):
+        if wait:
+            time.sleep(wait)
+        status_code = submit_flag(client, events, user_access_token, challenge_id, CORRECT_FLAG if correct else INCORRECT_FLAG)
+        if journal and status_code == 200:
+            journal.record(step, challenge=challenge_id, correct=correct)
+
+
+def get_user_access_tokens(client, events, users):
     tokens = {}
+    events.start_phase("logins", len(users))
     with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = {executor.submit(login_user, api_url, user['userName']): user['userName'] for user in users}
+        futures = {executor.submit(login_user, client, user['userName'], DEFAULT_PASSWORD, events): user['userName'] for user in users}
 
         for future in concurrent.futures.as_completed(futures):
             user_name = futures[future]
             user_access_token = future.result()
             if user_access_token:
                 tokens[user_name] = user_access_token
+    events.finish_phase("logins")
     return tokens
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Seed submissions via API.")
-    parser.add_argument("--admin-password", type=str, default="PwneuPwneu!1", help="Password for the admin user.")
-    parser.add_argument("--api-url", type=str, default="http://localhost:37100/api/v1", help="Base URL of the API.")
-    args = parser.parse_args()
-
-    access_token = login_admin(args.api_url, args.admin_password)
-
-    if access_token:
-        allow_submissions(args.api_url, access_token)
-        challenges = fetch_all_challenges(args.api_url, access_token)
-        users = fetch_all_users(args.api_url, access_token)
+async def submit_flag_async(client, events, semaphore, latency, phase, access_token, challenge_id, flag):
+    # A transport error fails this submission only; the user's remaining submissions go on.
+    try:
+        async with semaphore:
+            started_at = time.perf_counter()
+            response = await client.submit_flag(access_token, challenge_id, flag)
+    except Exception as e:
+        latency.record("error", time.perf_counter() - started_at)
+        events.record(phase, False, "error", f"Failed to submit flag '{flag}' for challenge ID: {challenge_id}. Error: {e}",
+                      challenge=challenge_id, flag=flag)
+        return None
+    response_text = response.text.strip('"')
+    latency.record(response_text if response.status_code == 200 else str(response.status_code), time.perf_counter() - started_at)
+    record_submission(events, flag, challenge_id, response.status_code, response_text, phase)
+    return response.status_code
+
+
+async def process_user_session_async(client, events, semaphore, latency, phase, user_name, user_access_token, session,
+                                     journal=None, resumed_at=0.0):
+    errors = 0
+    for step, wait, challenge_id, correct in pending_steps(user_name, session, journal, resumed_at):
+        if wait:
+            await asyncio.sleep(wait)
+        flag = CORRECT_FLAG if correct else INCORRECT_FLAG
+        status_code = await submit_flag_async(client, events, semaphore, latency, phase, user_access_token, challenge_id, flag)
+        if status_code is None:
+            errors += 1
+        elif journal and status_code == 200:
+            journal.record(step, challenge=challenge_id, correct=correct)
+    return errors
+
+
+async def get_user_access_tokens_async(client, events, semaphore, users):
+    async def login(user_name):
+        try:
+            async with semaphore:
+                return user_name, await login_user_async(client, user_name, DEFAULT_PASSWORD, events)
+        except Exception as e:
+            events.record("logins", False, "error", f"Failed to log in user '{user_name}'. Error: {e}", user=user_name)
+            return user_name, None
+
+    events.start_phase("logins", len(users))
+    results = await asyncio.gather(*(login(user['userName']) for user in users))
+    events.finish_phase("logins")
+    return {user_name: token for user_name, token in results if token}
+
+
+async def submit_all_async(client, events, semaphore, user_tokens, challenge_ids, workload=None, seed=None, journal=None, phase="submissions",
+                           resumed_at=None):
+    sessions = [(user_name, user_session(user_name, challenge_ids, workload, seed)) for user_name in user_tokens]
+    if resumed_at is None:
+        resumed_at = resumed_event_time(sessions, journal)
+    latency = LatencyRecorder()
+    events.start_phase(phase)
+    latency.started_at = time.time()
+    errors = await asyncio.gather(*(process_user_session_async(client, events, semaphore, latency, phase, user_name, user_tokens[user_name],
+                                                               session, journal, resumed_at)
+                                    for user_name, session in sessions))
+    latency.finished_at = time.time()
+    events.finish_phase(phase)
+    if sum(errors):
+        print(f"{sum(errors)} submissions failed with transport errors.")
+    return latency
+
+
+# One event loop and one connection pool serve every simulated user. The semaphore bounds the
+# requests in flight, and each user is a lightweight task instead of an OS thread.
+async def run_async(api_url, concurrency, http2, token_store, rate_limiter, recorder, metrics, events, users, challenge_ids,
+                    workload=None, seed=None, journal=None, submit=True):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with AsyncPwneuClient(api_url, max_connections=concurrency, http2=http2, token_store=token_store,
+                                rate_limiter=rate_limiter, recorder=recorder, metrics=metrics) as client:
+        user_tokens = await get_user_access_tokens_async(client, events, semaphore, users)
+        if not submit:
+            return user_tokens
+
+        latency = await submit_all_async(client, events, semaphore, user_tokens, challenge_ids, workload, seed, journal)
+        print("SubmitFlag latency:")
+        latency.print_report(SUBMISSION_CLASSES)
+        return user_tokens
+
+
+async def submit_in_worker(index, args, user_tokens, challenge_ids, workload, seed, resumed_at, ready):
+    concurrency = share(args.concurrency, args.workers)
+    semaphore = asyncio.Semaphore(concurrency)
+    phase = f"submissions (worker {index})"
+
+    # Each worker appends to its own part of the journal and reads all of them.
+    with EventSink(args.results, verbose=args.verbose, interval=0) as events, \
+            journal_from_args(args, index) or contextlib.nullcontext() as journal:
+        async with AsyncPwneuClient(args.api_url, max_connections=concurrency, http2=args.http2,
+                                    rate_limiter=rate_limiter_from_args(args), recorder=trace_recorder_from_args(args),
+                                    metrics=metrics_from_args(args)) as client:
+            # Lets a worker log a user in again if the parent's token is rejected.
+            client.credentials.update(dict.fromkeys(user_tokens, DEFAULT_PASSWORD))
+            ready()
+            latency = await submit_all_async(client, events, semaphore, user_tokens, challenge_ids, workload, seed, journal, phase,
+                                             resumed_at)
+        return {"counts": events.counts(phase), "latency": latency.to_dict(), "skipped": journal.skipped if journal else 0}
+
+
+def submission_worker(index, payload, ready):
+    args, user_tokens, challenge_ids, workload, seed, resumed_at = payload
+    return asyncio.run(submit_in_worker(index, worker_args(args, index), user_tokens, challenge_ids, workload, seed, resumed_at, ready))
+
+
+def run_workers_async(args, token_store, rate_limiter, recorder, metrics, events, users, challenge_ids, workload, seed, journal=None):
+    user_tokens = list(asyncio.run(run_async(args.api_url, args.concurrency, args.http2, token_store, rate_limiter, recorder, metrics,
+                                             events, users, challenge_ids, submit=False)).items())
+    # Every worker resumes from the same event time, taken over all users rather than its shard.
+    resumed_at = resumed_event_time([(user_name, user_session(user_name, challenge_ids, workload, seed)) for user_name, _ in user_tokens],
+                                    journal)
+    payloads = [(args, dict(shard(user_tokens, args.workers, index)), challenge_ids, workload, seed, resumed_at)
+                for index in range(args.workers)]
+    print(f"Starting {args.workers} workers with {len(user_tokens)} users.")
+    results = run_workers(submission_worker, payloads)
+    if not results:
+        return
+
+    latency = LatencyRecorder()
+    for result in results:
+        events.add_counts("submissions", result["counts"])
+        latency.merge(LatencyRecorder.from_dict(result["latency"]))
+    events.finish_phase("submissions", max(result["counts"]["finishedAt"] or 0 for result in results) or None)
+    print(f"SubmitFlag latency across {len(results)} workers:")
+    latency.print_report(SUBMISSION_CLASSES)
+    if journal:
+        # The workers opened the journal themselves; this one only reports for them.
+        journal.skipped += sum(result["skipped"] for result in results)
+
+
+def run_threads(client, events, concurrency, users, challenge_ids, workload=None, seed=None, journal=None):
+    user_tokens = get_user_access_tokens(client, events, users)
+
+    sessions = [(user_name, user_session(user_name, challenge_ids, workload, seed)) for user_name in user_tokens]
+    resumed_at = resumed_event_time(sessions, journal)
+
+    events.start_phase("submissions")
+    # With a realistic workload a waiting user holds a thread, so --concurrency should cover the
+    # users in one event.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(process_user_session, client, events, user_name, user_tokens[user_name], session, journal, resumed_at)
+                   for user_name, session in sessions]
 
-        user_tokens = get_user_access_tokens(args.api_url, users)
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    events.finish_phase("submissions")
+
+
+def session_plan(args, challenge_ids, journal):
+    # What the sessions are generated from. A journal keeps the plan it was started with; resuming
+    # it with other options would change the steps behind its keys, so that is refused.
+    digest = hashlib.sha256("\n".join(sorted(challenge_ids)).encode()).hexdigest()[:16]
+    plan = {"workload": args.workload, "workloadFile": args.workload_file, "workloadSeed": args.workload_seed,
+            "eventDuration": args.event_duration, "challenges": digest,
+            "seed": random.randrange(1 << 32) if args.seed is None else args.seed}
+    if journal is None:
+        return plan
+
+    stored = journal.use_plan(plan)
+    changed = [key for key, value in plan.items() if stored.get(key) != value and (key != "seed" or args.seed is not None)]
+    if changed:
+        print(f"The journal {args.journal} was started with a different {', '.join(changed)}. Use a new --journal to change the plan.")
+        return None
+    if journal.resumed:
+        print(f"Resuming from {args.journal}: {journal.resumed} submissions were already done.")
+    return stored
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1000) as executor:
-            futures = []
-            for user_access_token in user_tokens.values():
-                total_challenges = len(challenges)
-                min_challenges_to_submit = max(int(total_challenges * 0.7), 1)
-                max_challenges_to_submit = total_challenges
-                num_challenges_to_submit = random.randint(min_challenges_to_submit, max_challenges_to_submit)
-                challenges_to_submit = random.sample(challenges, k=num_challenges_to_submit)
 
-                futures.append(executor.submit(process_user_submission, args.api_url, user_access_token, challenges_to_submit))
+def main():
+    parser = argparse.ArgumentParser(description="Seed submissions via API.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+    parser.add_argument("--engine", choices=["threads", "async"], default="threads", help="Concurrency engine for user logins and submissions.")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Worker threads (threads engine) or in-flight requests (async engine).")
+    parser.add_argument("--workers", type=int, default=1, help="Processes submitting with the async engine, each pinned to a core.")
+    parser.add_argument("--workload", choices=["uniform", "realistic"], default="uniform",
+                        help="Uniform challenge samples, or the event-like model of pwneu_client/workload.py.")
+    parser.add_argument("--workload-file", type=str, default=None, help="JSON file overriding parts of the realistic workload model.")
+    parser.add_argument("--workload-seed", type=int, default=0, help="Seed of the realistic workload's player sessions.")
+    parser.add_argument("--event-duration", type=float, default=0, help="Seconds the realistic workload's arrivals are spread over (0 sends at once).")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the uniform challenge samples (random by default; a journal keeps its own).")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    add_journal_arguments(parser)
+    args = parser.parse_args()
 
-            for future in concurrent.futures.as_completed(futures):
-                future.result()
+    token_store = token_store_from_args(args)
+    rate_limiter = rate_limiter_from_args(args)
+    recorder = trace_recorder_from_args(args)
+    metrics = metrics_from_args(args)
+
+    with client_from_args(args, token_store, rate_limiter, recorder, metrics) as client, event_sink_from_args(args) as events, \
+            journal_from_args(args) or contextlib.nullcontext() as journal:
+        access_token = login_admin(client, args.admin_password)
+
+        if access_token:
+            allow_submissions(client, access_token)
+            workload = None
+            if args.workload == "realistic":
+                # The model needs points, which only the paged listing returns.
+                challenges = fetch_all_challenges(client, access_token)
+                challenge_ids = [challenge["id"] for challenge in challenges]
+                workload = (WorkloadModel(load_workload(args.workload_file), challenges, args.workload_seed), args.event_duration)
+            else:
+                # Sorted, so the uniform samples don't depend on the order the API lists them in.
+                challenge_ids = sorted(fetch_all_challenge_ids(client, access_token))
+            plan = session_plan(args, challenge_ids, journal)
+            if plan is None:
+                return
+            users = fetch_all_users(client, access_token)
+
+            if args.workers > 1:
+                run_workers_async(args, token_store, rate_limiter, recorder, metrics, events, users, challenge_ids, workload, plan["seed"], journal)
+            elif args.engine == "async":
+                asyncio.run(run_async(args.api_url, args.concurrency, args.http2, token_store, rate_limiter, recorder, metrics, events,
+                                      users, challenge_ids, workload, plan["seed"], journal))
+            else:
+                run_threads(client, events, args.concurrency, users, challenge_ids, workload, plan["seed"], journal)
+            if journal:
+                print(f"Skipped {journal.skipped} submissions done by an earlier run.")
 
 
 if __name__ == "__main__":
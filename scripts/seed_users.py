@@ -1,41 +1,33 @@
-import requests  # type: ignore
-import json
 import time
 import argparse
+import queue
+import threading
+import concurrent.futures
 from datetime import datetime, timedelta
-from faker import Faker  # type: ignore
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    add_client_arguments,
+    add_event_arguments,
+    add_data_arguments,
+    client_from_args,
+    event_sink_from_args,
+    data_pools_from_args,
+    login_admin,
+    iter_users,
+)
+from pwneu_client.ratelimit import TokenBucket
 
 # Sample command: python seed_users.py --admin-password "PwneuPwneu!1" --users-count 10 --api-url "http://localhost:37100" --email-domain "example.com"
+# Against a production-mode API (Registration policy allows 100 per minute per IP): add --registration-rate 100
 
-def login_admin(api_url, admin_password):
-    login_payload = {
-        "userName": "admin",
-        "password": admin_password
-    }
-    headers = {'Content-Type': 'application/json'}
-    response = requests.post(f"{api_url}/identity/login", data=json.dumps(login_payload), headers=headers)
-    if response.status_code == 200:
-        access_token = response.json().get('accessToken')
-        print("Admin logged in successfully. Access token retrieved.")
-        return access_token
-    else:
-        print(f"Failed to log in admin. Status code: {response.status_code}, Response: {response.text}")
-        return None
+# Registration policy of ConfigureProductionRateLimiter in RateLimitingExtensions.cs.
+PRODUCTION_REGISTRATIONS_PER_MINUTE = 100
 
 
-def create_access_key(api_url, access_token):
+def create_access_key(client, access_token):
     expiration_date = datetime.now() + timedelta(days=365)
     formatted_expiration = expiration_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    access_key_payload = {
-        "forManager": False,
-        "canBeReused": True,
-        "expiration": formatted_expiration
-    }
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {access_token}'
-    }
-    response = requests.post(f"{api_url}/identity/keys", data=json.dumps(access_key_payload), headers=headers)
+    response = client.create_access_key(access_token, False, True, formatted_expiration)
     if response.status_code == 200:
         access_key_guid = response.text.strip().strip('"')
         print(f"Access key created successfully: {access_key_guid} (length: {len(access_key_guid)})")
@@ -45,66 +37,147 @@ def create_access_key(api_url, access_token):
         return None
 
 
-def register_users(api_url, call_count, access_key_guid, email_domain):
-    timestamp = int(time.time())
-    fake = Faker()
-    for i in range(call_count):
-        unique_username = f"{fake.user_name()}{timestamp}{i}"
-        unique_email = f"{fake.user_name()}{timestamp}{i}@{email_domain}"
-        unique_full_name = fake.name()
-        payload = {
-            "userName": unique_username,
-            "email": unique_email,
-            "password": "PwneuPwneu!1",
-            "fullName": unique_full_name,
-            "accessKey": access_key_guid
-        }
-        headers = {'Content-Type': 'application/json'}
-        response = requests.post(f"{api_url}/identity/register", data=json.dumps(payload), headers=headers)
-        if response.status_code == 201:
-            print(f"User {unique_username} registered successfully.")
-        else:
-            print(f"Failed to register user {unique_username}. Status code: {response.status_code}, Response: {response.text}")
-
-
-def verify_users(api_url, access_token):
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {access_token}'
-    }
-    while True:
-        response = requests.get(f"{api_url}/identity/users?excludeVerified=true", headers=headers)
-        if response.status_code == 200:
-            users = response.json().get('items', [])
-            if not users:
-                print("No unverified users found.")
+def register_user(client, events, user, access_key_guid, bucket=None):
+    if bucket:
+        bucket.acquire()
+
+    user_name = user["userName"]
+    response = client.register(user_name, user["email"], DEFAULT_PASSWORD, user["fullName"], access_key_guid)
+    if response.status_code == 201:
+        events.record("registrations", True, message=f"User {user_name} registered successfully.", user=user_name)
+        return True
+    else:
+        events.record("registrations", False, response.status_code,
+                      f"Failed to register user {user_name}. Status code: {response.status_code}, Response: {response.text}",
+                      user=user_name)
+        return False
+
+
+def verify_user(client, events, access_token, user_id):
+    verify_response = client.verify_user(access_token, user_id)
+    if verify_response.status_code == 204:
+        events.record("verifications", True, message=f"User {user_id} verified successfully.", user_id=user_id)
+        return True
+    else:
+        events.record("verifications", False, verify_response.status_code,
+                      f"Failed to verify user {user_id}. Status code: {verify_response.status_code}, Response: {verify_response.text}",
+                      user_id=user_id)
+        return False
+
+
+# Registration and verification run as one pipeline. Register returns no user id, so a
+# discovery loop lists unverified users while registrations are still going out and hands
+# every new id to the verifier pool through a queue.
+def register_and_verify_users(client, events, access_token, call_count, access_key_guid, users,
+                              register_concurrency, verify_concurrency, registrations_per_minute):
+    # A bucket of one spreads registrations evenly, so no fixed window ever sees more than its limit.
+    bucket = TokenBucket(registrations_per_minute / 60, 1) if registrations_per_minute else None
+    verify_queue = queue.Queue()
+    counts = {"verified": 0, "verify_failed": 0}
+    counts_lock = threading.Lock()
+    started_at = time.time()
+
+    def verifier():
+        while True:
+            user_id = verify_queue.get()
+            if user_id is None:
                 break
-            for user in users:
-                user_id = user.get('id')
-                verify_response = requests.put(f"{api_url}/identity/users/{user_id}/verify", headers=headers)
-                if verify_response.status_code == 204:
-                    print(f"User {user_id} verified successfully.")
-                else:
-                    print(f"Failed to verify user {user_id}. Status code: {verify_response.status_code}, Response: {verify_response.text}")
-        else:
-            print(f"Failed to retrieve unverified users. Status code: {response.status_code}, Response: {response.text}")
-            break
+            verified = False
+            try:
+                verified = verify_user(client, events, access_token, user_id)
+            except Exception as e:
+                events.record("verifications", False, "error", f"Failed to verify user {user_id}. Error: {e}", user_id=user_id)
+            finally:
+                with counts_lock:
+                    counts["verified" if verified else "verify_failed"] += 1
+                verify_queue.task_done()
+
+    verifiers = [threading.Thread(target=verifier, daemon=True) for _ in range(verify_concurrency)]
+    for thread in verifiers:
+        thread.start()
+
+    events.start_phase("registrations", call_count)
+    events.start_phase("verifications", 0)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=register_concurrency) as executor:
+        registrations = [
+            executor.submit(register_user, client, events, user, access_key_guid, bucket)
+            for user in users
+        ]
+
+        seen_user_ids = set()
+
+        def discover():
+            new_user_ids = [
+                user['id'] for user in iter_users(client, access_token, excludeVerified="true")
+                if user['id'] not in seen_user_ids
+            ]
+            events.add_to_total("verifications", len(new_user_ids))
+            for user_id in new_user_ids:
+                seen_user_ids.add(user_id)
+                verify_queue.put(user_id)
+            return new_user_ids
+
+        while True:
+            registering = not all(future.done() for future in registrations)
+            if not registering:
+                events.finish_phase("registrations")
+            new_user_ids = discover()
+
+            if not registering and not new_user_ids:
+                # The unverified listing shrinks while users are being verified, which shifts
+                # the pages under an offset sweep and can skip users. A sweep taken once the
+                # verifiers are idle sees a stable listing, so only that one may end discovery.
+                verify_queue.join()
+                if not discover():
+                    break
+            elif not new_user_ids:
+                time.sleep(0.5)
+
+    verify_queue.join()
+    events.finish_phase("verifications")
+    for _ in verifiers:
+        verify_queue.put(None)
+
+    registered = sum(1 for future in registrations if future.result())
+    elapsed = time.time() - started_at
+    print(
+        f"Registered {registered}/{call_count} users, verified {counts['verified']}, "
+        f"verification failures {counts['verify_failed']} in {elapsed:.1f}s."
+    )
 
 
 def main():
     parser = argparse.ArgumentParser(description="Register users via API.")
-    parser.add_argument("--admin-password", type=str, default="PwneuPwneu!1", help="Password for the admin user.")
+    parser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
     parser.add_argument("--users-count", type=int, default=30, help="Number of users to register.")
-    parser.add_argument("--api-url", type=str, default="http://localhost:37100/api/v1", help="Base URL of the API.")
     parser.add_argument("--email-domain", type=str, default="example.com", help="Email domain for the registered users.")
+    parser.add_argument("--register-concurrency", type=int, default=32, help="Parallel registration requests.")
+    parser.add_argument("--verify-concurrency", type=int, default=16, help="Parallel verification requests.")
+    parser.add_argument("--run-tag", type=str, default=None, help="Digits appended to every user name and email to keep them unique across runs (default: random).")
+    parser.add_argument("--registration-rate", type=int, default=0,
+                        help=f"Registrations per minute allowed by the API (0 for a development API without limits, {PRODUCTION_REGISTRATIONS_PER_MINUTE} in production).")
+    add_client_arguments(parser)
+    add_event_arguments(parser)
+    add_data_arguments(parser)
     args = parser.parse_args()
+    pools = data_pools_from_args(args)
 
-    access_token = login_admin(args.api_url, args.admin_password)
-    if access_token:
-        access_key_guid = create_access_key(args.api_url, access_token)
-        if access_key_guid:
-            register_users(args.api_url, args.users_count, access_key_guid, args.email_domain)
-            verify_users(args.api_url, access_token)
+    with client_from_args(args) as client, event_sink_from_args(args) as events:
+        access_token = login_admin(client, args.admin_password)
+        if access_token:
+            access_key_guid = create_access_key(client, access_token)
+            if access_key_guid:
+                register_and_verify_users(
+                    client,
+                    events,
+                    access_token,
+                    args.users_count,
+                    access_key_guid,
+                    pools.users(args.users_count, args.email_domain, args.run_tag),
+                    args.register_concurrency,
+                    args.verify_concurrency,
+                    args.registration_rate,
+                )
 
 
 if __name__ == "__main__":
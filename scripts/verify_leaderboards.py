@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import sys
+import time
+from pwneu_client import (
+    DEFAULT_PASSWORD,
+    AsyncPwneuClient,
+    add_client_arguments,
+    client_from_args,
+    token_store_from_args,
+    login_admin,
+    fetch_all_users,
+    fetch_all_challenge_ids,
+    read_trace,
+)
+from pwneu_client.scenario import load_operations
+from pwneu_client.scoring import MISMATCH_KINDS, events_from_plan, events_from_trace, expected_scores, find_mismatches
+
+# Sample commands:
+#   python verify_leaderboards.py plan scenarios/default.json
+#   python verify_leaderboards.py trace load.ndjson --settle-timeout 120
+# Requires: pip install numpy
+#
+# Submissions, solves and hint usages are buffered and written by SaveBuffersService later, so
+# after a large load test nothing tells whether every point landed. This computes each user's
+# expected points, solves and hint usages from the seeding plan (what should have happened) or
+# from a trace recorded with --record-trace (what the API answered), then compares them with
+# play/leaderboards and play/users/{id}/data. Buffers are flushed periodically, so mismatches are
+# re-checked until they clear or --settle-timeout runs out. Exits with 1 if any remain.
+
+
+async def fetch_each(args, token_store, access_token, fetch, keys):
+    # Runs fetch(client, access_token, key) for every key with at most --concurrency in flight
+    # and returns {key: JSON body} for the ones that answered 200.
+    semaphore = asyncio.Semaphore(args.concurrency)
+    failed = 0
+
+    async with AsyncPwneuClient(args.api_url, max_connections=args.concurrency, http2=args.http2,
+                                token_store=token_store) as client:
+        async def fetch_one(key):
+            nonlocal failed
+            async with semaphore:
+                try:
+                    response = await fetch(client, access_token, key)
+                except Exception:
+                    response = None
+            if response is None or response.status_code != 200:
+                failed += 1
+                return key, None
+            return key, response.json()
+
+        results = await asyncio.gather(*(fetch_one(key) for key in keys))
+
+    if failed:
+        print(f"{failed}/{len(keys)} requests failed.")
+    return {key: body for key, body in results if body is not None}
+
+
+def fetch_catalog(args, token_store, admin_token, client):
+    challenge_ids = fetch_all_challenge_ids(client, admin_token)
+    details = asyncio.run(fetch_each(args, token_store, admin_token,
+                                     lambda client, access_token, challenge_id: client.get_challenge(access_token, challenge_id),
+                                     challenge_ids))
+    challenge_points = {challenge_id: challenge["points"] for challenge_id, challenge in details.items()}
+    hint_deductions = {hint["id"]: hint["deduction"] for challenge in details.values() for hint in challenge.get("hints", [])}
+    print(f"Catalog: {len(challenge_points)} challenges, {len(hint_deductions)} hints.")
+    return challenge_points, hint_deductions
+
+
+def load_events(args, token_store, admin_token, client):
+    if args.source == "plan":
+        return events_from_plan(load_operations(args.path))
+
+    entries = [entry for path in args.path for entry in read_trace(path)]
+    print(f"Loaded {len(entries)} recorded requests.")
+    challenge_points, hint_deductions = fetch_catalog(args, token_store, admin_token, client)
+    events = events_from_trace(entries, challenge_points, hint_deductions, args.admin_user)
+    if events.unknown_outcomes:
+        print(f"Warning: {events.unknown_outcomes} successful submissions have no recorded outcome "
+              "(traces written before outcomes were recorded) and were left out.")
+    if events.unknown_items:
+        print(f"Warning: {events.unknown_items} solves or hint usages reference challenges or hints that no longer exist.")
+    return events
+
+
+def fetch_play_data(args, token_store, admin_token, user_ids, names):
+    return asyncio.run(fetch_each(args, token_store, admin_token,
+                                  lambda client, access_token, name: client.get_user_play_data(access_token, user_ids[name]),
+                                  [name for name in names if name in user_ids]))
+
+
+def fetch_user_ranks(client, admin_token, users):
+    # An admin's play/leaderboards?count=N is never served from the leaderboard cache.
+    response = client.get_leaderboards(admin_token, count=max(len(users), 10))
+    if response.status_code != 200:
+        print(f"Failed to fetch leaderboards. Status code: {response.status_code}, Response: {response.text}")
+        return None
+    return response.json()["userRanks"]
+
+
+def print_mismatches(expected, mismatches, actual, show):
+    for kind in MISMATCH_KINDS:
+        indices = mismatches.get(kind)
+        if indices is None or not len(indices):
+            continue
+        print(f"{kind}: {len(indices)} users")
+        for index in indices[:show]:
+            print(f"  {expected.user_names[index]}: expected points={expected.points[index]} solves={expected.solves[index]} "
+                  f"hint usages={expected.hint_usages[index]}, actual points={actual['points'][index]} "
+                  f"solves={actual['solves'][index]} hint usages={actual['hint usages'][index]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify leaderboard points against a seeding plan or a recorded trace.")
+    subparsers = parser.add_subparsers(dest="source", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Expected scores from a scenario or compiled plan, assuming every step succeeded.")
+    plan_parser.add_argument("path", help="Scenario file or compiled plan (.ndjson).")
+    trace_parser = subparsers.add_parser("trace", help="Expected scores from the outcomes recorded in traces.")
+    trace_parser.add_argument("path", nargs="+", help="Traces written with --record-trace.")
+    trace_parser.add_argument("--admin-user", type=str, default="admin", help="User name whose requests are not scored.")
+
+    for subparser in (plan_parser, trace_parser):
+        subparser.add_argument("--admin-password", type=str, default=DEFAULT_PASSWORD, help="Password for the admin user.")
+        subparser.add_argument("--user-data", choices=["all", "mismatched", "none"], default="all",
+                               help="Check solve and hint usage counts with play/users/{id}/data for every user, only those whose points mismatch, or none.")
+        subparser.add_argument("--concurrency", type=int, default=100, help="Per-user requests in flight.")
+        subparser.add_argument("--settle-timeout", type=float, default=0, help="Seconds to keep re-checking while mismatches remain (buffers not flushed yet).")
+        subparser.add_argument("--settle-interval", type=float, default=5, help="Seconds between re-checks.")
+        subparser.add_argument("--show", type=int, default=10, help="Mismatched users to print per kind.")
+        add_client_arguments(subparser)
+    args = parser.parse_args()
+
+    token_store = token_store_from_args(args)
+
+    with client_from_args(args, token_store) as client:
+        admin_token = login_admin(client, args.admin_password)
+        if not admin_token:
+            return
+
+        events = load_events(args, token_store, admin_token, client)
+        started_at = time.perf_counter()
+        expected = expected_scores(events)
+        print(f"Expected scores for {len(expected.user_names)} users from {len(events.solve_users)} solves and "
+              f"{len(events.hint_users)} hint usages in {time.perf_counter() - started_at:.2f}s "
+              f"(duplicates dropped: {expected.duplicate_solves} solves, {expected.duplicate_hint_usages} hint usages).")
+
+        users = fetch_all_users(client, admin_token)
+        user_ids = {user["userName"]: user["id"] for user in users}
+        names = [str(name) for name in expected.user_names]
+        deadline = time.monotonic() + args.settle_timeout
+        while True:
+            user_ranks = fetch_user_ranks(client, admin_token, users)
+            if user_ranks is None:
+                sys.exit(1)
+            play_data = fetch_play_data(args, token_store, admin_token, user_ids, names) if args.user_data == "all" else None
+
+            started_at = time.perf_counter()
+            mismatches, columns = find_mismatches(expected, users, user_ranks, play_data)
+            compared_in = time.perf_counter() - started_at
+            if args.user_data == "mismatched" and len(mismatches["points"]):
+                play_data = fetch_play_data(args, token_store, admin_token, user_ids, [names[index] for index in mismatches["points"]])
+                mismatches, columns = find_mismatches(expected, users, user_ranks, play_data)
+            total = sum(len(indices) for indices in mismatches.values())
+            print(f"Compared {len(user_ranks)} ranked users and {len(play_data or {})} play data responses "
+                  f"in {compared_in:.2f}s: {total} mismatches.")
+
+            if not total or time.monotonic() >= deadline:
+                break
+            print(f"Re-checking in {args.settle_interval:.0f}s while the buffers are flushed.")
+            time.sleep(args.settle_interval)
+
+    print_mismatches(expected, mismatches, columns, args.show)
+    if total:
+        sys.exit(1)
+    print("Every expected score matches the leaderboard.")
+
+
+if __name__ == "__main__":
+    main()